@@ -0,0 +1,32 @@
+import importlib
+
+_SUBMODULES = {
+    "analysis",
+    "archive",
+    "bitset",
+    "bulk",
+    "cache",
+    "correlation",
+    "crud",
+    "dedup",
+    "event_leaderboard",
+    "export",
+    "fsck",
+    "group_totals",
+    "metrics",
+    "migrate",
+    "models",
+    "olympiad_analytics",
+    "problem_index",
+    "profiling",
+    "queries",
+    "recompute",
+    "session",
+    "snapshot",
+}
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,30 +1,30 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import and_, select
 from sqlalchemy.sql import func
-from typing import Dict, List, Tuple
-import pandas as pd
-from . import crud
-from .models import Lesson, LessonColumn, Result
+from typing import TYPE_CHECKING, Dict, List, Tuple
+from . import metrics, profiling, queries
+from .cache import group_cached, lesson_cached
+from .models import Lesson, LessonColumn, Participant, Result
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from .bitset import LessonResultMatrix
+
+@lesson_cached
 def calculate_problem_ratings(db: Session, lesson_id: int) -> Dict[int, int]:
-    lesson = crud.get_lesson_by_id(db, lesson_id)
+    lesson = queries.get_lesson(db, lesson_id)
     if not lesson:
         return {}
 
-    group_id = lesson.group_id
-    students_in_group = crud.get_students_in_group(db, group_id)
-    num_participants = len(students_in_group)
+    num_participants = queries.count_students_in_group(db, lesson.group_id)
     if num_participants == 0:
         return {}
 
-    columns = crud.get_columns_for_lesson(db, lesson_id)
+    columns = queries.get_columns_for_lesson(db, lesson_id)
     if not columns:
         return {}
 
-    results = crud.get_results_for_lesson(db, lesson_id)
-
-    solved_counts = {}
-    for res in results:
-        solved_counts[res.column_id] = solved_counts.get(res.column_id, 0) + 1
+    solved_counts = queries.get_solved_counts_for_lesson(db, lesson_id)
 
     problem_ratings = {}
     for col in columns:
@@ -35,23 +35,19 @@ def calculate_problem_ratings(db: Session, lesson_id: int) -> Dict[int, int]:
     return problem_ratings
 
 def calculate_student_lesson_score(db: Session, student_id: int, lesson_id: int, problem_ratings: Dict[int, int]) -> int:
-    results = db.query(Result).filter(
-        Result.student_id == student_id,
-        Result.lesson_id == lesson_id
-    ).all()
-    score = sum(problem_ratings.get(res.column_id, 0) for res in results)
+    solved_column_ids = queries.get_solved_column_ids(db, student_id, lesson_id)
+    score = sum(problem_ratings.get(column_id, 0) for column_id in solved_column_ids)
     return score
 
 def calculate_student_lesson_solved_count(db: Session, student_id: int, lesson_id: int) -> int:
-    count = db.query(func.count(Result.result_id)).filter(
-        Result.student_id == student_id,
-        Result.lesson_id == lesson_id
+    count = db.execute(
+        select(func.count(Result.result_id)).where(Result.student_id == student_id, Result.lesson_id == lesson_id)
     ).scalar()
     return count or 0
 
 def calculate_student_total_score_in_group(db: Session, student_id: int, group_id: int) -> int:
     total_score = 0
-    lessons = crud.get_lessons_for_group(db, group_id)
+    lessons = queries.get_lessons_for_group(db, group_id)
     for lesson in lessons:
         problem_ratings = calculate_problem_ratings(db, lesson.lesson_id)
         if problem_ratings:
@@ -60,75 +56,200 @@ def calculate_student_total_score_in_group(db: Session, student_id: int, group_i
     return total_score
 
 def calculate_student_total_solved_in_group(db: Session, student_id: int, group_id: int) -> int:
-    count = db.query(func.count(Result.result_id)).join(Lesson).filter(
-        Result.student_id == student_id,
-        Lesson.group_id == group_id
+    count = db.execute(
+        select(func.count(Result.result_id))
+        .join(Lesson, Lesson.lesson_id == Result.lesson_id)
+        .where(Result.student_id == student_id, Lesson.group_id == group_id)
     ).scalar()
     return count or 0
 
-def prepare_conduit_dataframe(db: Session, lesson_id: int) -> Tuple[pd.DataFrame, Dict[int, int]]:
+@group_cached
+def calculate_group_leaderboard(db: Session, group_id: int) -> Dict[int, Tuple[int, int]]:
+    member_ids = list(db.execute(select(Participant.student_id).where(Participant.group_id == group_id)).scalars())
+    num_participants = len(member_ids)
+    if num_participants == 0:
+        return {}
+
+    solved_counts = select(
+        Result.lesson_id.label("lesson_id"),
+        Result.column_id.label("column_id"),
+        func.count(Result.result_id).label("solved_count")
+    ).join(
+        LessonColumn, and_(LessonColumn.column_id == Result.column_id, LessonColumn.lesson_id == Result.lesson_id)
+    ).join(
+        Lesson, Lesson.lesson_id == Result.lesson_id
+    ).where(
+        Lesson.group_id == group_id
+    ).group_by(Result.lesson_id, Result.column_id).subquery()
+
+    rows = db.execute(select(
+        Result.student_id,
+        func.count(Result.result_id),
+        func.sum(num_participants - solved_counts.c.solved_count + 1)
+    ).join(
+        Lesson, Lesson.lesson_id == Result.lesson_id
+    ).join(
+        Participant, and_(Participant.student_id == Result.student_id, Participant.group_id == group_id)
+    ).outerjoin(
+        solved_counts, and_(solved_counts.c.column_id == Result.column_id, solved_counts.c.lesson_id == Result.lesson_id)
+    ).where(
+        Lesson.group_id == group_id
+    ).group_by(Result.student_id)).all()
+
+    leaderboard = {student_id: (0, 0) for student_id in member_ids}
+    for student_id, total_solved, total_score in rows:
+        leaderboard[student_id] = (total_solved or 0, total_score or 0)
+    return leaderboard
+
+@lesson_cached
+def load_lesson_result_matrix(db: Session, lesson_id: int) -> "LessonResultMatrix":
+    from .bitset import LessonResultMatrix
+
+    lesson = queries.get_lesson(db, lesson_id)
+    if not lesson:
+        return LessonResultMatrix.from_pairs([], [], [])
+    student_ids = list(db.execute(select(Participant.student_id).where(Participant.group_id == lesson.group_id).order_by(Participant.student_id)).scalars())
+    column_ids = [col.column_id for col in queries.get_columns_for_lesson(db, lesson_id)]
+    pairs = queries.get_results_for_lesson(db, lesson_id)
+    return LessonResultMatrix.from_pairs(student_ids, column_ids, pairs)
+
+@group_cached
+def load_group_result_matrices(db: Session, group_id: int) -> Dict[int, "LessonResultMatrix"]:
+    from .bitset import LessonResultMatrix
+
+    student_ids = list(db.execute(select(Participant.student_id).where(Participant.group_id == group_id).order_by(Participant.student_id)).scalars())
+    column_rows = db.execute(
+        select(LessonColumn.lesson_id, LessonColumn.column_id)
+        .join(Lesson, Lesson.lesson_id == LessonColumn.lesson_id)
+        .where(Lesson.group_id == group_id)
+        .order_by(LessonColumn.lesson_id, LessonColumn.display_order)
+    ).all()
+    result_rows = db.execute(
+        select(Result.lesson_id, Result.student_id, Result.column_id)
+        .join(Lesson, Lesson.lesson_id == Result.lesson_id)
+        .where(Lesson.group_id == group_id)
+    ).all()
+
+    columns_by_lesson = {}
+    for lesson_id, column_id in column_rows:
+        columns_by_lesson.setdefault(lesson_id, []).append(column_id)
+    pairs_by_lesson = {}
+    for lesson_id, student_id, column_id in result_rows:
+        pairs_by_lesson.setdefault(lesson_id, []).append((student_id, column_id))
+
+    return {
+        lesson_id: LessonResultMatrix.from_pairs(student_ids, column_ids, pairs_by_lesson.get(lesson_id, []))
+        for lesson_id, column_ids in columns_by_lesson.items()
+    }
+
+@group_cached
+def calculate_group_overview(db: Session, group_id: int) -> "pd.DataFrame":
+    import pandas as pd
+
+    students = queries.get_students_in_group(db, group_id)
+    lessons = queries.get_lesson_summaries_for_group(db, group_id)
+    overview_columns = ["lesson_id", "lesson_date", "topic", "column_count", "student_id", "student", "solved", "score"]
+    if not students or not lessons:
+        return pd.DataFrame(columns=overview_columns)
+    num_participants = len(students)
+
+    group_results = select(
+        Result.lesson_id.label("lesson_id"),
+        Result.student_id.label("student_id"),
+        func.count(Result.result_id).over(partition_by=Result.column_id).label("solved_count")
+    ).join(
+        LessonColumn, and_(LessonColumn.column_id == Result.column_id, LessonColumn.lesson_id == Result.lesson_id)
+    ).join(
+        Lesson, Lesson.lesson_id == Result.lesson_id
+    ).where(
+        Lesson.group_id == group_id
+    ).subquery()
+
+    rows = db.execute(select(
+        group_results.c.lesson_id,
+        group_results.c.student_id,
+        func.count(),
+        func.sum(num_participants - group_results.c.solved_count + 1)
+    ).join(
+        Participant, and_(Participant.student_id == group_results.c.student_id, Participant.group_id == group_id)
+    ).group_by(group_results.c.lesson_id, group_results.c.student_id)).all()
+
+    lessons_df = pd.DataFrame(lessons, columns=["lesson_id", "lesson_date", "topic", "column_count"])
+    students_df = pd.DataFrame({
+        "student_id": [s.student_id for s in students],
+        "student": [f"{s.last_name} {s.first_name}" for s in students],
+    })
+    totals_df = pd.DataFrame(rows, columns=["lesson_id", "student_id", "solved", "score"])
+    overview = lessons_df.merge(students_df, how="cross").merge(totals_df, on=["lesson_id", "student_id"], how="left")
+    overview[["solved", "score"]] = overview[["solved", "score"]].fillna(0).astype(int)
+    return overview[overview_columns]
+
+@lesson_cached
+def prepare_conduit_dataframe(db: Session, lesson_id: int) -> Tuple["pd.DataFrame", Dict[int, int]]:
+    import numpy as np
+    import pandas as pd
+    from .bitset import LessonResultMatrix
+
     df_empty = pd.DataFrame()
     empty_ratings = {}
 
-    lesson = crud.get_lesson_by_id(db, lesson_id)
+    lesson = queries.get_lesson(db, lesson_id)
     if not lesson:
         return df_empty, empty_ratings
 
-    students = crud.get_students_in_group(db, lesson.group_id)
-    columns = crud.get_columns_for_lesson(db, lesson_id)
-    results = crud.get_results_for_lesson(db, lesson_id)
+    students = queries.get_students_in_group(db, lesson.group_id)
+    columns = queries.get_columns_for_lesson(db, lesson_id)
+    results = queries.get_results_for_lesson(db, lesson_id)
 
     if not students or not columns:
          return df_empty, empty_ratings
 
-    problem_ratings = calculate_problem_ratings(db, lesson_id)
-
-    student_map = {s.student_id: f"{s.last_name} {s.first_name}" for s in students}
-    column_map = {c.column_id: c.column_label for c in columns}
-    column_order = [c.column_label for c in columns]
+    student_ids = [s.student_id for s in students]
+    column_ids = [c.column_id for c in columns]
+    matrix = LessonResultMatrix.from_pairs(student_ids, column_ids, results)
+    problem_ratings = matrix.problem_ratings()
+    ratings = np.array([problem_ratings[column_id] for column_id in column_ids], dtype=np.int64)
+    solved = matrix.to_dense()
 
     df = pd.DataFrame(
-        index=[student_map[s.student_id] for s in students],
-        columns=column_order
+        solved,
+        index=[f"{s.last_name} {s.first_name}" for s in students],
+        columns=[c.column_label for c in columns],
     )
-    df = df.fillna(False)
-
-    solved_map = {}
-    for res in results:
-        if res.student_id not in solved_map:
-            solved_map[res.student_id] = set()
-        solved_map[res.student_id].add(res.column_id)
-
-    for s in students:
-        student_name = student_map[s.student_id]
-        solved_cols_ids = solved_map.get(s.student_id, set())
-        for col in columns:
-            if col.column_id in solved_cols_ids:
-                 df.loc[student_name, col.column_label] = True
-
-    lesson_scores = {}
-    lesson_solved_counts = {}
-    for s in students:
-        student_name = student_map[s.student_id]
-        lesson_scores[student_name] = calculate_student_lesson_score(db, s.student_id, lesson_id, problem_ratings)
-        lesson_solved_counts[student_name] = calculate_student_lesson_solved_count(db, s.student_id, lesson_id)
-
-    df['Задач решено (занятие)'] = df.index.map(lesson_solved_counts)
-    df['Рейтинг (занятие)'] = df.index.map(lesson_scores)
+    df['Задач решено (занятие)'] = solved.sum(axis=1)
+    df['Рейтинг (занятие)'] = solved.astype(np.int64) @ ratings
+    df.attrs["student_ids"] = tuple(student_ids)
+    df.attrs["column_ids"] = tuple(column_ids)
 
     return df, problem_ratings
 
+def conduit_changes(original: "pd.DataFrame", edited: "pd.DataFrame") -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    import numpy as np
+
+    student_ids = np.asarray(original.attrs["student_ids"], dtype=np.int64)
+    column_ids = np.asarray(original.attrs["column_ids"], dtype=np.int64)
+    before = original.iloc[:, :len(column_ids)].to_numpy(dtype=bool)
+    after = edited.iloc[:, :len(column_ids)].to_numpy(dtype=bool)
+    rows, cols = np.nonzero(before ^ after)
+    pairs = np.column_stack((student_ids[rows], column_ids[cols]))
+    now_solved = after[rows, cols]
+    return [tuple(pair) for pair in pairs[now_solved].tolist()], [tuple(pair) for pair in pairs[~now_solved].tolist()]
+
+@lesson_cached
 def get_discussed_column_labels(db: Session, lesson_id: int) -> List[str]:
-    columns = db.query(LessonColumn).filter(
-        LessonColumn.lesson_id == lesson_id,
-        LessonColumn.is_discussed == True
-    ).all()
-    return [col.column_label for col in columns]
+    columns = queries.get_columns_for_lesson(db, lesson_id)
+    return [col.column_label for col in columns if col.is_discussed]
 
+@lesson_cached
 def get_column_label_to_id_map(db: Session, lesson_id: int) -> Dict[str, int]:
-    columns = crud.get_columns_for_lesson(db, lesson_id)
+    columns = queries.get_columns_for_lesson(db, lesson_id)
     return {col.column_label: col.column_id for col in columns}
 
+@group_cached
 def get_student_name_to_id_map(db: Session, group_id: int) -> Dict[str, int]:
-    students = crud.get_students_in_group(db, group_id)
-    return {f"{s.last_name} {s.first_name}": s.student_id for s in students}
\ No newline at end of file
+    students = queries.get_students_in_group(db, group_id)
+    return {f"{s.last_name} {s.first_name}": s.student_id for s in students}
+
+
+profiling.profile_public_functions(globals())
+metrics.instrument_public_functions(globals(), metrics.ANALYSIS_SECONDS)
@@ -0,0 +1,331 @@
+import argparse
+import datetime
+import glob
+import os
+import re
+import sqlite3
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Column, Date, Integer, MetaData, String, Table, and_, create_engine, event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql import func
+
+from . import problem_index
+from .models import (
+    DATABASE_BACKEND, DATABASE_PATH, Base, Lesson, LessonColumn, Participant, Result, StudyGroup
+)
+
+ARCHIVE_DIR = os.environ.get("OLYMP_ARCHIVE_DIR", os.path.join(os.path.dirname(DATABASE_PATH), "archive"))
+ARCHIVE_PREFIX = "season-"
+ARCHIVE_SUFFIX = ".db"
+SEASON_START_MONTH = 9
+DEFAULT_MAX_ATTACHED = 10
+
+ARCHIVED_TABLES = [Lesson.__table__, LessonColumn.__table__, Result.__table__]
+
+_view_metadata = MetaData()
+all_lessons = Table(
+    "AllLessons", _view_metadata,
+    Column("lesson_id", Integer), Column("group_id", Integer), Column("lesson_date", Date),
+    Column("topic", String), Column("season", Integer),
+)
+all_lesson_columns = Table(
+    "AllLessonColumns", _view_metadata,
+    Column("column_id", Integer), Column("lesson_id", Integer), Column("column_label", String),
+    Column("season", Integer),
+)
+all_results = Table(
+    "AllResults", _view_metadata,
+    Column("result_id", Integer), Column("student_id", Integer), Column("column_id", Integer),
+    Column("lesson_id", Integer), Column("season", Integer),
+)
+_UNIFIED_VIEWS = [(all_lessons, Lesson.__table__), (all_lesson_columns, LessonColumn.__table__), (all_results, Result.__table__)]
+
+
+class ArchiveReport(NamedTuple):
+    group_id: int
+    season: int
+    lessons: int
+    columns: int
+    results: int
+
+
+class SeasonSummaryRow(NamedTuple):
+    season: Optional[int]
+    groups: int
+    lessons: int
+    solved: int
+
+
+def season_of(day: datetime.date) -> int:
+    return day.year if day.month >= SEASON_START_MONTH else day.year - 1
+
+
+def season_label(season: int) -> str:
+    return f"{season}/{season + 1}"
+
+
+def archive_path(season: int, archive_dir: str = ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, f"{ARCHIVE_PREFIX}{season}{ARCHIVE_SUFFIX}")
+
+
+def list_archives(archive_dir: str = ARCHIVE_DIR) -> Dict[int, str]:
+    archives = {}
+    for path in glob.glob(os.path.join(archive_dir, f"{ARCHIVE_PREFIX}*{ARCHIVE_SUFFIX}")):
+        match = re.fullmatch(rf"{ARCHIVE_PREFIX}(\d{{4}}){re.escape(ARCHIVE_SUFFIX)}", os.path.basename(path))
+        if match:
+            archives[int(match.group(1))] = path
+    return dict(sorted(archives.items()))
+
+
+def _schema_name(season: int) -> str:
+    return f"season_{season}"
+
+
+def _column_list(table: Table) -> str:
+    return ", ".join(f'"{column.name}"' for column in table.columns)
+
+
+def max_attached(dbapi_connection: Optional[sqlite3.Connection] = None) -> int:
+    probe = dbapi_connection or sqlite3.connect(":memory:")
+    try:
+        if hasattr(probe, "getlimit"):
+            return probe.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        return DEFAULT_MAX_ATTACHED
+    finally:
+        if probe is not dbapi_connection:
+            probe.close()
+
+
+def select_archives(archive_dir: str = ARCHIVE_DIR, seasons: Optional[Iterable[int]] = None,
+                    limit: int = DEFAULT_MAX_ATTACHED) -> Dict[int, str]:
+    archives = list_archives(archive_dir)
+    if seasons is not None:
+        wanted = set(seasons)
+        archives = {season: path for season, path in archives.items() if season in wanted}
+    return dict(list(archives.items())[-limit:]) if limit > 0 else {}
+
+
+def attach_archives(dbapi_connection, archive_dir: str = ARCHIVE_DIR, seasons: Optional[Iterable[int]] = None) -> List[int]:
+    archives = select_archives(archive_dir, seasons, max_attached(dbapi_connection))
+    for season, path in archives.items():
+        dbapi_connection.execute(f"ATTACH DATABASE ? AS {_schema_name(season)}", (f"file:{path}?mode=ro",))
+    for view, source in _UNIFIED_VIEWS:
+        columns = ", ".join(f'"{column.name}"' for column in view.columns if column.name != "season")
+        selects = [f'SELECT {columns}, NULL AS season FROM main."{source.name}"']
+        selects += [
+            f'SELECT {columns}, {season} AS season FROM {_schema_name(season)}."{source.name}"'
+            for season in archives
+        ]
+        dbapi_connection.execute(f'DROP VIEW IF EXISTS temp."{view.name}"')
+        dbapi_connection.execute(f'CREATE TEMP VIEW "{view.name}" AS ' + " UNION ALL ".join(selects))
+    return list(archives)
+
+
+def create_archive_engine(database_path: str = DATABASE_PATH, archive_dir: str = ARCHIVE_DIR,
+                          seasons: Optional[Iterable[int]] = None) -> Engine:
+    seasons = tuple(seasons) if seasons is not None else None
+    archive_engine = create_engine(
+        f"sqlite:///file:{database_path}?mode=ro&uri=true", poolclass=NullPool,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(archive_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        attach_archives(dbapi_connection, archive_dir, seasons)
+
+    return archive_engine
+
+
+def _prepare_archive_file(path: str) -> None:
+    from .migrate import _add_missing_columns
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    archive_engine = create_engine(f"sqlite:///{path}")
+    with archive_engine.begin() as connection:
+        Base.metadata.create_all(bind=connection, tables=ARCHIVED_TABLES)
+        _add_missing_columns(connection, Base.metadata)
+    archive_engine.dispose()
+
+
+def _group_season(connection: sqlite3.Connection, group_id: int) -> Optional[int]:
+    row = connection.execute(
+        'SELECT (SELECT MAX(lesson_date) FROM "Lessons" WHERE group_id = ?), end_date, archive_season '
+        'FROM "StudyGroups" WHERE group_id = ?',
+        (group_id, group_id),
+    ).fetchone()
+    if row is None or row[2] is not None:
+        return None
+    last_lesson, end_date, _ = row
+    last_day = last_lesson or end_date
+    if last_day is None:
+        return None
+    return season_of(datetime.date.fromisoformat(str(last_day)[:10]))
+
+
+def _create_move_engine(database_path: str, path: str, schema: str) -> Engine:
+    move_engine = create_engine(f"sqlite:///{database_path}", poolclass=NullPool)
+
+    @event.listens_for(move_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+
+    @event.listens_for(move_engine, "begin")
+    def _on_begin(connection):
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return move_engine
+
+
+def archive_group(group_id: int, database_path: str = DATABASE_PATH, archive_dir: str = ARCHIVE_DIR) -> Optional[ArchiveReport]:
+    connection = sqlite3.connect(database_path)
+    try:
+        season = _group_season(connection, group_id)
+    finally:
+        connection.close()
+    if season is None:
+        return None
+    path = archive_path(season, archive_dir)
+    _prepare_archive_file(path)
+    schema = _schema_name(season)
+    group_lessons = 'SELECT lesson_id FROM main."Lessons" WHERE group_id = ?'
+
+    move_engine = _create_move_engine(database_path, path, schema)
+    try:
+        with move_engine.begin() as connection:
+            problem_ids = list(connection.exec_driver_sql(
+                f'SELECT DISTINCT problem_id FROM main."LessonColumns" WHERE problem_id IS NOT NULL AND lesson_id IN ({group_lessons})',
+                (group_id,),
+            ).scalars())
+            counts = []
+            for table in ARCHIVED_TABLES:
+                key = "group_id = ?" if table is Lesson.__table__ else f"lesson_id IN ({group_lessons})"
+                columns = _column_list(table)
+                result = connection.exec_driver_sql(
+                    f'INSERT INTO {schema}."{table.name}" ({columns}) SELECT {columns} FROM main."{table.name}" WHERE {key}',
+                    (group_id,),
+                )
+                counts.append(result.rowcount)
+            for table in reversed(ARCHIVED_TABLES):
+                key = "group_id = ?" if table is Lesson.__table__ else f"lesson_id IN ({group_lessons})"
+                connection.exec_driver_sql(f'DELETE FROM main."{table.name}" WHERE {key}', (group_id,))
+            connection.exec_driver_sql(
+                'UPDATE main."StudyGroups" SET archive_season = ?, data_version = COALESCE(data_version, 0) + 1 '
+                'WHERE group_id = ?',
+                (season, group_id),
+            )
+            if problem_ids:
+                with Session(bind=connection) as db:
+                    problem_index.rebuild_problem_stats(db, problem_ids)
+    finally:
+        move_engine.dispose()
+    lessons, columns, results = counts
+    return ArchiveReport(group_id, season, lessons, columns, results)
+
+
+def find_finished_groups(db: Session, finished_before: datetime.date) -> List[int]:
+    return list(db.execute(
+        select(StudyGroup.group_id).where(
+            StudyGroup.archive_season.is_(None),
+            StudyGroup.end_date.isnot(None),
+            StudyGroup.end_date < finished_before,
+        ).order_by(StudyGroup.group_id)
+    ).scalars())
+
+
+def get_group_leaderboard(db: Session, group_id: int) -> Dict[int, Tuple[int, int]]:
+    member_ids = list(db.execute(select(Participant.student_id).where(Participant.group_id == group_id)).scalars())
+    num_participants = len(member_ids)
+    if num_participants == 0:
+        return {}
+
+    group_lessons = select(all_lessons.c.lesson_id).where(all_lessons.c.group_id == group_id)
+    solved_counts = select(
+        all_results.c.column_id.label("column_id"), func.count(all_results.c.result_id).label("solved_count")
+    ).where(all_results.c.lesson_id.in_(group_lessons)).group_by(all_results.c.column_id).subquery()
+
+    rows = db.execute(select(
+        all_results.c.student_id,
+        func.count(all_results.c.result_id),
+        func.sum(num_participants - solved_counts.c.solved_count + 1),
+    ).join(
+        Participant, and_(Participant.student_id == all_results.c.student_id, Participant.group_id == group_id)
+    ).join(
+        solved_counts, solved_counts.c.column_id == all_results.c.column_id
+    ).where(
+        all_results.c.lesson_id.in_(group_lessons)
+    ).group_by(all_results.c.student_id)).all()
+
+    leaderboard = {student_id: (0, 0) for student_id in member_ids}
+    for student_id, total_solved, total_score in rows:
+        leaderboard[student_id] = (total_solved or 0, total_score or 0)
+    return leaderboard
+
+
+def get_student_season_summary(db: Session, student_id: int) -> List[SeasonSummaryRow]:
+    rows = db.execute(select(
+        all_results.c.season,
+        func.count(func.distinct(all_lessons.c.group_id)),
+        func.count(func.distinct(all_results.c.lesson_id)),
+        func.count(all_results.c.result_id),
+    ).join(
+        all_lessons, all_lessons.c.lesson_id == all_results.c.lesson_id
+    ).where(
+        all_results.c.student_id == student_id
+    ).group_by(all_results.c.season).order_by(all_results.c.season))
+    return [SeasonSummaryRow._make(row) for row in rows]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Перенос завершенных групп в архивные базы по сезонам.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--finished-before", type=datetime.date.fromisoformat,
+                        help="архивировать группы с датой окончания раньше указанной (ГГГГ-ММ-ДД)")
+    target.add_argument("--group-id", type=int, action="append", dest="group_ids", help="ID группы (можно указать несколько раз)")
+    target.add_argument("--list", action="store_true", help="показать архивные базы")
+    parser.add_argument("--vacuum", action="store_true", help="сжать основную базу после переноса")
+    args = parser.parse_args(argv)
+
+    if DATABASE_BACKEND != "sqlite":
+        print(f"Архивирование поддерживается только для SQLite (текущая база: {DATABASE_BACKEND}).")
+        return 1
+
+    from . import migrate
+    from .models import SessionLocal
+
+    migrate.upgrade()
+    if args.list:
+        for season, path in list_archives().items():
+            print(f"{season_label(season)}: {path} ({os.path.getsize(path) / (1024 * 1024):.1f} МБ)")
+        return 0
+
+    group_ids = args.group_ids
+    if group_ids is None:
+        with SessionLocal() as db:
+            group_ids = find_finished_groups(db, args.finished_before)
+    if not group_ids:
+        print("Нет групп для архивирования.")
+        return 0
+
+    for group_id in group_ids:
+        report = archive_group(group_id)
+        if report is None:
+            print(f"  Группа {group_id}: не найдена, уже в архиве или без занятий, пропущена")
+            continue
+        print(f"  Группа {group_id} -> сезон {season_label(report.season)}: "
+              f"{report.lessons} занятий, {report.columns} задач, {report.results} результатов")
+
+    if args.vacuum:
+        connection = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+        connection.execute("VACUUM")
+        connection.close()
+        print(f"Основная база сжата: {os.path.getsize(DATABASE_PATH) / (1024 * 1024):.1f} МБ")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount_rows(packed: np.ndarray) -> np.ndarray:
+    if packed.size == 0:
+        return np.zeros(packed.shape[0], dtype=np.int64)
+    return _POPCOUNT[packed].sum(axis=1, dtype=np.int64)
+
+
+class LessonResultMatrix:
+    __slots__ = ("student_ids", "column_ids", "_student_pos", "_column_pos", "rows", "cols", "column_counts")
+
+    def __init__(self, student_ids: Sequence[int], column_ids: Sequence[int], dense: np.ndarray,
+                 column_counts: Optional[np.ndarray] = None):
+        self.student_ids = list(student_ids)
+        self.column_ids = list(column_ids)
+        self._student_pos = {student_id: i for i, student_id in enumerate(self.student_ids)}
+        self._column_pos = {column_id: j for j, column_id in enumerate(self.column_ids)}
+        dense = np.asarray(dense, dtype=bool).reshape(len(self.student_ids), len(self.column_ids))
+        self.rows = np.packbits(dense, axis=1)
+        self.cols = np.packbits(dense.T, axis=1)
+        if column_counts is None:
+            column_counts = _popcount_rows(self.cols)
+        self.column_counts = np.asarray(column_counts, dtype=np.int64)
+
+    @classmethod
+    def from_pairs(cls, student_ids: Sequence[int], column_ids: Sequence[int], pairs: Iterable[Tuple[int, int]]) -> "LessonResultMatrix":
+        student_pos = {student_id: i for i, student_id in enumerate(student_ids)}
+        column_pos = {column_id: j for j, column_id in enumerate(column_ids)}
+        dense = np.zeros((len(student_pos), len(column_pos)), dtype=bool)
+        column_counts = np.zeros(len(column_pos), dtype=np.int64)
+        row_idx = []
+        col_idx = []
+        for student_id, column_id in pairs:
+            j = column_pos.get(column_id)
+            if j is None:
+                continue
+            column_counts[j] += 1
+            i = student_pos.get(student_id)
+            if i is not None:
+                row_idx.append(i)
+                col_idx.append(j)
+        if row_idx:
+            dense[np.array(row_idx), np.array(col_idx)] = True
+        return cls(student_ids, column_ids, dense, column_counts)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.student_ids), len(self.column_ids)
+
+    def to_dense(self) -> np.ndarray:
+        return np.unpackbits(self.rows, axis=1, count=len(self.column_ids)).astype(bool)
+
+    def is_solved(self, student_id: int, column_id: int) -> bool:
+        i = self._student_pos.get(student_id)
+        j = self._column_pos.get(column_id)
+        if i is None or j is None:
+            return False
+        return bool(self.rows[i, j >> 3] & (0x80 >> (j & 7)))
+
+    def solve_counts(self) -> Dict[int, int]:
+        return dict(zip(self.column_ids, self.column_counts.tolist()))
+
+    def student_totals(self) -> Dict[int, int]:
+        totals = _popcount_rows(self.rows)
+        return dict(zip(self.student_ids, totals.tolist()))
+
+    def problem_ratings(self, num_participants: Optional[int] = None) -> Dict[int, int]:
+        if num_participants is None:
+            num_participants = len(self.student_ids)
+        return dict(zip(self.column_ids, (num_participants - self.column_counts + 1).tolist()))
+
+    def student_scores(self, problem_ratings: Dict[int, int]) -> Dict[int, int]:
+        weights = np.array([problem_ratings.get(column_id, 0) for column_id in self.column_ids], dtype=np.int64)
+        scores = self.to_dense().astype(np.int64) @ weights if self.column_ids else np.zeros(len(self.student_ids), dtype=np.int64)
+        return dict(zip(self.student_ids, scores.tolist()))
+
+    def _row(self, student_id: int) -> np.ndarray:
+        i = self._student_pos.get(student_id)
+        if i is None:
+            return np.zeros(self.rows.shape[1], dtype=np.uint8)
+        return self.rows[i]
+
+    def _column_ids_from_bits(self, bits: np.ndarray) -> List[int]:
+        unpacked = np.unpackbits(bits, count=len(self.column_ids))
+        return [self.column_ids[j] for j in np.flatnonzero(unpacked)]
+
+    def solved_by(self, student_id: int) -> List[int]:
+        return self._column_ids_from_bits(self._row(student_id))
+
+    def solved_but_not_by(self, student_id: int, other_student_id: int) -> List[int]:
+        return self._column_ids_from_bits(self._row(student_id) & ~self._row(other_student_id))
+
+    def solved_exclusively(self, student_id: int, other_student_ids: Optional[Iterable[int]] = None) -> List[int]:
+        if other_student_ids is None:
+            other_student_ids = [s for s in self.student_ids if s != student_id]
+        other_positions = [self._student_pos[s] for s in other_student_ids if s in self._student_pos]
+        if other_positions:
+            others = np.bitwise_or.reduce(self.rows[other_positions], axis=0)
+        else:
+            others = np.zeros(self.rows.shape[1], dtype=np.uint8)
+        return self._column_ids_from_bits(self._row(student_id) & ~others)
+
+    def unsolved_columns(self) -> List[int]:
+        return [self.column_ids[j] for j in np.flatnonzero(self.column_counts == 0)]
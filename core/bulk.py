@@ -0,0 +1,75 @@
+import csv
+import io
+from typing import Dict, Iterable, List, Sequence
+
+from sqlalchemy import Table, insert
+from sqlalchemy.orm import Session
+
+CHUNK_SIZE = 10000
+COPY_NULL = "\\N"
+
+
+def _chunks(rows: Sequence[Dict], size: int = CHUNK_SIZE) -> Iterable[Sequence[Dict]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _copy_rows(table: Table, columns: List[str], rows: Sequence[Dict], dialect) -> Iterable[List]:
+    processors = [table.c[name].type.bind_processor(dialect) for name in columns]
+    for row in rows:
+        values = []
+        for name, processor in zip(columns, processors):
+            value = row.get(name)
+            if processor is not None and value is not None:
+                value = processor(value)
+            values.append(value)
+        yield values
+
+
+def _copy_into(db: Session, table: Table, rows: Sequence[Dict]) -> None:
+    connection = db.connection()
+    dialect = connection.dialect
+    columns = list(rows[0].keys())
+    quoted_columns = ", ".join(dialect.identifier_preparer.quote(name) for name in columns)
+    statement = (
+        f"COPY {dialect.identifier_preparer.format_table(table)} ({quoted_columns}) "
+        f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        if dialect.driver == "psycopg":
+            with cursor.copy(statement) as copy:
+                for chunk in _chunks(rows):
+                    buffer = io.StringIO()
+                    _write_csv(buffer, _copy_rows(table, columns, chunk, dialect))
+                    copy.write(buffer.getvalue())
+        else:
+            for chunk in _chunks(rows):
+                buffer = io.StringIO()
+                _write_csv(buffer, _copy_rows(table, columns, chunk, dialect))
+                buffer.seek(0)
+                cursor.copy_expert(statement, buffer)
+    finally:
+        cursor.close()
+
+
+def _write_csv(buffer: io.StringIO, rows: Iterable[List]) -> None:
+    writer = csv.writer(buffer, lineterminator="\n")
+    for values in rows:
+        writer.writerow([COPY_NULL if value is None else value for value in values])
+
+
+def supports_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver in ("psycopg2", "psycopg")
+
+
+def bulk_insert(db: Session, table: Table, rows: Sequence[Dict]) -> int:
+    if not rows:
+        return 0
+    if supports_copy(db):
+        _copy_into(db, table, rows)
+    else:
+        for chunk in _chunks(rows):
+            db.execute(insert(table), list(chunk))
+    return len(rows)
@@ -0,0 +1,155 @@
+import functools
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from .models import Lesson, StudyGroup
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("OLYMP_ANALYSIS_CACHE_SIZE", "256"))
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.per_function: Dict[str, Dict[str, int]] = {}
+
+    def _record(self, name: str, outcome: str):
+        counters = self.per_function.setdefault(name, {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def get(self, name: str, key: Hashable, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._record(name, "hits")
+                return self._entries[key]
+            self.misses += 1
+            self._record(name, "misses")
+            return default
+
+    def put(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "functions": {name: dict(counters) for name, counters in self.per_function.items()},
+            }
+
+
+_cache = LRUCache()
+_MISSING = object()
+
+
+def _next_version(entity):
+    return func.coalesce(entity.data_version, 0) + 1
+
+
+def bump_group(db: Session, group_id: int) -> None:
+    db.execute(
+        update(StudyGroup).where(StudyGroup.group_id == group_id).values(data_version=_next_version(StudyGroup))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bump_groups(db: Session, group_ids: Optional[Iterable[int]] = None) -> None:
+    query = update(StudyGroup).values(data_version=_next_version(StudyGroup))
+    if group_ids is not None:
+        query = query.where(StudyGroup.group_id.in_(list(set(group_ids))))
+    db.execute(query.execution_options(synchronize_session=False))
+
+
+def bump_lesson(db: Session, lesson_id: int) -> None:
+    db.execute(
+        update(Lesson).where(Lesson.lesson_id == lesson_id).values(data_version=_next_version(Lesson))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(StudyGroup).where(
+            StudyGroup.group_id == select(Lesson.group_id).where(Lesson.lesson_id == lesson_id).scalar_subquery()
+        ).values(data_version=_next_version(StudyGroup)).execution_options(synchronize_session=False)
+    )
+
+
+def lesson_version(db: Session, lesson_id: int):
+    return tuple(db.execute(
+        select(Lesson.data_version, Lesson.group_id, StudyGroup.data_version)
+        .join(StudyGroup, StudyGroup.group_id == Lesson.group_id)
+        .where(Lesson.lesson_id == lesson_id)
+    ).first() or ())
+
+
+def group_version(db: Session, group_id: int) -> Optional[int]:
+    return db.execute(select(StudyGroup.data_version).where(StudyGroup.group_id == group_id)).scalar()
+
+
+def database_key(db: Session) -> str:
+    url = db.get_bind().url
+    if url.get_backend_name() == "sqlite" and url.database:
+        return os.path.abspath(url.database[len("file:"):] if url.database.startswith("file:") else url.database)
+    return url.render_as_string(hide_password=True)
+
+
+def _copied(value):
+    if isinstance(value, tuple):
+        return tuple(_copied(item) for item in value)
+    if hasattr(value, "copy"):
+        return value.copy()
+    return value
+
+
+def _memoize(version_of: Callable) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(db: Session, entity_id: int, *args):
+            key = (name, database_key(db), entity_id, args, version_of(db, entity_id))
+            value = _cache.get(name, key, _MISSING)
+            if value is _MISSING:
+                value = func(db, entity_id, *args)
+                _cache.put(key, value)
+            return _copied(value)
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+lesson_cached = _memoize(lesson_version)
+group_cached = _memoize(group_version)
+
+
+def cache_stats() -> Dict[str, object]:
+    return _cache.stats()
+
+
+def clear_cache() -> None:
+    _cache.clear()
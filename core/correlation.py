@@ -0,0 +1,216 @@
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from . import analysis, cache
+from .models import (
+    Lesson, LessonColumn, OlympiadResultSummary, Participant, Result, StudyGroup, SubjectAreaEnum
+)
+from .olympiad_analytics import AWARD_WEIGHTS, LEVEL_WEIGHTS, PRIZE_AWARDS, WINNER_AWARDS
+
+SOLVE_RATE_PREFIX = "Решаемость: "
+RATING_PERCENTILE = "Перцентиль рейтинга"
+ATTENDANCE = "Посещаемость"
+
+OLYMPIAD_WEIGHTED = "Взвешенный балл олимпиад"
+OLYMPIAD_BEST_AWARD = "Лучшая награда (вес)"
+OLYMPIAD_HAS_PRIZE = "Победитель/призёр"
+OLYMPIAD_PARTICIPATIONS = "Участий в олимпиадах"
+
+
+class _GroupFeatures(NamedTuple):
+    solved: Dict[Tuple[int, SubjectAreaEnum], int]
+    available: Dict[Tuple[int, SubjectAreaEnum], int]
+    attended: Dict[int, int]
+    lessons_available: Dict[int, int]
+    percentiles: Dict[int, float]
+
+
+class FeatureMatrixCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._database: Optional[str] = None
+        self._versions: Dict[int, int] = {}
+        self._groups: Dict[int, _GroupFeatures] = {}
+        self._matrix: Optional[pd.DataFrame] = None
+        self.full_rebuilds = 0
+        self.incremental_updates = 0
+
+    @staticmethod
+    def _group_versions(db: Session) -> Dict[int, int]:
+        return dict(db.execute(select(StudyGroup.group_id, StudyGroup.data_version)).all())
+
+    @staticmethod
+    def _load_groups(db: Session, group_ids: List[int]) -> Dict[int, _GroupFeatures]:
+        groups = {group_id: _GroupFeatures({}, {}, {}, {}, {}) for group_id in group_ids}
+        if not group_ids:
+            return groups
+        available_rows = db.execute(
+            select(Participant.group_id, Participant.student_id, Lesson.subject_area, func.count(LessonColumn.column_id))
+            .join(Lesson, Lesson.group_id == Participant.group_id)
+            .join(LessonColumn, LessonColumn.lesson_id == Lesson.lesson_id)
+            .where(Participant.group_id.in_(group_ids))
+            .group_by(Participant.group_id, Participant.student_id, Lesson.subject_area)
+        )
+        for group_id, student_id, subject, count in available_rows:
+            groups[group_id].available[(student_id, subject)] = count
+        lesson_rows = db.execute(
+            select(Participant.group_id, Participant.student_id, func.count(Lesson.lesson_id))
+            .join(Lesson, Lesson.group_id == Participant.group_id)
+            .where(Participant.group_id.in_(group_ids))
+            .group_by(Participant.group_id, Participant.student_id)
+        )
+        for group_id, student_id, count in lesson_rows:
+            groups[group_id].lessons_available[student_id] = count
+        solved_rows = db.execute(
+            select(Lesson.group_id, Result.student_id, Lesson.subject_area, func.count(Result.result_id))
+            .join(Lesson, Lesson.lesson_id == Result.lesson_id)
+            .join(Participant, and_(Participant.student_id == Result.student_id, Participant.group_id == Lesson.group_id))
+            .where(Lesson.group_id.in_(group_ids))
+            .group_by(Lesson.group_id, Result.student_id, Lesson.subject_area)
+        )
+        for group_id, student_id, subject, count in solved_rows:
+            groups[group_id].solved[(student_id, subject)] = count
+        attended_rows = db.execute(
+            select(Lesson.group_id, Result.student_id, func.count(func.distinct(Result.lesson_id)))
+            .join(Lesson, Lesson.lesson_id == Result.lesson_id)
+            .join(Participant, and_(Participant.student_id == Result.student_id, Participant.group_id == Lesson.group_id))
+            .where(Lesson.group_id.in_(group_ids))
+            .group_by(Lesson.group_id, Result.student_id)
+        )
+        for group_id, student_id, count in attended_rows:
+            groups[group_id].attended[student_id] = count
+        for group_id in group_ids:
+            leaderboard = analysis.calculate_group_leaderboard(db, group_id)
+            if leaderboard:
+                scores = pd.Series({student_id: score for student_id, (_, score) in leaderboard.items()})
+                groups[group_id].percentiles.update(scores.rank(pct=True).to_dict())
+        return groups
+
+    def _build_matrix(self) -> pd.DataFrame:
+        solved_counts: Dict[Tuple[int, SubjectAreaEnum], int] = {}
+        available_counts: Dict[Tuple[int, SubjectAreaEnum], int] = {}
+        attended_counts: Dict[int, int] = {}
+        lessons_counts: Dict[int, int] = {}
+        for features in self._groups.values():
+            for counts, group_counts in (
+                (solved_counts, features.solved), (available_counts, features.available),
+                (attended_counts, features.attended), (lessons_counts, features.lessons_available),
+            ):
+                for key, count in group_counts.items():
+                    counts[key] = counts.get(key, 0) + count
+
+        student_ids = sorted(set(lessons_counts) | {student_id for student_id, _ in available_counts})
+        subjects = list(SubjectAreaEnum)
+        index = pd.Index(student_ids, name="student_id")
+
+        solved = np.zeros((len(student_ids), len(subjects)))
+        available = np.zeros((len(student_ids), len(subjects)))
+        row_of = {student_id: i for i, student_id in enumerate(student_ids)}
+        col_of = {subject: j for j, subject in enumerate(subjects)}
+        for (student_id, subject), count in available_counts.items():
+            available[row_of[student_id], col_of[subject]] = count
+        for (student_id, subject), count in solved_counts.items():
+            if student_id in row_of:
+                solved[row_of[student_id], col_of[subject]] = count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            solve_rates = np.where(available > 0, solved / available, np.nan)
+
+        matrix = pd.DataFrame(solve_rates, index=index, columns=[f"{SOLVE_RATE_PREFIX}{s.value}" for s in subjects])
+
+        percentile_frame = pd.DataFrame({group_id: features.percentiles for group_id, features in self._groups.items() if features.percentiles})
+        matrix[RATING_PERCENTILE] = percentile_frame.mean(axis=1).reindex(index) if not percentile_frame.empty else np.nan
+
+        lessons_available = pd.Series(lessons_counts, dtype=float).reindex(index)
+        attended = pd.Series(attended_counts, dtype=float).reindex(index).fillna(0)
+        matrix[ATTENDANCE] = (attended / lessons_available).where(lessons_available > 0)
+        return matrix
+
+    def get_matrix(self, db: Session) -> pd.DataFrame:
+        with self._lock:
+            database = cache.database_key(db)
+            versions = self._group_versions(db)
+            if database != self._database:
+                self._groups = self._load_groups(db, list(versions))
+                self._database = database
+                self._matrix = None
+                self.full_rebuilds += 1
+            else:
+                changed = [group_id for group_id, version in versions.items() if self._versions.get(group_id) != version]
+                removed = [group_id for group_id in self._groups if group_id not in versions]
+                if changed or removed:
+                    for group_id in removed:
+                        del self._groups[group_id]
+                    self._groups.update(self._load_groups(db, changed))
+                    self._matrix = None
+                    self.incremental_updates += 1
+            self._versions = versions
+            if self._matrix is None:
+                self._matrix = self._build_matrix()
+            return self._matrix.copy()
+
+
+_feature_cache = FeatureMatrixCache()
+
+
+def get_student_feature_matrix(db: Session) -> pd.DataFrame:
+    return _feature_cache.get_matrix(db)
+
+
+def get_olympiad_outcomes(db: Session) -> pd.DataFrame:
+    rows = db.execute(select(
+        OlympiadResultSummary.student_id, OlympiadResultSummary.olympiad_level,
+        OlympiadResultSummary.award, OlympiadResultSummary.result_count
+    )).all()
+    if not rows:
+        return pd.DataFrame(columns=[OLYMPIAD_WEIGHTED, OLYMPIAD_BEST_AWARD, OLYMPIAD_HAS_PRIZE, OLYMPIAD_PARTICIPATIONS])
+
+    summary = pd.DataFrame(rows, columns=["student_id", "level", "award", "result_count"])
+    level_weight = summary["level"].map(LEVEL_WEIGHTS).astype(float)
+    award_weight = summary["award"].map(AWARD_WEIGHTS).astype(float)
+    summary["weighted"] = level_weight * award_weight * summary["result_count"]
+    summary["award_weight"] = award_weight
+    summary["has_prize"] = summary["award"].isin(WINNER_AWARDS + PRIZE_AWARDS).astype(float)
+
+    grouped = summary.groupby("student_id")
+    return pd.DataFrame({
+        OLYMPIAD_WEIGHTED: grouped["weighted"].sum(),
+        OLYMPIAD_BEST_AWARD: grouped["award_weight"].max(),
+        OLYMPIAD_HAS_PRIZE: grouped["has_prize"].max(),
+        OLYMPIAD_PARTICIPATIONS: grouped["result_count"].sum().astype(float),
+    })
+
+
+def build_correlation_dataset(db: Session, participants_only: bool = True) -> pd.DataFrame:
+    features = get_student_feature_matrix(db)
+    outcomes = get_olympiad_outcomes(db)
+    how = "inner" if participants_only else "left"
+    dataset = features.join(outcomes, how=how)
+    if not participants_only:
+        dataset[outcomes.columns] = dataset[outcomes.columns].fillna(0)
+    return dataset
+
+
+def compute_olympiad_correlations(db: Session, method: str = "spearman", participants_only: bool = True) -> pd.DataFrame:
+    dataset = build_correlation_dataset(db, participants_only=participants_only)
+    feature_columns = [c for c in dataset.columns if c.startswith(SOLVE_RATE_PREFIX) or c in (RATING_PERCENTILE, ATTENDANCE)]
+    outcome_columns = [OLYMPIAD_WEIGHTED, OLYMPIAD_BEST_AWARD, OLYMPIAD_HAS_PRIZE, OLYMPIAD_PARTICIPATIONS]
+    if dataset.empty:
+        return pd.DataFrame(index=feature_columns, columns=outcome_columns, dtype=float)
+    correlations = dataset[feature_columns + outcome_columns].corr(method=method, min_periods=3)
+    result = correlations.loc[feature_columns, outcome_columns]
+    result["Учеников"] = dataset[feature_columns].notna().sum()
+    return result
+
+
+def feature_cache_stats() -> Dict[str, int]:
+    return {
+        "full_rebuilds": _feature_cache.full_rebuilds,
+        "incremental_updates": _feature_cache.incremental_updates,
+        "groups": len(_feature_cache._groups),
+    }
@@ -1,11 +1,14 @@
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 import datetime
+import re
+from . import bulk, cache, group_totals, metrics, olympiad_analytics, problem_index, profiling
 from .models import (
-    Student, StudyGroup, Participant, Lesson, LessonColumn, Result,
-    Event, EventParticipant, Olympiad, OlympiadResult,
+    Student, StudyGroup, Participant, Lesson, LessonColumn, Result, Problem,
+    Event, EventParticipant, Olympiad, OlympiadResult, StudentGroupTotal,
     SessionLocal, SubjectAreaEnum, ProblemTypeEnum, EventTypeEnum,
-    OlympiadLevelEnum, AwardEnum
+    OlympiadLevelEnum, AwardEnum, normalize_name, student_name_key
 )
 
 def get_db():
@@ -31,11 +34,41 @@ def create_group(db: Session, group_name: str, description: Optional[str] = None
 def get_group_by_id(db: Session, group_id: int) -> Optional[StudyGroup]:
     return db.query(StudyGroup).filter(StudyGroup.group_id == group_id).first()
 
+def _bulk_delete(db: Session, entity, *conditions) -> int:
+    return db.execute(delete(entity).where(*conditions).execution_options(synchronize_session=False)).rowcount
+
+def delete_group(db: Session, group_id: int) -> bool:
+    group_lessons = select(Lesson.lesson_id).where(Lesson.group_id == group_id)
+    problem_ids = list(db.execute(
+        select(LessonColumn.problem_id).where(LessonColumn.lesson_id.in_(group_lessons), LessonColumn.problem_id.isnot(None)).distinct()
+    ).scalars())
+    _bulk_delete(db, Result, Result.lesson_id.in_(group_lessons))
+    _bulk_delete(db, LessonColumn, LessonColumn.lesson_id.in_(group_lessons))
+    _bulk_delete(db, Lesson, Lesson.group_id == group_id)
+    _bulk_delete(db, StudentGroupTotal, StudentGroupTotal.group_id == group_id)
+    _bulk_delete(db, Participant, Participant.group_id == group_id)
+    deleted = _bulk_delete(db, StudyGroup, StudyGroup.group_id == group_id)
+    if problem_ids:
+        problem_index.rebuild_problem_stats(db, problem_ids)
+    db.commit()
+    return deleted > 0
+
 def find_students_by_name(db: Session, first_name: str, last_name: str) -> List[Student]:
-    return db.query(Student).filter(Student.last_name == last_name, Student.first_name == first_name).all()
+    return db.query(Student).filter(Student.name_key == student_name_key(first_name, last_name)).order_by(Student.student_id).all()
+
+def resolve_student(db: Session, first_name: str, last_name: str, school_name: Optional[str] = None) -> List[Student]:
+    candidates = find_students_by_name(db, first_name, last_name)
+    school_key = normalize_name(school_name)
+    if not school_key:
+        return candidates
+    same_school = [s for s in candidates if normalize_name(s.school_name) == school_key]
+    return same_school or [s for s in candidates if not s.school_name]
 
 def create_student(db: Session, first_name: str, last_name: str, school_name: Optional[str] = None) -> Student:
-    new_student = Student(first_name=first_name, last_name=last_name, school_name=school_name)
+    new_student = Student(
+        first_name=" ".join(first_name.split()), last_name=" ".join(last_name.split()),
+        school_name=" ".join(school_name.split()) if school_name else None,
+    )
     db.add(new_student)
     db.commit()
     db.refresh(new_student)
@@ -49,6 +82,10 @@ def add_student_to_group(db: Session, student_id: int, group_id: int) -> Optiona
     if not existing:
         participation = Participant(student_id=student_id, group_id=group_id)
         db.add(participation)
+        db.flush()
+        problem_index.record_member_added(db, group_id)
+        group_totals.record_member_added(db, group_id, student_id)
+        cache.bump_group(db, group_id)
         db.commit()
         db.refresh(participation)
         return participation
@@ -63,6 +100,7 @@ def get_groups_for_student(db: Session, student_id: int) -> List[StudyGroup]:
 def create_lesson(db: Session, group_id: int, lesson_date, topic: str, subject_area: SubjectAreaEnum, sheet_link: Optional[str] = None) -> Lesson:
     lesson = Lesson(group_id=group_id, lesson_date=lesson_date, topic=topic, subject_area=subject_area, sheet_link=sheet_link)
     db.add(lesson)
+    cache.bump_group(db, group_id)
     db.commit()
     db.refresh(lesson)
     return lesson
@@ -73,13 +111,55 @@ def get_lessons_for_group(db: Session, group_id: int) -> List[Lesson]:
 def get_lesson_by_id(db: Session, lesson_id: int) -> Optional[Lesson]:
      return db.query(Lesson).filter(Lesson.lesson_id == lesson_id).first()
 
-def add_lesson_column(db: Session, lesson_id: int, column_label: str, problem_type: ProblemTypeEnum, display_order: int) -> LessonColumn:
-    column = LessonColumn(lesson_id=lesson_id, column_label=column_label, problem_type=problem_type, display_order=display_order)
+def add_lesson_column(db: Session, lesson_id: int, column_label: str, problem_type: ProblemTypeEnum, display_order: int, problem_id: Optional[int] = None) -> LessonColumn:
+    column = LessonColumn(lesson_id=lesson_id, column_label=column_label, problem_type=problem_type, display_order=display_order, problem_id=problem_id)
     db.add(column)
+    db.flush()
+    problem_index.record_column_linked(db, column.column_id, problem_id)
+    cache.bump_lesson(db, lesson_id)
     db.commit()
     db.refresh(column)
     return column
 
+def parse_column_labels(text: str) -> List[str]:
+    labels = [label.strip() for label in re.split(r"[\n,;]+", text or "")]
+    return list(dict.fromkeys(label for label in labels if label))
+
+def create_lessons_with_columns(db: Session, group_ids: Sequence[int], lesson_date, topic: str, subject_area: SubjectAreaEnum, columns: Sequence[Tuple[str, ProblemTypeEnum, Optional[int]]], sheet_link: Optional[str] = None) -> List[Lesson]:
+    lessons = [
+        Lesson(group_id=group_id, lesson_date=lesson_date, topic=topic, subject_area=subject_area, sheet_link=sheet_link)
+        for group_id in group_ids
+    ]
+    db.add_all(lessons)
+    db.flush()
+    bulk.bulk_insert(db, LessonColumn.__table__, [
+        {
+            "lesson_id": lesson.lesson_id, "column_label": column_label, "problem_type": problem_type,
+            "display_order": display_order, "is_discussed": False, "problem_id": problem_id,
+        }
+        for lesson in lessons
+        for display_order, (column_label, problem_type, problem_id) in enumerate(columns)
+    ])
+    problem_ids = {problem_id for _, _, problem_id in columns if problem_id is not None}
+    if problem_ids:
+        problem_index.rebuild_problem_stats(db, problem_ids)
+    cache.bump_groups(db, group_ids)
+    db.commit()
+    return lessons
+
+def create_lesson_with_columns(db: Session, group_id: int, lesson_date, topic: str, subject_area: SubjectAreaEnum, column_labels: Sequence[str], problem_type: ProblemTypeEnum = ProblemTypeEnum.REGULAR, sheet_link: Optional[str] = None) -> Lesson:
+    columns = [(column_label, problem_type, None) for column_label in column_labels]
+    return create_lessons_with_columns(db, [group_id], lesson_date, topic, subject_area, columns, sheet_link)[0]
+
+def clone_lesson_to_groups(db: Session, lesson_id: int, group_ids: Sequence[int], lesson_date=None) -> List[Lesson]:
+    template = get_lesson_by_id(db, lesson_id)
+    if not template:
+        return []
+    columns = [(c.column_label, c.problem_type, c.problem_id) for c in get_columns_for_lesson(db, lesson_id)]
+    return create_lessons_with_columns(
+        db, group_ids, lesson_date or template.lesson_date, template.topic, template.subject_area, columns, template.sheet_link
+    )
+
 def get_columns_for_lesson(db: Session, lesson_id: int) -> List[LessonColumn]:
     return db.query(LessonColumn).filter(LessonColumn.lesson_id == lesson_id).order_by(LessonColumn.display_order).all()
 
@@ -87,19 +167,52 @@ def mark_column_discussed(db: Session, column_id: int, is_discussed: bool) -> Op
     column = db.query(LessonColumn).filter(LessonColumn.column_id == column_id).first()
     if column:
         column.is_discussed = is_discussed
+        cache.bump_lesson(db, column.lesson_id)
         db.commit()
         db.refresh(column)
     return column
 
+def set_discussed_columns(db: Session, lesson_id: int, column_ids: Iterable[int]) -> int:
+    column_ids = list(column_ids)
+    in_lesson = LessonColumn.lesson_id == lesson_id
+    changed = db.execute(
+        update(LessonColumn).where(in_lesson, LessonColumn.column_id.in_(column_ids), LessonColumn.is_discussed.is_(False))
+        .values(is_discussed=True).execution_options(synchronize_session=False)
+    ).rowcount
+    changed += db.execute(
+        update(LessonColumn).where(in_lesson, LessonColumn.column_id.not_in(column_ids), LessonColumn.is_discussed.is_(True))
+        .values(is_discussed=False).execution_options(synchronize_session=False)
+    ).rowcount
+    if changed:
+        cache.bump_lesson(db, lesson_id)
+    db.commit()
+    return changed
+
 def get_column_by_id(db: Session, column_id: int) -> Optional[LessonColumn]:
      return db.query(LessonColumn).filter(LessonColumn.column_id == column_id).first()
 
+def link_column_to_problem(db: Session, column_id: int, problem_id: Optional[int]) -> Optional[LessonColumn]:
+    column = get_column_by_id(db, column_id)
+    if column and column.problem_id != problem_id:
+        problem_index.record_column_linked(db, column_id, column.problem_id, sign=-1)
+        column.problem_id = problem_id
+        db.flush()
+        problem_index.record_column_linked(db, column_id, problem_id)
+        db.commit()
+        db.refresh(column)
+    return column
+
 def add_result(db: Session, student_id: int, column_id: int, lesson_id: int) -> Optional[Result]:
     existing = db.query(Result).filter(Result.student_id == student_id, Result.column_id == column_id).first()
     if not existing:
         result = Result(student_id=student_id, column_id=column_id, lesson_id=lesson_id)
         db.add(result)
+        db.flush()
+        problem_index.record_result_added(db, column_id)
+        group_totals.record_result_added(db, student_id, column_id)
+        cache.bump_lesson(db, lesson_id)
         db.commit()
+        metrics.RESULTS_WRITTEN.labels("add").inc()
         db.refresh(result)
         return result
     return existing
@@ -108,13 +221,45 @@ def delete_result(db: Session, student_id: int, column_id: int) -> bool:
     result = db.query(Result).filter(Result.student_id == student_id, Result.column_id == column_id).first()
     if result:
         db.delete(result)
+        db.flush()
+        problem_index.record_result_deleted(db, column_id)
+        group_totals.record_result_deleted(db, student_id, column_id)
+        cache.bump_lesson(db, result.lesson_id)
         db.commit()
+        metrics.RESULTS_WRITTEN.labels("delete").inc()
         return True
     return False
 
 def get_results_for_lesson(db: Session, lesson_id: int) -> List[Result]:
      return db.query(Result).filter(Result.lesson_id == lesson_id).all()
 
+def replace_student_group_totals(db: Session, leaderboards: Dict[int, Dict[int, Tuple[int, int]]]) -> int:
+    written = group_totals.write_group_totals(db, leaderboards)
+    db.commit()
+    return written
+
+def get_student_group_totals(db: Session, group_id: int) -> List[StudentGroupTotal]:
+    return db.query(StudentGroupTotal).filter(StudentGroupTotal.group_id == group_id).all()
+
+
+def create_problem(db: Session, title: str, subject_area: SubjectAreaEnum, source: Optional[str] = None, statement: Optional[str] = None) -> Problem:
+    problem = Problem(title=title, subject_area=subject_area, source=source, statement=statement)
+    db.add(problem)
+    db.flush()
+    problem_index.create_problem_stats(db, problem)
+    db.commit()
+    db.refresh(problem)
+    return problem
+
+def get_problem_by_id(db: Session, problem_id: int) -> Optional[Problem]:
+    return db.query(Problem).filter(Problem.problem_id == problem_id).first()
+
+def get_all_problems(db: Session, subject_area: Optional[SubjectAreaEnum] = None) -> List[Problem]:
+    query = db.query(Problem)
+    if subject_area:
+        query = query.filter(Problem.subject_area == subject_area)
+    return query.order_by(Problem.subject_area, Problem.title).all()
+
 
 def create_event(db: Session, event_name: str, event_type: EventTypeEnum, description: Optional[str] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None, organizer: Optional[str] = None) -> Event:
     new_event = Event(
@@ -156,12 +301,14 @@ def update_event(db: Session, event_id: int, event_name: Optional[str] = None, e
     return event
 
 def delete_event(db: Session, event_id: int) -> bool:
-    event = get_event_by_id(db, event_id)
-    if event:
-        db.delete(event)
-        db.commit()
-        return True
-    return False
+    _bulk_delete(db, EventParticipant, EventParticipant.event_id == event_id)
+    db.execute(
+        update(StudyGroup).where(StudyGroup.event_id == event_id).values(event_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = _bulk_delete(db, Event, Event.event_id == event_id)
+    db.commit()
+    return deleted > 0
 
 def add_student_to_event(db: Session, student_id: int, event_id: int, role: Optional[str] = "Ученик") -> Optional[EventParticipant]:
     existing = db.query(EventParticipant).filter(EventParticipant.student_id == student_id, EventParticipant.event_id == event_id).first()
@@ -213,6 +360,9 @@ def get_all_olympiads(db: Session, subject_filter: Optional[str] = None) -> List
         query = query.filter(Olympiad.subject == subject_filter)
     return query.order_by(Olympiad.olympiad_date.desc(), Olympiad.olympiad_name).all()
 
+def _get_olympiad_student_ids(db: Session, olympiad_id: int) -> List[int]:
+    return [row.student_id for row in db.query(OlympiadResult.student_id).filter(OlympiadResult.olympiad_id == olympiad_id).distinct()]
+
 def update_olympiad(db: Session, olympiad_id: int, olympiad_name: Optional[str] = None, olympiad_date: Optional[datetime.date] = None, level: Optional[OlympiadLevelEnum] = None, subject: Optional[str] = None, organizer: Optional[str] = None) -> Optional[Olympiad]:
     olympiad = get_olympiad_by_id(db, olympiad_id)
     if olympiad:
@@ -226,17 +376,20 @@ def update_olympiad(db: Session, olympiad_id: int, olympiad_name: Optional[str]
             olympiad.subject = subject
         if organizer is not None:
             olympiad.organizer = organizer
+        db.flush()
+        olympiad_analytics.refresh_olympiad_summary(db, _get_olympiad_student_ids(db, olympiad_id))
         db.commit()
         db.refresh(olympiad)
     return olympiad
 
 def delete_olympiad(db: Session, olympiad_id: int) -> bool:
-    olympiad = get_olympiad_by_id(db, olympiad_id)
-    if olympiad:
-        db.delete(olympiad)
-        db.commit()
-        return True
-    return False
+    student_ids = _get_olympiad_student_ids(db, olympiad_id)
+    _bulk_delete(db, OlympiadResult, OlympiadResult.olympiad_id == olympiad_id)
+    deleted = _bulk_delete(db, Olympiad, Olympiad.olympiad_id == olympiad_id)
+    if student_ids:
+        olympiad_analytics.refresh_olympiad_summary(db, student_ids)
+    db.commit()
+    return deleted > 0
 
 def add_olympiad_result(db: Session, student_id: int, olympiad_id: int, award: AwardEnum, score: Optional[float] = None, details: Optional[str] = None, result_document_link: Optional[str] = None) -> Optional[OlympiadResult]:
     existing = db.query(OlympiadResult).filter(
@@ -254,6 +407,8 @@ def add_olympiad_result(db: Session, student_id: int, olympiad_id: int, award: A
             result_document_link=result_document_link
         )
         db.add(result)
+        db.flush()
+        olympiad_analytics.refresh_olympiad_summary(db, [student_id])
         db.commit()
         db.refresh(result)
         return result
@@ -270,6 +425,8 @@ def update_olympiad_result(db: Session, olympiad_result_id: int, award: Optional
             result.details = details
         if result_document_link is not None:
             result.result_document_link = result_document_link
+        db.flush()
+        olympiad_analytics.refresh_olympiad_summary(db, [result.student_id])
         db.commit()
         db.refresh(result)
     return result
@@ -277,7 +434,10 @@ def update_olympiad_result(db: Session, olympiad_result_id: int, award: Optional
 def delete_olympiad_result(db: Session, olympiad_result_id: int) -> bool:
     result = db.query(OlympiadResult).filter(OlympiadResult.olympiad_result_id == olympiad_result_id).first()
     if result:
+        student_id = result.student_id
         db.delete(result)
+        db.flush()
+        olympiad_analytics.refresh_olympiad_summary(db, [student_id])
         db.commit()
         return True
     return False
@@ -289,4 +449,8 @@ def get_olympiad_results_for_student(db: Session, student_id: int, olympiad_id:
     return query.join(Olympiad).order_by(Olympiad.olympiad_date.desc()).all()
 
 def get_olympiad_results_for_olympiad(db: Session, olympiad_id: int) -> List[OlympiadResult]:
-    return db.query(OlympiadResult).filter(OlympiadResult.olympiad_id == olympiad_id).join(Student).order_by(Student.last_name, Student.first_name).all()
\ No newline at end of file
+    return db.query(OlympiadResult).filter(OlympiadResult.olympiad_id == olympiad_id).join(Student).order_by(Student.last_name, Student.first_name).all()
+
+
+profiling.profile_public_functions(globals())
+metrics.instrument_public_functions(globals(), metrics.CRUD_WRITE_SECONDS, metrics.WRITE_PREFIXES)
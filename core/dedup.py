@@ -0,0 +1,191 @@
+import argparse
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql import func
+
+from .models import (
+    EventParticipant, Lesson, LessonColumn, OlympiadResult, Participant, Result, Student,
+    StudentGroupTotal, normalize_name
+)
+
+
+class DuplicateSet(NamedTuple):
+    keep_id: int
+    duplicate_ids: List[int]
+    last_name: str
+    first_name: str
+    school_name: Optional[str]
+
+
+class MergeReport(NamedTuple):
+    keep_id: int
+    duplicate_ids: List[int]
+    moved: Dict[str, int]
+    dropped: Dict[str, int]
+    group_ids: List[int]
+
+
+_MERGED_TABLES = [
+    ("Participants", Participant, [Participant.group_id]),
+    ("Results", Result, [Result.column_id]),
+    ("EventParticipants", EventParticipant, [EventParticipant.event_id]),
+    ("OlympiadResults", OlympiadResult, [OlympiadResult.olympiad_id, OlympiadResult.details]),
+]
+
+
+def find_duplicate_sets(db: Session) -> List[DuplicateSet]:
+    repeated_keys = select(Student.name_key).where(Student.name_key.isnot(None)).group_by(Student.name_key).having(
+        func.count(Student.student_id) > 1
+    )
+    students = db.execute(
+        select(Student.student_id, Student.name_key, Student.last_name, Student.first_name, Student.school_name)
+        .where(Student.name_key.in_(repeated_keys))
+        .order_by(Student.name_key, Student.student_id)
+    ).all()
+
+    by_key: Dict[str, list] = {}
+    for student in students:
+        by_key.setdefault(student.name_key, []).append(student)
+
+    duplicate_sets = []
+    for same_name in by_key.values():
+        by_school: Dict[str, list] = {}
+        without_school = []
+        for student in same_name:
+            school_key = normalize_name(student.school_name)
+            if school_key:
+                by_school.setdefault(school_key, []).append(student)
+            else:
+                without_school.append(student)
+        if len(by_school) == 1:
+            next(iter(by_school.values())).extend(without_school)
+        elif without_school:
+            by_school[""] = without_school
+        for clustered in by_school.values():
+            if len(clustered) < 2:
+                continue
+            clustered.sort(key=lambda s: s.student_id)
+            keep = clustered[0]
+            school_name = keep.school_name or next((s.school_name for s in clustered if s.school_name), None)
+            duplicate_sets.append(DuplicateSet(
+                keep.student_id, [s.student_id for s in clustered[1:]], keep.last_name, keep.first_name, school_name
+            ))
+    return duplicate_sets
+
+
+def _owned_by_keep(entity, key_columns, keep_id: int):
+    kept = aliased(entity)
+    return exists().where(
+        kept.student_id == keep_id,
+        *[getattr(kept, column.key).is_not_distinct_from(column) for column in key_columns]
+    )
+
+
+def merge_students(db: Session, keep_id: int, duplicate_ids: Sequence[int]) -> MergeReport:
+    duplicate_ids = [student_id for student_id in duplicate_ids if student_id != keep_id]
+    student_ids = [keep_id] + duplicate_ids
+    group_ids = list(db.execute(
+        select(Participant.group_id).where(Participant.student_id.in_(student_ids)).distinct()
+    ).scalars())
+
+    moved = {name: 0 for name, _, _ in _MERGED_TABLES}
+    dropped = {name: 0 for name, _, _ in _MERGED_TABLES}
+    for duplicate_id in duplicate_ids:
+        for name, entity, key_columns in _MERGED_TABLES:
+            dropped[name] += db.execute(
+                delete(entity).where(entity.student_id == duplicate_id, _owned_by_keep(entity, key_columns, keep_id))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            moved[name] += db.execute(
+                update(entity).where(entity.student_id == duplicate_id).values(student_id=keep_id)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+    db.execute(
+        delete(StudentGroupTotal).where(StudentGroupTotal.student_id.in_(duplicate_ids))
+        .execution_options(synchronize_session=False)
+    )
+    school_name = db.execute(
+        select(Student.school_name).where(Student.student_id.in_(duplicate_ids), Student.school_name.isnot(None))
+        .order_by(Student.student_id).limit(1)
+    ).scalar()
+    db.execute(delete(Student).where(Student.student_id.in_(duplicate_ids)).execution_options(synchronize_session=False))
+    if school_name:
+        db.execute(
+            update(Student).where(Student.student_id == keep_id, Student.school_name.is_(None))
+            .values(school_name=school_name).execution_options(synchronize_session=False)
+        )
+    return MergeReport(keep_id, duplicate_ids, moved, dropped, group_ids)
+
+
+def merge_duplicate_sets(db: Session, duplicate_sets: Sequence[DuplicateSet]) -> List[MergeReport]:
+    from . import cache, group_totals, olympiad_analytics, problem_index
+
+    reports = [merge_students(db, dup.keep_id, dup.duplicate_ids) for dup in duplicate_sets]
+    group_ids = sorted({group_id for report in reports for group_id in report.group_ids})
+    if group_ids:
+        problem_ids = list(db.execute(
+            select(LessonColumn.problem_id).join(Lesson, Lesson.lesson_id == LessonColumn.lesson_id)
+            .where(Lesson.group_id.in_(group_ids), LessonColumn.problem_id.isnot(None)).distinct()
+        ).scalars())
+        if problem_ids:
+            problem_index.rebuild_problem_stats(db, problem_ids)
+        group_totals.rebuild_group_totals(db, group_ids)
+    if any(report.moved["OlympiadResults"] or report.dropped["OlympiadResults"] for report in reports):
+        olympiad_analytics.refresh_olympiad_summary(db, [
+            student_id for report in reports for student_id in [report.keep_id] + report.duplicate_ids
+        ])
+    if group_ids:
+        cache.bump_groups(db, group_ids)
+    db.commit()
+    return reports
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Поиск и объединение дубликатов учеников.")
+    parser.add_argument("--merge", action="store_true", help="объединить найденные дубликаты в одной транзакции")
+    parser.add_argument("--keep", type=int, help="ID ученика, которого нужно оставить (вместе с --duplicate)")
+    parser.add_argument("--duplicate", type=int, action="append", dest="duplicate_ids",
+                        help="ID дубликата для объединения с --keep (можно указать несколько раз)")
+    args = parser.parse_args(argv)
+
+    from . import migrate
+    from .models import SessionLocal
+
+    migrate.upgrade()
+    with SessionLocal() as db:
+        if args.keep is not None:
+            keep = db.get(Student, args.keep)
+            if keep is None or not args.duplicate_ids:
+                print("Укажите существующего ученика в --keep и хотя бы один --duplicate.")
+                return 1
+            duplicate_sets = [DuplicateSet(keep.student_id, args.duplicate_ids, keep.last_name, keep.first_name, keep.school_name)]
+        else:
+            duplicate_sets = find_duplicate_sets(db)
+        if not duplicate_sets:
+            print("Дубликатов не найдено.")
+            return 0
+        for dup in duplicate_sets:
+            print(f"  {dup.last_name} {dup.first_name} ({dup.school_name or 'школа не указана'}): "
+                  f"оставить {dup.keep_id}, объединить {', '.join(map(str, dup.duplicate_ids))}")
+        if not args.merge and args.keep is None:
+            print("Для объединения запустите с флагом --merge.")
+            return 1
+
+        try:
+            reports = merge_duplicate_sets(db, duplicate_sets)
+        except Exception as e:
+            db.rollback()
+            print(f"Объединение отменено: {e}")
+            return 2
+    for report in reports:
+        moved = ", ".join(f"{name}: {count}" for name, count in report.moved.items() if count)
+        dropped = ", ".join(f"{name}: {count}" for name, count in report.dropped.items() if count)
+        print(f"  Ученик {report.keep_id}: перенесено {moved or 'ничего'}; совпадающих строк удалено: {dropped or 'нет'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from . import cache
+from .models import Lesson, LessonColumn, Participant, Result, Student, StudyGroup
+
+NORMALIZATION_RAW = "raw"
+NORMALIZATION_GROUP_SIZE = "group_size"
+NORMALIZATION_GROUP_TOP = "group_top"
+
+NORMALIZATION_LABELS: Dict[str, str] = {
+    NORMALIZATION_RAW: "Сумма баллов",
+    NORMALIZATION_GROUP_SIZE: "Баллы, делённые на размер группы",
+    NORMALIZATION_GROUP_TOP: "Процент от лидера группы",
+}
+
+
+class EventMemberRow(NamedTuple):
+    group_id: int
+    group_size: int
+    student_id: int
+    last_name: str
+    first_name: str
+    school_name: Optional[str]
+
+
+class EventLeaderboardRow(NamedTuple):
+    rank: int
+    student_id: int
+    last_name: str
+    first_name: str
+    school_name: Optional[str]
+    groups: int
+    total_solved: int
+    total_score: int
+    normalized_score: float
+
+
+class _EventSnapshot(NamedTuple):
+    fingerprint: Tuple
+    members: List[EventMemberRow]
+    totals: Dict[Tuple[int, int], Tuple[int, int]]
+
+
+_cache: Dict[Tuple[str, int], _EventSnapshot] = {}
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _event_group_ids(event_id: int):
+    return select(StudyGroup.group_id).where(StudyGroup.event_id == event_id)
+
+
+def _event_fingerprint(db: Session, event_id: int) -> Tuple:
+    return tuple(db.execute(
+        select(StudyGroup.group_id, StudyGroup.data_version).where(StudyGroup.event_id == event_id).order_by(StudyGroup.group_id)
+    ).all())
+
+
+def _load_members(db: Session, event_id: int) -> List[EventMemberRow]:
+    group_sizes = select(
+        Participant.group_id.label("group_id"), func.count(Participant.participation_id).label("members")
+    ).where(Participant.group_id.in_(_event_group_ids(event_id))).group_by(Participant.group_id).subquery()
+    rows = db.execute(select(
+        Participant.group_id, group_sizes.c.members,
+        Student.student_id, Student.last_name, Student.first_name, Student.school_name,
+    ).join(
+        Student, Student.student_id == Participant.student_id
+    ).join(
+        group_sizes, group_sizes.c.group_id == Participant.group_id
+    ))
+    return [EventMemberRow._make(row) for row in rows]
+
+
+def _load_totals(db: Session, event_id: int) -> Dict[Tuple[int, int], Tuple[int, int]]:
+    group_ids = _event_group_ids(event_id)
+    group_sizes = select(
+        Participant.group_id.label("group_id"), func.count(Participant.participation_id).label("members")
+    ).where(Participant.group_id.in_(group_ids)).group_by(Participant.group_id).subquery()
+    solved_counts = select(
+        Result.lesson_id.label("lesson_id"),
+        Result.column_id.label("column_id"),
+        func.count(Result.result_id).label("solved_count")
+    ).join(
+        LessonColumn, and_(LessonColumn.column_id == Result.column_id, LessonColumn.lesson_id == Result.lesson_id)
+    ).join(
+        Lesson, Lesson.lesson_id == Result.lesson_id
+    ).where(
+        Lesson.group_id.in_(group_ids)
+    ).group_by(Result.lesson_id, Result.column_id).subquery()
+
+    rows = db.execute(select(
+        Lesson.group_id,
+        Result.student_id,
+        func.count(Result.result_id),
+        func.sum(group_sizes.c.members - solved_counts.c.solved_count + 1)
+    ).join(
+        Lesson, Lesson.lesson_id == Result.lesson_id
+    ).join(
+        Participant, and_(Participant.student_id == Result.student_id, Participant.group_id == Lesson.group_id)
+    ).join(
+        group_sizes, group_sizes.c.group_id == Lesson.group_id
+    ).outerjoin(
+        solved_counts, and_(solved_counts.c.column_id == Result.column_id, solved_counts.c.lesson_id == Result.lesson_id)
+    ).where(
+        Lesson.group_id.in_(group_ids)
+    ).group_by(Lesson.group_id, Result.student_id))
+    return {(group_id, student_id): (solved or 0, score or 0) for group_id, student_id, solved, score in rows}
+
+
+def _get_snapshot(db: Session, event_id: int) -> _EventSnapshot:
+    key = (cache.database_key(db), event_id)
+    fingerprint = _event_fingerprint(db, event_id)
+    with _cache_lock:
+        snapshot = _cache.get(key)
+        if snapshot is not None and snapshot.fingerprint == fingerprint:
+            _cache_stats["hits"] += 1
+            return snapshot
+        _cache_stats["misses"] += 1
+    snapshot = _EventSnapshot(fingerprint, _load_members(db, event_id), _load_totals(db, event_id))
+    with _cache_lock:
+        _cache[key] = snapshot
+    return snapshot
+
+
+def get_event_leaderboard(db: Session, event_id: int, normalization: str = NORMALIZATION_RAW) -> List[EventLeaderboardRow]:
+    if normalization not in NORMALIZATION_LABELS:
+        raise ValueError(f"Неизвестный способ нормировки: {normalization}")
+    snapshot = _get_snapshot(db, event_id)
+
+    group_top: Dict[int, int] = {}
+    for (group_id, _), (_, score) in snapshot.totals.items():
+        group_top[group_id] = max(group_top.get(group_id, 0), score)
+
+    students: Dict[int, list] = {}
+    for member in snapshot.members:
+        solved, score = snapshot.totals.get((member.group_id, member.student_id), (0, 0))
+        if normalization == NORMALIZATION_GROUP_SIZE:
+            normalized = score / member.group_size
+        elif normalization == NORMALIZATION_GROUP_TOP:
+            top = group_top.get(member.group_id, 0)
+            normalized = score / top * 100 if top else 0.0
+        else:
+            normalized = float(score)
+        entry = students.setdefault(member.student_id, [member, 0, 0, 0, 0.0])
+        entry[1] += 1
+        entry[2] += solved
+        entry[3] += score
+        entry[4] += normalized
+
+    ordered = sorted(
+        students.values(),
+        key=lambda entry: (-entry[4], -entry[2], entry[0].last_name, entry[0].first_name)
+    )
+    leaderboard = []
+    for position, (member, groups, solved, score, normalized) in enumerate(ordered, start=1):
+        rank = position
+        if leaderboard and leaderboard[-1].normalized_score == normalized:
+            rank = leaderboard[-1].rank
+        leaderboard.append(EventLeaderboardRow(
+            rank, member.student_id, member.last_name, member.first_name, member.school_name,
+            groups, solved, score, normalized,
+        ))
+    return leaderboard
+
+
+def event_leaderboard_cache_stats() -> Dict[str, int]:
+    with _cache_lock:
+        return dict(_cache_stats, events=len(_cache))
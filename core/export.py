@@ -0,0 +1,264 @@
+import argparse
+import csv
+import importlib.util
+import io
+import re
+import tempfile
+from itertools import groupby
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+EXPORT_BATCH_SIZE = 2000
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+CSV_ENCODING = "utf-8-sig"
+CSV_MIME = "text/csv"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+SHEET_TITLE_LENGTH = 31
+
+Rows = Iterator[List]
+Sheets = Iterable[Tuple[str, Rows]]
+
+
+def _stream(db: "Session", statement):
+    return db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+
+def _lesson_columns(db: "Session", lesson_id: int, num_participants: int) -> List[Tuple[int, str, int]]:
+    from sqlalchemy import select
+    from sqlalchemy.sql import func
+    from .models import LessonColumn, Result
+
+    solved_counts = select(
+        Result.column_id.label("column_id"), func.count(Result.result_id).label("solved_count")
+    ).where(Result.lesson_id == lesson_id).group_by(Result.column_id).subquery()
+    rows = db.execute(
+        select(LessonColumn.column_id, LessonColumn.column_label, func.coalesce(solved_counts.c.solved_count, 0))
+        .outerjoin(solved_counts, solved_counts.c.column_id == LessonColumn.column_id)
+        .where(LessonColumn.lesson_id == lesson_id)
+        .order_by(LessonColumn.display_order)
+    ).all()
+    return [(column_id, label, num_participants - solved + 1) for column_id, label, solved in rows]
+
+
+def lesson_conduit_rows(db: "Session", lesson_id: int) -> Rows:
+    from sqlalchemy import and_, select
+    from sqlalchemy.sql import func
+    from .models import Lesson, Participant, Result, Student
+
+    group_id = db.execute(select(Lesson.group_id).where(Lesson.lesson_id == lesson_id)).scalar()
+    num_participants = db.execute(
+        select(func.count(Participant.participation_id)).where(Participant.group_id == group_id)
+    ).scalar() or 0
+    columns = _lesson_columns(db, lesson_id, num_participants)
+    position = {column_id: i for i, (column_id, _, _) in enumerate(columns)}
+
+    yield ["ID ученика", "Фамилия", "Имя"] + [label for _, label, _ in columns] + [
+        "Задач решено (занятие)", "Рейтинг (занятие)"
+    ]
+    if group_id is None:
+        return
+    rows = _stream(db, select(Student.student_id, Student.last_name, Student.first_name, Result.column_id)
+        .join(Participant, Participant.student_id == Student.student_id)
+        .outerjoin(Result, and_(Result.student_id == Student.student_id, Result.lesson_id == lesson_id))
+        .where(Participant.group_id == group_id)
+        .order_by(Student.last_name, Student.first_name, Student.student_id))
+    for (student_id, last_name, first_name), student_rows in groupby(rows, key=lambda row: tuple(row[:3])):
+        marks = [0] * len(columns)
+        for row in student_rows:
+            if row.column_id in position:
+                marks[position[row.column_id]] = 1
+        score = sum(rating for mark, (_, _, rating) in zip(marks, columns) if mark)
+        yield [student_id, last_name, first_name] + marks + [sum(marks), score]
+
+
+def group_results_rows(db: "Session", group_id: int) -> Rows:
+    from sqlalchemy import select
+    from .models import Lesson, LessonColumn, Result, Student
+
+    yield ["Дата", "Тема", "Раздел", "Задача", "ID ученика", "Фамилия", "Имя"]
+    rows = _stream(db, select(
+        Lesson.lesson_date, Lesson.topic, Lesson.subject_area, LessonColumn.column_label,
+        Student.student_id, Student.last_name, Student.first_name,
+    ).select_from(Result).join(
+        LessonColumn, LessonColumn.column_id == Result.column_id
+    ).join(
+        Lesson, Lesson.lesson_id == Result.lesson_id
+    ).join(
+        Student, Student.student_id == Result.student_id
+    ).where(
+        Lesson.group_id == group_id
+    ).order_by(Lesson.lesson_date, Lesson.lesson_id, LessonColumn.display_order, Student.last_name, Student.first_name))
+    for lesson_date, topic, subject_area, label, student_id, last_name, first_name in rows:
+        yield [lesson_date, topic, subject_area.value, label, student_id, last_name, first_name]
+
+
+def group_leaderboard_rows(db: "Session", group_id: int) -> Rows:
+    from sqlalchemy import select
+    from .analysis import calculate_group_leaderboard
+    from .models import Participant, Student
+
+    leaderboard = calculate_group_leaderboard(db, group_id)
+    students = db.execute(
+        select(Student.student_id, Student.last_name, Student.first_name, Student.school_name)
+        .join(Participant, Participant.student_id == Student.student_id)
+        .where(Participant.group_id == group_id)
+    ).all()
+    ranked = sorted(students, key=lambda s: (-leaderboard.get(s.student_id, (0, 0))[1], s.last_name, s.first_name))
+    yield ["Место", "ID ученика", "Фамилия", "Имя", "Школа", "Задач решено (группа)", "Общий балл (группа)"]
+    for place, student in enumerate(ranked, start=1):
+        total_solved, total_score = leaderboard.get(student.student_id, (0, 0))
+        yield [place, student.student_id, student.last_name, student.first_name, student.school_name or "",
+               total_solved, total_score]
+
+
+def group_lesson_sheets(db: "Session", group_id: int) -> Sheets:
+    from sqlalchemy import select
+    from .models import Lesson
+
+    yield "Итоги", group_leaderboard_rows(db, group_id)
+    lessons = db.execute(
+        select(Lesson.lesson_id, Lesson.lesson_date, Lesson.topic)
+        .where(Lesson.group_id == group_id)
+        .order_by(Lesson.lesson_date, Lesson.lesson_id)
+    ).all()
+    for lesson_id, lesson_date, topic in lessons:
+        yield f"{lesson_date} {topic}", lesson_conduit_rows(db, lesson_id)
+
+
+def olympiad_results_rows(db: "Session", olympiad_id: int) -> Rows:
+    from sqlalchemy import select
+    from .models import OlympiadResult, Student
+
+    yield ["ID результата", "ID ученика", "Фамилия", "Имя", "Школа", "Награда", "Балл", "Детали", "Ссылка"]
+    rows = _stream(db, select(
+        OlympiadResult.olympiad_result_id, Student.student_id, Student.last_name, Student.first_name,
+        Student.school_name, OlympiadResult.award, OlympiadResult.score, OlympiadResult.details,
+        OlympiadResult.result_document_link,
+    ).join(
+        Student, Student.student_id == OlympiadResult.student_id
+    ).where(
+        OlympiadResult.olympiad_id == olympiad_id
+    ).order_by(Student.last_name, Student.first_name, OlympiadResult.olympiad_result_id))
+    for result_id, student_id, last_name, first_name, school, award, score, details, link in rows:
+        yield [result_id, student_id, last_name, first_name, school or "", award.value, score, details or "", link or ""]
+
+
+def write_csv(rows: Iterable[Sequence], stream: TextIO) -> int:
+    writer = csv.writer(stream, lineterminator="\n")
+    written = 0
+    for row in rows:
+        writer.writerow(row)
+        written += 1
+    return written
+
+
+def excel_available() -> bool:
+    return importlib.util.find_spec("openpyxl") is not None
+
+
+def _sheet_title(title: str, used: set) -> str:
+    base = re.sub(r"[\[\]:*?/\\]", "-", title).strip("'") or "Лист"
+    base = base[:SHEET_TITLE_LENGTH]
+    candidate, suffix = base, 2
+    while candidate.lower() in used:
+        tail = f" ({suffix})"
+        candidate = base[:SHEET_TITLE_LENGTH - len(tail)] + tail
+        suffix += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def write_xlsx(sheets: Sheets, stream: BinaryIO) -> int:
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("Для выгрузки в Excel установите openpyxl: pip install 'olympiad-tracker[excel]'")
+
+    workbook = Workbook(write_only=True)
+    used_titles = set()
+    written = 0
+    for title, rows in sheets:
+        worksheet = workbook.create_sheet(_sheet_title(title, used_titles))
+        for row in rows:
+            worksheet.append(list(row))
+            written += 1
+    if not used_titles:
+        workbook.create_sheet("Лист")
+    workbook.save(stream)
+    return written
+
+
+def spool_csv(rows: Iterable[Sequence]) -> BinaryIO:
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    text = io.TextIOWrapper(spooled, encoding=CSV_ENCODING, newline="")
+    write_csv(rows, text)
+    text.flush()
+    text.detach()
+    spooled.seek(0)
+    return spooled
+
+
+def spool_xlsx(sheets: Sheets) -> BinaryIO:
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    write_xlsx(sheets, spooled)
+    spooled.seek(0)
+    return spooled
+
+
+def file_name(*parts) -> str:
+    name = "_".join(str(part) for part in parts if part not in (None, ""))
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "export"
+
+
+def _export_targets(db: "Session", kind: str, entity_id: int) -> Tuple[Callable[[], Rows], Callable[[], Sheets]]:
+    if kind == "lesson":
+        return (lambda: lesson_conduit_rows(db, entity_id),
+                lambda: [(f"Занятие {entity_id}", lesson_conduit_rows(db, entity_id))])
+    if kind == "group":
+        return lambda: group_results_rows(db, entity_id), lambda: group_lesson_sheets(db, entity_id)
+    if kind == "leaderboard":
+        return (lambda: group_leaderboard_rows(db, entity_id),
+                lambda: [("Итоги", group_leaderboard_rows(db, entity_id))])
+    return (lambda: olympiad_results_rows(db, entity_id),
+            lambda: [(f"Олимпиада {entity_id}", olympiad_results_rows(db, entity_id))])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Выгрузка кондуитов, итогов групп и результатов олимпиад в CSV или Excel.")
+    parser.add_argument("kind", choices=["lesson", "group", "leaderboard", "olympiad"],
+                        help="что выгружать: кондуит занятия, все результаты группы, итоги группы или результаты олимпиады")
+    parser.add_argument("entity_id", type=int, help="ID занятия, группы или олимпиады")
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv",
+                        help="csv: одна таблица (для группы — длинный формат); xlsx: для группы — лист на каждое занятие")
+    parser.add_argument("--output", "-o", help="файл для записи (по умолчанию имя формируется автоматически)")
+    args = parser.parse_args(argv)
+
+    from . import migrate
+    from .models import Lesson, Olympiad, SessionLocal, StudyGroup
+
+    migrate.upgrade()
+    output = args.output or file_name(args.kind, args.entity_id) + f".{args.format}"
+    entity_tables = {"lesson": Lesson, "group": StudyGroup, "leaderboard": StudyGroup, "olympiad": Olympiad}
+    with SessionLocal() as db:
+        if db.get(entity_tables[args.kind], args.entity_id) is None:
+            print(f"Объект {args.kind} с ID {args.entity_id} не найден.")
+            return 1
+        table_rows, sheets = _export_targets(db, args.kind, args.entity_id)
+        try:
+            if args.format == "csv":
+                with open(output, "w", encoding=CSV_ENCODING, newline="") as stream:
+                    written = write_csv(table_rows(), stream)
+            else:
+                with open(output, "wb") as stream:
+                    written = write_xlsx(sheets(), stream)
+        except RuntimeError as e:
+            print(e)
+            return 1
+    print(f"Записано строк: {written} -> {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
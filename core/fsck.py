@@ -0,0 +1,228 @@
+import argparse
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import and_, bindparam, delete, exists, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from .models import (
+    Event, EventParticipant, Lesson, LessonColumn, Olympiad, OlympiadResult,
+    Participant, Result, Student, StudyGroup
+)
+
+
+class Check(NamedTuple):
+    name: str
+    description: str
+    violations: Callable
+    repair: Callable
+    repair_description: str
+
+
+class CheckResult(NamedTuple):
+    name: str
+    description: str
+    count: int
+    sample: List[int]
+    seconds: float
+
+
+def _missing(parent_key, child_key):
+    return ~exists().where(parent_key == child_key)
+
+
+def _orphans(key, *conditions):
+    return lambda: select(key).where(*conditions)
+
+
+def _delete_where(table, key, violations):
+    return lambda db: db.execute(
+        delete(table).where(key.in_(violations().scalar_subquery())).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _result_lesson_mismatch():
+    return select(Result.result_id).join(
+        LessonColumn, LessonColumn.column_id == Result.column_id
+    ).where(LessonColumn.lesson_id != Result.lesson_id)
+
+
+def _repair_result_lesson_mismatch(db: Session) -> int:
+    column_lesson = select(LessonColumn.lesson_id).where(LessonColumn.column_id == Result.column_id).scalar_subquery()
+    return db.execute(
+        update(Result).where(Result.result_id.in_(_result_lesson_mismatch().scalar_subquery()))
+        .values(lesson_id=column_lesson).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _result_non_member():
+    return select(Result.result_id).join(
+        Lesson, Lesson.lesson_id == Result.lesson_id
+    ).where(~exists().where(and_(Participant.student_id == Result.student_id, Participant.group_id == Lesson.group_id)))
+
+
+def _repair_result_non_member(db: Session) -> int:
+    missing_memberships = select(Result.student_id, Lesson.group_id).join(
+        Lesson, Lesson.lesson_id == Result.lesson_id
+    ).where(
+        ~exists().where(and_(Participant.student_id == Result.student_id, Participant.group_id == Lesson.group_id))
+    ).distinct()
+    return db.execute(insert(Participant).from_select(["student_id", "group_id"], missing_memberships)).rowcount
+
+
+def _display_order_gaps():
+    return select(LessonColumn.lesson_id).group_by(LessonColumn.lesson_id).having(
+        (func.min(LessonColumn.display_order) != 0)
+        | (func.max(LessonColumn.display_order) != func.count(LessonColumn.column_id) - 1)
+    )
+
+
+def _repair_display_order_gaps(db: Session) -> int:
+    position = func.row_number().over(
+        partition_by=LessonColumn.lesson_id, order_by=(LessonColumn.display_order, LessonColumn.column_id)
+    )
+    renumbered = db.execute(
+        select(LessonColumn.column_id, position - 1).where(LessonColumn.lesson_id.in_(_display_order_gaps().scalar_subquery()))
+    ).all()
+    if not renumbered:
+        return 0
+    columns = LessonColumn.__table__
+    db.connection().execute(
+        update(columns).where(columns.c.column_id == bindparam("target_column_id"))
+        .values(display_order=bindparam("parked_order")),
+        [{"target_column_id": cid, "parked_order": -1 - new_order} for cid, new_order in renumbered],
+    )
+    db.execute(
+        update(LessonColumn).where(LessonColumn.display_order < 0)
+        .values(display_order=-1 - LessonColumn.display_order).execution_options(synchronize_session=False)
+    )
+    return len(renumbered)
+
+
+_lessons_without_group = _orphans(Lesson.lesson_id, _missing(StudyGroup.group_id, Lesson.group_id))
+_columns_without_lesson = _orphans(LessonColumn.column_id, _missing(Lesson.lesson_id, LessonColumn.lesson_id))
+_results_without_column = _orphans(Result.result_id, _missing(LessonColumn.column_id, Result.column_id))
+_results_without_student = _orphans(Result.result_id, _missing(Student.student_id, Result.student_id))
+_participants_orphaned = _orphans(
+    Participant.participation_id,
+    _missing(Student.student_id, Participant.student_id) | _missing(StudyGroup.group_id, Participant.group_id),
+)
+_event_participants_orphaned = _orphans(
+    EventParticipant.event_participation_id,
+    _missing(Student.student_id, EventParticipant.student_id) | _missing(Event.event_id, EventParticipant.event_id),
+)
+_olympiad_results_orphaned = _orphans(
+    OlympiadResult.olympiad_result_id,
+    _missing(Student.student_id, OlympiadResult.student_id) | _missing(Olympiad.olympiad_id, OlympiadResult.olympiad_id),
+)
+
+CHECKS: List[Check] = [
+    Check("lessons_without_group", "Занятия несуществующих групп",
+          _lessons_without_group, _delete_where(Lesson, Lesson.lesson_id, _lessons_without_group), "удалить"),
+    Check("columns_without_lesson", "Колонки несуществующих занятий",
+          _columns_without_lesson, _delete_where(LessonColumn, LessonColumn.column_id, _columns_without_lesson), "удалить"),
+    Check("results_without_column", "Результаты по несуществующим колонкам",
+          _results_without_column, _delete_where(Result, Result.result_id, _results_without_column), "удалить"),
+    Check("results_without_student", "Результаты несуществующих учеников",
+          _results_without_student, _delete_where(Result, Result.result_id, _results_without_student), "удалить"),
+    Check("result_lesson_mismatch", "lesson_id результата не совпадает с занятием колонки",
+          _result_lesson_mismatch, _repair_result_lesson_mismatch, "взять lesson_id из колонки"),
+    Check("participants_orphaned", "Участия несуществующих учеников или групп",
+          _participants_orphaned, _delete_where(Participant, Participant.participation_id, _participants_orphaned), "удалить"),
+    Check("result_non_member", "Результаты учеников, не состоящих в группе занятия",
+          _result_non_member, _repair_result_non_member, "добавить ученика в группу"),
+    Check("display_order_gaps", "Пропуски в порядке колонок занятия (ID занятий)",
+          _display_order_gaps, _repair_display_order_gaps, "перенумеровать 0..n-1"),
+    Check("event_participants_orphaned", "Участия в несуществующих мероприятиях",
+          _event_participants_orphaned,
+          _delete_where(EventParticipant, EventParticipant.event_participation_id, _event_participants_orphaned), "удалить"),
+    Check("olympiad_results_orphaned", "Результаты несуществующих олимпиад или учеников",
+          _olympiad_results_orphaned,
+          _delete_where(OlympiadResult, OlympiadResult.olympiad_result_id, _olympiad_results_orphaned), "удалить"),
+]
+
+RESULT_CHECKS = {
+    "lessons_without_group", "columns_without_lesson", "results_without_column",
+    "results_without_student", "result_lesson_mismatch", "result_non_member",
+}
+
+
+def run_check(db: Session, check: Check, sample_size: int = 5) -> CheckResult:
+    started = time.perf_counter()
+    violations = check.violations().subquery()
+    count = db.execute(select(func.count()).select_from(violations)).scalar() or 0
+    sample = []
+    if count and sample_size:
+        sample = list(db.execute(select(violations.c[0]).order_by(violations.c[0]).limit(sample_size)).scalars())
+    return CheckResult(check.name, check.description, count, sample, time.perf_counter() - started)
+
+
+def run_checks(db: Session, sample_size: int = 5, names: Optional[List[str]] = None) -> List[CheckResult]:
+    return [run_check(db, check, sample_size) for check in CHECKS if names is None or check.name in names]
+
+
+def repair(db: Session, names: Optional[List[str]] = None) -> Dict[str, int]:
+    from . import cache, group_totals, olympiad_analytics, problem_index
+
+    repaired = {}
+    for check in CHECKS:
+        if names is not None and check.name not in names:
+            continue
+        if db.execute(select(check.violations().exists())).scalar():
+            repaired[check.name] = check.repair(db)
+    if RESULT_CHECKS.intersection(repaired):
+        problem_index.rebuild_problem_stats(db)
+        group_totals.rebuild_group_totals(db)
+    if "olympiad_results_orphaned" in repaired:
+        olympiad_analytics.refresh_olympiad_summary(db)
+    if repaired:
+        cache.bump_groups(db)
+    return repaired
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Проверка целостности данных о результатах.")
+    parser.add_argument("--repair", action="store_true", help="исправить найденные нарушения в одной транзакции")
+    parser.add_argument("--check", action="append", dest="names", choices=[check.name for check in CHECKS],
+                        help="выполнить только указанные проверки (можно указать несколько раз)")
+    parser.add_argument("--sample", type=int, default=5, help="сколько ID нарушений показывать")
+    args = parser.parse_args(argv)
+
+    from .models import SessionLocal
+
+    with SessionLocal() as db:
+        results = run_checks(db, args.sample, args.names)
+        for result in results:
+            status = "OK" if result.count == 0 else f"{result.count} нарушений"
+            line = f"  {result.name:<30}{status:<20}{result.seconds * 1000:>8.1f} мс  {result.description}"
+            if result.sample:
+                line += f" (например: {', '.join(map(str, result.sample))})"
+            print(line)
+        broken = [result.name for result in results if result.count]
+        if not broken:
+            print("Нарушений не найдено.")
+            return 0
+        if not args.repair:
+            print("Для исправления запустите с флагом --repair.")
+            return 1
+
+        try:
+            repaired = repair(db, args.names)
+            remaining = [result for result in run_checks(db, 0, args.names) if result.count]
+            if remaining:
+                raise RuntimeError(f"после исправления остались нарушения: {', '.join(r.name for r in remaining)}")
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Исправление отменено: {e}")
+            return 2
+        descriptions = {check.name: check.repair_description for check in CHECKS}
+        for name, affected in repaired.items():
+            print(f"  {name}: {descriptions[name]} — затронуто строк: {affected}")
+        print("Исправления сохранены.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, insert, literal, select, update
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql import func
+
+from . import bulk
+from .models import Lesson, LessonColumn, Participant, Result, StudentGroupTotal, StudyGroup
+
+
+class TotalsMismatch(NamedTuple):
+    group_id: int
+    student_id: int
+    stored: Optional[Tuple[int, int]]
+    expected: Optional[Tuple[int, int]]
+
+
+def _update_totals(db: Session, *conditions, solved_delta=0, score_delta=0) -> None:
+    db.execute(update(StudentGroupTotal).where(*conditions).values(
+        total_solved=StudentGroupTotal.total_solved + solved_delta,
+        total_score=StudentGroupTotal.total_score + score_delta,
+    ).execution_options(synchronize_session=False))
+
+
+def _column_context(db: Session, column_id: int) -> Tuple[Optional[int], int, int]:
+    group_id = db.execute(
+        select(Lesson.group_id).join(LessonColumn, LessonColumn.lesson_id == Lesson.lesson_id).where(LessonColumn.column_id == column_id)
+    ).scalar()
+    if group_id is None:
+        return None, 0, 0
+    members, solved = db.execute(select(
+        select(func.count(Participant.participation_id)).where(Participant.group_id == group_id).scalar_subquery(),
+        select(func.count(Result.result_id)).where(Result.column_id == column_id).scalar_subquery(),
+    )).one()
+    return group_id, members or 0, solved or 0
+
+
+def _other_solvers(column_id: int, student_id: int):
+    return select(Result.student_id).where(Result.column_id == column_id, Result.student_id != student_id)
+
+
+def record_result_added(db: Session, student_id: int, column_id: int) -> None:
+    group_id, members, solved = _column_context(db, column_id)
+    if group_id is None:
+        return
+    in_group = StudentGroupTotal.group_id == group_id
+    _update_totals(db, in_group, StudentGroupTotal.student_id.in_(_other_solvers(column_id, student_id)), score_delta=-1)
+    _update_totals(db, in_group, StudentGroupTotal.student_id == student_id, solved_delta=1, score_delta=members - solved + 1)
+
+
+def record_result_deleted(db: Session, student_id: int, column_id: int) -> None:
+    group_id, members, solved = _column_context(db, column_id)
+    if group_id is None:
+        return
+    in_group = StudentGroupTotal.group_id == group_id
+    _update_totals(db, in_group, StudentGroupTotal.student_id.in_(_other_solvers(column_id, student_id)), score_delta=1)
+    _update_totals(db, in_group, StudentGroupTotal.student_id == student_id, solved_delta=-1, score_delta=-(members - solved))
+
+
+def _member_totals(group_id: int, student_id: int):
+    solvers = aliased(Result)
+    solved_count = select(func.count(solvers.result_id)).where(solvers.column_id == Result.column_id).scalar_subquery()
+    members = select(func.count(Participant.participation_id)).where(Participant.group_id == group_id).scalar_subquery()
+    return select(
+        literal(student_id), literal(group_id), func.count(Result.result_id),
+        func.coalesce(func.sum(members - solved_count + 1), 0),
+    ).join(
+        Lesson, Lesson.lesson_id == Result.lesson_id
+    ).where(Result.student_id == student_id, Lesson.group_id == group_id)
+
+
+def record_member_added(db: Session, group_id: int, student_id: int) -> None:
+    _update_totals(
+        db, StudentGroupTotal.group_id == group_id, StudentGroupTotal.student_id != student_id,
+        score_delta=StudentGroupTotal.total_solved,
+    )
+    db.execute(delete(StudentGroupTotal).where(
+        StudentGroupTotal.group_id == group_id, StudentGroupTotal.student_id == student_id
+    ).execution_options(synchronize_session=False))
+    db.execute(insert(StudentGroupTotal).from_select(
+        ["student_id", "group_id", "total_solved", "total_score"], _member_totals(group_id, student_id)
+    ))
+
+
+def write_group_totals(db: Session, leaderboards: Dict[int, Dict[int, Tuple[int, int]]]) -> int:
+    group_ids = list(leaderboards.keys())
+    if not group_ids:
+        return 0
+    db.execute(delete(StudentGroupTotal).where(StudentGroupTotal.group_id.in_(group_ids)).execution_options(synchronize_session=False))
+    rows = [
+        {"student_id": student_id, "group_id": group_id, "total_solved": total_solved, "total_score": total_score}
+        for group_id, leaderboard in leaderboards.items()
+        for student_id, (total_solved, total_score) in leaderboard.items()
+    ]
+    if rows:
+        bulk.bulk_insert(db, StudentGroupTotal.__table__, rows)
+    return len(rows)
+
+
+def _active_group_ids(db: Session, group_ids: Optional[Iterable[int]] = None) -> List[int]:
+    query = select(StudyGroup.group_id).where(StudyGroup.archive_season.is_(None)).order_by(StudyGroup.group_id)
+    if group_ids is not None:
+        query = query.where(StudyGroup.group_id.in_(list(set(group_ids))))
+    return list(db.execute(query).scalars())
+
+
+def rebuild_group_totals(db: Session, group_ids: Optional[Iterable[int]] = None) -> int:
+    from .analysis import calculate_group_leaderboard
+
+    return write_group_totals(db, {
+        group_id: calculate_group_leaderboard.uncached(db, group_id) for group_id in _active_group_ids(db, group_ids)
+    })
+
+
+def groups_missing_totals(db: Session) -> List[int]:
+    members = select(
+        Participant.group_id.label("group_id"), func.count(Participant.participation_id).label("members")
+    ).group_by(Participant.group_id).subquery()
+    totals = select(
+        StudentGroupTotal.group_id.label("group_id"), func.count(StudentGroupTotal.total_id).label("totals")
+    ).group_by(StudentGroupTotal.group_id).subquery()
+    return list(db.execute(
+        select(StudyGroup.group_id)
+        .outerjoin(members, members.c.group_id == StudyGroup.group_id)
+        .outerjoin(totals, totals.c.group_id == StudyGroup.group_id)
+        .where(StudyGroup.archive_season.is_(None), func.coalesce(members.c.members, 0) != func.coalesce(totals.c.totals, 0))
+    ).scalars())
+
+
+def check_group_totals(db: Session, group_ids: Optional[Iterable[int]] = None) -> List[TotalsMismatch]:
+    from .analysis import calculate_group_leaderboard
+
+    mismatches = []
+    for group_id in _active_group_ids(db, group_ids):
+        stored = {
+            student_id: (total_solved, total_score)
+            for student_id, total_solved, total_score in db.execute(
+                select(StudentGroupTotal.student_id, StudentGroupTotal.total_solved, StudentGroupTotal.total_score)
+                .where(StudentGroupTotal.group_id == group_id)
+            )
+        }
+        expected = calculate_group_leaderboard.uncached(db, group_id)
+        for student_id in sorted(set(stored) | set(expected)):
+            if stored.get(student_id) != expected.get(student_id):
+                mismatches.append(TotalsMismatch(group_id, student_id, stored.get(student_id), expected.get(student_id)))
+    return mismatches
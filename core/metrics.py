@@ -0,0 +1,240 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+METRICS_HOST = os.environ.get("OLYMP_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("OLYMP_METRICS_PORT", "9464"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+PAGES = ("groups", "students", "conduit", "events", "olympiads", "problems")
+WRITE_PREFIXES = ("create_", "add_", "update_", "delete_", "remove_", "set_", "mark_", "link_", "replace_", "clone_")
+
+_registry: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_name: Optional[str] = None, label_values: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_name = label_name
+        self._children: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        for value in (label_values if label_name else [""]):
+            self.register(value)
+        _registry.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def register(self, label_value: str):
+        with self._lock:
+            child = self._children.get(label_value)
+            if child is None:
+                child = self._children[label_value] = self._new_child()
+            return child
+
+    def labels(self, label_value: str):
+        return self._children[label_value]
+
+    def _label_pairs(self, label_value: str) -> List[Tuple[str, str]]:
+        return [(self.label_name, label_value)] if self.label_name else []
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: int = 1) -> None:
+        self._children[""].inc(amount)
+
+    def _samples(self) -> Iterator[str]:
+        for label_value, child in sorted(self._children.items()):
+            yield f"{self.name}{_format_labels(self._label_pairs(label_value))} {_format_value(child.value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_name: Optional[str] = None,
+                 label_values: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, label_name, label_values)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[""].observe(value)
+
+    def _samples(self) -> Iterator[str]:
+        for label_value, child in sorted(self._children.items()):
+            counts, total = child.snapshot()
+            pairs = self._label_pairs(label_value)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(pairs + [('le', _format_value(float(bound)))])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(pairs)} {cumulative}"
+
+
+RESULTS_WRITTEN = Counter(
+    "olymp_results_written_total", "Отметки о решении задач, записанные или снятые в кондуите.",
+    "operation", ("add", "delete"),
+)
+CONDUIT_SAVES = Counter(
+    "olymp_conduit_saves_total", "Сохранения кондуита по итогу.", "outcome", ("ok", "error", "empty"),
+)
+CONDUIT_SAVE_CHANGES = Histogram(
+    "olymp_conduit_save_changes", "Число измененных ячеек в одном сохранении кондуита.", buckets=SIZE_BUCKETS,
+)
+CRUD_WRITE_SECONDS = Histogram("olymp_crud_write_seconds", "Длительность операций записи core.crud.", "function")
+ANALYSIS_SECONDS = Histogram("olymp_analysis_seconds", "Длительность функций core.analysis.", "function")
+PAGE_RENDER_SECONDS = Histogram("olymp_page_render_seconds", "Длительность отрисовки страниц.", "page", PAGES)
+
+
+def timed(histogram: Histogram, label_value: str) -> Callable[[Callable], Callable]:
+    child = histogram.register(label_value)
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def instrument_public_functions(namespace: Dict[str, object], histogram: Histogram,
+                                prefixes: Optional[Tuple[str, ...]] = None) -> None:
+    module_name = namespace["__name__"]
+    for attribute, value in list(namespace.items()):
+        if (attribute.startswith("_") or not callable(value) or isinstance(value, type)
+                or getattr(value, "__module__", None) != module_name):
+            continue
+        if prefixes is None or attribute.startswith(prefixes):
+            namespace[attribute] = timed(histogram, attribute)(value)
+
+
+def register_collector(collector: Callable[[], Iterable[str]]) -> None:
+    _collectors.append(collector)
+
+
+def _cache_samples() -> Iterator[str]:
+    from .cache import cache_stats
+
+    stats = cache_stats()
+    yield "# HELP olymp_analysis_cache_lookups_total Обращения к кэшу функций анализа."
+    yield "# TYPE olymp_analysis_cache_lookups_total counter"
+    for outcome, key in (("hit", "hits"), ("miss", "misses")):
+        yield f"olymp_analysis_cache_lookups_total{_format_labels([('result', outcome)])} {stats[key]}"
+    yield "# HELP olymp_analysis_cache_evictions_total Вытеснения из кэша функций анализа."
+    yield "# TYPE olymp_analysis_cache_evictions_total counter"
+    yield f"olymp_analysis_cache_evictions_total {stats['evictions']}"
+    yield "# HELP olymp_analysis_cache_entries Записей в кэше функций анализа."
+    yield "# TYPE olymp_analysis_cache_entries gauge"
+    yield f"olymp_analysis_cache_entries {stats['entries']}"
+
+
+register_collector(_cache_samples)
+
+
+def render() -> str:
+    lines = [line for metric in list(_registry) for line in metric.render()]
+    lines.extend(line for collector in list(_collectors) for line in collector())
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="olymp-metrics", daemon=True).start()
+    return server
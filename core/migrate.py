@@ -0,0 +1,105 @@
+import argparse
+from typing import List, Optional
+
+
+def _backfill_olympiad_summary(db) -> None:
+    from sqlalchemy import exists, select
+    from .models import OlympiadResult, OlympiadResultSummary
+    from .olympiad_analytics import refresh_olympiad_summary
+
+    has_results = db.execute(select(exists().where(OlympiadResult.olympiad_result_id.isnot(None)))).scalar()
+    has_summary = db.execute(select(exists().where(OlympiadResultSummary.summary_id.isnot(None)))).scalar()
+    if has_results and not has_summary:
+        refresh_olympiad_summary(db)
+
+
+def _backfill_problem_stats(db) -> None:
+    from sqlalchemy import select
+    from .models import Problem, ProblemStat
+    from .problem_index import rebuild_problem_stats
+
+    missing = list(db.execute(
+        select(Problem.problem_id).outerjoin(ProblemStat, ProblemStat.problem_id == Problem.problem_id).where(ProblemStat.problem_stat_id.is_(None))
+    ).scalars())
+    if missing:
+        rebuild_problem_stats(db, missing)
+
+
+def _backfill_student_name_keys(db) -> None:
+    from sqlalchemy import bindparam, select, update
+    from .models import Student, student_name_key
+
+    missing = db.execute(
+        select(Student.student_id, Student.first_name, Student.last_name).where(Student.name_key.is_(None))
+    ).all()
+    if missing:
+        students = Student.__table__
+        db.connection().execute(
+            update(students).where(students.c.student_id == bindparam("target_student_id"))
+            .values(name_key=bindparam("computed_name_key")),
+            [
+                {"target_student_id": student_id, "computed_name_key": student_name_key(first_name, last_name)}
+                for student_id, first_name, last_name in missing
+            ],
+        )
+
+
+def _backfill_group_totals(db) -> None:
+    from .group_totals import groups_missing_totals, rebuild_group_totals
+
+    missing = groups_missing_totals(db)
+    if missing:
+        rebuild_group_totals(db, missing)
+
+
+def _add_missing_columns(connection, metadata) -> None:
+    from sqlalchemy import inspect, text
+
+    inspector = inspect(connection)
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+            print(f"  Добавлена колонка {table.name}.{column.name}")
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+
+
+def upgrade(engine=None) -> None:
+    from sqlalchemy.orm import Session
+    from .models import Base, engine as default_engine
+
+    engine = engine or default_engine
+    with engine.begin() as connection:
+        Base.metadata.create_all(bind=connection)
+        _add_missing_columns(connection, Base.metadata)
+    with Session(bind=engine) as db:
+        _backfill_olympiad_summary(db)
+        _backfill_problem_stats(db)
+        _backfill_student_name_keys(db)
+        _backfill_group_totals(db)
+        db.commit()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Создание и обновление схемы базы данных.")
+    parser.parse_args(argv)
+
+    from sqlalchemy.engine import make_url
+    from .models import DATABASE_URL
+
+    print(f"Проверка схемы базы данных {make_url(DATABASE_URL).render_as_string(hide_password=True)}...")
+    upgrade()
+    print("Схема базы данных актуальна.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
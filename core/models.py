@@ -1,9 +1,12 @@
 import os
 import enum
+import sqlite3
+from typing import Optional
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Text, Date, DateTime, Boolean,
-    ForeignKey, UniqueConstraint, Enum, Float
+    create_engine, event, Column, Integer, String, Text, Date, DateTime, Boolean,
+    ForeignKey, UniqueConstraint, Enum, Float, Index
 )
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import relationship, sessionmaker, declarative_base
 from sqlalchemy.sql import func
 
@@ -12,7 +15,38 @@ Base = declarative_base()
 DATABASE_FILENAME = "olympiad_tracker.db"
 _current_dir = os.path.dirname(os.path.abspath(__file__))
 _project_root = os.path.dirname(_current_dir)
-DATABASE_URL = f"sqlite:///{os.path.join(_project_root, DATABASE_FILENAME)}"
+DATABASE_PATH = os.path.join(_project_root, DATABASE_FILENAME)
+DATABASE_URL = os.environ.get("OLYMP_DATABASE_URL", f"sqlite:///{DATABASE_PATH}")
+DATABASE_BACKEND = make_url(DATABASE_URL).get_backend_name()
+if DATABASE_BACKEND == "sqlite":
+    DATABASE_PATH = os.path.abspath(make_url(DATABASE_URL).database)
+    READONLY_DATABASE_URL = f"sqlite:///file:{DATABASE_PATH}?mode=ro&uri=true"
+else:
+    READONLY_DATABASE_URL = DATABASE_URL
+
+
+def connect_args(readonly: bool = False, threaded: bool = False) -> dict:
+    if DATABASE_BACKEND == "sqlite":
+        return {"check_same_thread": False} if threaded else {}
+    if DATABASE_BACKEND == "postgresql" and readonly:
+        return {"options": "-c default_transaction_read_only=on"}
+    return {}
+
+
+@event.listens_for(Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def normalize_name(value: Optional[str]) -> str:
+    return " ".join((value or "").casefold().replace("ё", "е").split())
+
+
+def student_name_key(first_name: Optional[str], last_name: Optional[str]) -> str:
+    return f"{normalize_name(last_name)}|{normalize_name(first_name)}"
 
 
 class SubjectAreaEnum(enum.Enum):
@@ -68,11 +102,12 @@ class Student(Base):
     last_name = Column(String, nullable=False)
     school_name = Column(String)
     registration_date = Column(DateTime, nullable=False, server_default=func.now())
+    name_key = Column(String, index=True)
 
-    participations = relationship("Participant", back_populates="student", cascade="all, delete-orphan")
-    results = relationship("Result", back_populates="student", cascade="all, delete-orphan")
-    event_participations = relationship("EventParticipant", back_populates="student", cascade="all, delete-orphan")
-    olympiad_results = relationship("OlympiadResult", back_populates="student", cascade="all, delete-orphan")
+    participations = relationship("Participant", back_populates="student", cascade="all, delete-orphan", passive_deletes=True)
+    results = relationship("Result", back_populates="student", cascade="all, delete-orphan", passive_deletes=True)
+    event_participations = relationship("EventParticipant", back_populates="student", cascade="all, delete-orphan", passive_deletes=True)
+    olympiad_results = relationship("OlympiadResult", back_populates="student", cascade="all, delete-orphan", passive_deletes=True)
 
     __table_args__ = (
         UniqueConstraint('first_name', 'last_name', 'school_name', name='uq_student_fullname_school'),
@@ -80,19 +115,25 @@ class Student(Base):
     )
 
 
+@event.listens_for(Student, "before_insert")
+@event.listens_for(Student, "before_update")
+def _set_student_name_key(mapper, connection, student):
+    student.name_key = student_name_key(student.first_name, student.last_name)
+
+
 class Event(Base):
     __tablename__ = "Events"
 
     event_id = Column(Integer, primary_key=True)
     event_name = Column(String, nullable=False, unique=True)
-    event_type = Column(Enum(EventTypeEnum), nullable=False)
+    event_type = Column(Enum(EventTypeEnum, native_enum=False), nullable=False)
     description = Column(Text)
     start_date = Column(Date)
     end_date = Column(Date)
     organizer = Column(String)
 
-    study_groups = relationship("StudyGroup", back_populates="event")
-    participants = relationship("EventParticipant", back_populates="event", cascade="all, delete-orphan")
+    study_groups = relationship("StudyGroup", back_populates="event", passive_deletes=True)
+    participants = relationship("EventParticipant", back_populates="event", cascade="all, delete-orphan", passive_deletes=True)
 
     __table_args__ = ({'sqlite_autoincrement': True})
 
@@ -105,11 +146,13 @@ class StudyGroup(Base):
     description = Column(Text)
     start_date = Column(Date)
     end_date = Column(Date)
-    event_id = Column(Integer, ForeignKey("Events.event_id", ondelete="SET NULL"), nullable=True)
+    event_id = Column(Integer, ForeignKey("Events.event_id", ondelete="SET NULL"), nullable=True, index=True)
+    archive_season = Column(Integer, nullable=True)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     event = relationship("Event", back_populates="study_groups")
-    participants = relationship("Participant", back_populates="study_group", cascade="all, delete-orphan")
-    lessons = relationship("Lesson", back_populates="study_group", cascade="all, delete-orphan")
+    participants = relationship("Participant", back_populates="study_group", cascade="all, delete-orphan", passive_deletes=True)
+    lessons = relationship("Lesson", back_populates="study_group", cascade="all, delete-orphan", passive_deletes=True)
 
     __table_args__ = ({'sqlite_autoincrement': True})
 
@@ -119,7 +162,7 @@ class Participant(Base):
 
     participation_id = Column(Integer, primary_key=True)
     student_id = Column(Integer, ForeignKey("Students.student_id", ondelete="CASCADE"), nullable=False)
-    group_id = Column(Integer, ForeignKey("StudyGroups.group_id", ondelete="CASCADE"), nullable=False)
+    group_id = Column(Integer, ForeignKey("StudyGroups.group_id", ondelete="CASCADE"), nullable=False, index=True)
 
     student = relationship("Student", back_populates="participations")
     study_group = relationship("StudyGroup", back_populates="participants")
@@ -135,7 +178,7 @@ class EventParticipant(Base):
 
     event_participation_id = Column(Integer, primary_key=True)
     student_id = Column(Integer, ForeignKey("Students.student_id", ondelete="CASCADE"), nullable=False)
-    event_id = Column(Integer, ForeignKey("Events.event_id", ondelete="CASCADE"), nullable=False)
+    event_id = Column(Integer, ForeignKey("Events.event_id", ondelete="CASCADE"), nullable=False, index=True)
     registration_timestamp = Column(DateTime, nullable=False, server_default=func.now())
     role = Column(String, nullable=True)
 
@@ -152,31 +195,73 @@ class Lesson(Base):
     __tablename__ = "Lessons"
 
     lesson_id = Column(Integer, primary_key=True)
-    group_id = Column(Integer, ForeignKey("StudyGroups.group_id", ondelete="CASCADE"), nullable=False)
+    group_id = Column(Integer, ForeignKey("StudyGroups.group_id", ondelete="CASCADE"), nullable=False, index=True)
     lesson_date = Column(Date, nullable=False)
     topic = Column(String, nullable=False)
-    subject_area = Column(Enum(SubjectAreaEnum), nullable=False)
+    subject_area = Column(Enum(SubjectAreaEnum, native_enum=False), nullable=False)
     sheet_link = Column(String)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     study_group = relationship("StudyGroup", back_populates="lessons")
-    lesson_columns = relationship("LessonColumn", back_populates="lesson", cascade="all, delete-orphan")
-    results = relationship("Result", back_populates="lesson", cascade="all, delete-orphan")
+    lesson_columns = relationship("LessonColumn", back_populates="lesson", cascade="all, delete-orphan", passive_deletes=True)
+    results = relationship("Result", back_populates="lesson", cascade="all, delete-orphan", passive_deletes=True)
 
     __table_args__ = ({'sqlite_autoincrement': True})
 
 
+class Problem(Base):
+    __tablename__ = "Problems"
+
+    problem_id = Column(Integer, primary_key=True)
+    title = Column(String, nullable=False)
+    subject_area = Column(Enum(SubjectAreaEnum, native_enum=False), nullable=False)
+    source = Column(String)
+    statement = Column(Text)
+
+    lesson_columns = relationship("LessonColumn", back_populates="problem", passive_deletes=True)
+    stats = relationship("ProblemStat", back_populates="problem", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        UniqueConstraint('title', 'source', name='uq_problem_title_source'),
+        {'sqlite_autoincrement': True}
+    )
+
+
+class ProblemStat(Base):
+    __tablename__ = "ProblemStats"
+
+    problem_stat_id = Column(Integer, primary_key=True)
+    problem_id = Column(Integer, ForeignKey("Problems.problem_id", ondelete="CASCADE"), nullable=False, unique=True)
+    subject_area = Column(Enum(SubjectAreaEnum, native_enum=False), nullable=False)
+    times_used = Column(Integer, nullable=False, default=0)
+    participants_total = Column(Integer, nullable=False, default=0)
+    solved_total = Column(Integer, nullable=False, default=0)
+    rating_total = Column(Integer, nullable=False, default=0)
+    solve_rate = Column(Float)
+    avg_rating = Column(Float)
+
+    problem = relationship("Problem", back_populates="stats")
+
+    __table_args__ = (
+        Index('ix_problem_stats_subject_solve_rate', 'subject_area', 'solve_rate'),
+        {'sqlite_autoincrement': True}
+    )
+
+
 class LessonColumn(Base):
     __tablename__ = "LessonColumns"
 
     column_id = Column(Integer, primary_key=True)
     lesson_id = Column(Integer, ForeignKey("Lessons.lesson_id", ondelete="CASCADE"), nullable=False)
     column_label = Column(String, nullable=False)
-    problem_type = Column(Enum(ProblemTypeEnum), nullable=False, default=ProblemTypeEnum.REGULAR)
+    problem_type = Column(Enum(ProblemTypeEnum, native_enum=False), nullable=False, default=ProblemTypeEnum.REGULAR)
     display_order = Column(Integer, nullable=False)
     is_discussed = Column(Boolean, nullable=False, default=False)
+    problem_id = Column(Integer, ForeignKey("Problems.problem_id", ondelete="SET NULL"), nullable=True, index=True)
 
     lesson = relationship("Lesson", back_populates="lesson_columns")
-    results = relationship("Result", back_populates="lesson_column", cascade="all, delete-orphan")
+    results = relationship("Result", back_populates="lesson_column", cascade="all, delete-orphan", passive_deletes=True)
+    problem = relationship("Problem", back_populates="lesson_columns")
 
     __table_args__ = (
         UniqueConstraint('lesson_id', 'column_label', name='uq_lesson_column_label'),
@@ -190,7 +275,7 @@ class Result(Base):
 
     result_id = Column(Integer, primary_key=True)
     student_id = Column(Integer, ForeignKey("Students.student_id", ondelete="CASCADE"), nullable=False)
-    column_id = Column(Integer, ForeignKey("LessonColumns.column_id", ondelete="CASCADE"), nullable=False)
+    column_id = Column(Integer, ForeignKey("LessonColumns.column_id", ondelete="CASCADE"), nullable=False, index=True)
     lesson_id = Column(Integer, ForeignKey("Lessons.lesson_id", ondelete="CASCADE"), nullable=False)
     solved_timestamp = Column(DateTime, nullable=False, server_default=func.now())
 
@@ -200,6 +285,7 @@ class Result(Base):
 
     __table_args__ = (
         UniqueConstraint('student_id', 'column_id', name='uq_student_solved_column'),
+        Index('ix_results_lesson_student', 'lesson_id', 'student_id'),
         {'sqlite_autoincrement': True}
     )
 
@@ -210,11 +296,11 @@ class Olympiad(Base):
     olympiad_id = Column(Integer, primary_key=True)
     olympiad_name = Column(String, nullable=False)
     olympiad_date = Column(Date, nullable=False)
-    olympiad_level = Column(Enum(OlympiadLevelEnum), nullable=False)
+    olympiad_level = Column(Enum(OlympiadLevelEnum, native_enum=False), nullable=False)
     subject = Column(String, nullable=False)
     organizer = Column(String)
 
-    results = relationship("OlympiadResult", back_populates="olympiad", cascade="all, delete-orphan")
+    results = relationship("OlympiadResult", back_populates="olympiad", cascade="all, delete-orphan", passive_deletes=True)
 
     __table_args__ = (
         UniqueConstraint('olympiad_name', 'olympiad_date', 'subject', name='uq_olympiad_key'),
@@ -227,8 +313,8 @@ class OlympiadResult(Base):
 
     olympiad_result_id = Column(Integer, primary_key=True)
     student_id = Column(Integer, ForeignKey("Students.student_id", ondelete="CASCADE"), nullable=False)
-    olympiad_id = Column(Integer, ForeignKey("Olympiads.olympiad_id", ondelete="CASCADE"), nullable=False)
-    award = Column(Enum(AwardEnum), nullable=False)
+    olympiad_id = Column(Integer, ForeignKey("Olympiads.olympiad_id", ondelete="CASCADE"), nullable=False, index=True)
+    award = Column(Enum(AwardEnum, native_enum=False), nullable=False)
     score = Column(Float)
     details = Column(Text)
     result_document_link = Column(String)
@@ -243,9 +329,45 @@ class OlympiadResult(Base):
     )
 
 
-engine = create_engine(DATABASE_URL, echo=False)
+class StudentGroupTotal(Base):
+    __tablename__ = "StudentGroupTotals"
+
+    total_id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey("Students.student_id", ondelete="CASCADE"), nullable=False)
+    group_id = Column(Integer, ForeignKey("StudyGroups.group_id", ondelete="CASCADE"), nullable=False, index=True)
+    total_solved = Column(Integer, nullable=False, default=0)
+    total_score = Column(Integer, nullable=False, default=0)
+    computed_timestamp = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('student_id', 'group_id', name='uq_student_group_total'),
+        {'sqlite_autoincrement': True}
+    )
+
+
+class OlympiadResultSummary(Base):
+    __tablename__ = "OlympiadResultSummaries"
+
+    summary_id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey("Students.student_id", ondelete="CASCADE"), nullable=False, index=True)
+    olympiad_year = Column(Integer, nullable=False, index=True)
+    olympiad_level = Column(Enum(OlympiadLevelEnum, native_enum=False), nullable=False)
+    award = Column(Enum(AwardEnum, native_enum=False), nullable=False)
+    result_count = Column(Integer, nullable=False, default=0)
+    best_score = Column(Float)
+
+    __table_args__ = (
+        UniqueConstraint('student_id', 'olympiad_year', 'olympiad_level', 'award', name='uq_olympiad_summary_key'),
+        {'sqlite_autoincrement': True}
+    )
+
+
+engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def create_readonly_engine():
+    return create_engine(READONLY_DATABASE_URL, echo=False, connect_args=connect_args(readonly=True))
+
 def create_db_and_tables():
     try:
         Base.metadata.create_all(bind=engine)
@@ -0,0 +1,211 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import case, delete, desc, extract, insert, literal, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from .models import (
+    Event, EventParticipant, Olympiad, OlympiadResult, OlympiadResultSummary,
+    Participant, Student, StudyGroup, OlympiadLevelEnum, AwardEnum
+)
+
+LEVEL_WEIGHTS: Dict[OlympiadLevelEnum, int] = {
+    OlympiadLevelEnum.SCHOOL: 1,
+    OlympiadLevelEnum.MUNICIPAL: 2,
+    OlympiadLevelEnum.REGIONAL: 4,
+    OlympiadLevelEnum.NATIONAL: 8,
+    OlympiadLevelEnum.INTERNATIONAL: 16,
+    OlympiadLevelEnum.OTHER: 1,
+}
+
+AWARD_WEIGHTS: Dict[AwardEnum, int] = {
+    AwardEnum.WINNER: 10,
+    AwardEnum.PRIZE_1: 8,
+    AwardEnum.DIPLOMA_1: 8,
+    AwardEnum.PRIZE_2: 6,
+    AwardEnum.DIPLOMA_2: 6,
+    AwardEnum.PRIZE_3: 4,
+    AwardEnum.DIPLOMA_3: 4,
+    AwardEnum.HONORABLE_MENTION: 2,
+    AwardEnum.PARTICIPANT: 1,
+    AwardEnum.NONE: 0,
+}
+
+WINNER_AWARDS = [AwardEnum.WINNER]
+PRIZE_AWARDS = [
+    AwardEnum.PRIZE_1, AwardEnum.PRIZE_2, AwardEnum.PRIZE_3,
+    AwardEnum.DIPLOMA_1, AwardEnum.DIPLOMA_2, AwardEnum.DIPLOMA_3,
+]
+MENTION_AWARDS = [AwardEnum.HONORABLE_MENTION]
+
+NO_SCHOOL_LABEL = "Не указана"
+
+
+class MedalTableRow(NamedTuple):
+    key: Optional[int]
+    name: str
+    winners: int
+    prizes: int
+    mentions: int
+    participations: int
+    weighted_score: int
+
+
+class StudentRankingRow(NamedTuple):
+    student_id: int
+    last_name: str
+    first_name: str
+    school_name: Optional[str]
+    participations: int
+    winners: int
+    prizes: int
+    weighted_score: int
+
+
+class YearTrendRow(NamedTuple):
+    olympiad_year: int
+    participations: int
+    winners: int
+    prizes: int
+    mentions: int
+    weighted_score: int
+    weighted_change: Optional[float]
+
+
+def refresh_olympiad_summary(db: Session, student_ids: Optional[Iterable[int]] = None) -> None:
+    year = extract("year", Olympiad.olympiad_date)
+    aggregated = select(
+        OlympiadResult.student_id,
+        year,
+        Olympiad.olympiad_level,
+        OlympiadResult.award,
+        func.count(OlympiadResult.olympiad_result_id),
+        func.max(OlympiadResult.score),
+    ).join(
+        Olympiad, Olympiad.olympiad_id == OlympiadResult.olympiad_id
+    ).group_by(
+        OlympiadResult.student_id, year, Olympiad.olympiad_level, OlympiadResult.award
+    )
+    cleanup = delete(OlympiadResultSummary)
+
+    if student_ids is not None:
+        student_ids = list(set(student_ids))
+        if not student_ids:
+            return
+        aggregated = aggregated.where(OlympiadResult.student_id.in_(student_ids))
+        cleanup = cleanup.where(OlympiadResultSummary.student_id.in_(student_ids))
+
+    db.execute(cleanup)
+    db.execute(insert(OlympiadResultSummary).from_select(
+        ["student_id", "olympiad_year", "olympiad_level", "award", "result_count", "best_score"],
+        aggregated,
+    ))
+
+
+def _weight_expression():
+    level_weight = case(
+        *[(OlympiadResultSummary.olympiad_level == level, weight) for level, weight in LEVEL_WEIGHTS.items()],
+        else_=0
+    )
+    award_weight = case(
+        *[(OlympiadResultSummary.award == award, weight) for award, weight in AWARD_WEIGHTS.items()],
+        else_=0
+    )
+    return level_weight * award_weight * OlympiadResultSummary.result_count
+
+
+def _award_count(awards: List[AwardEnum]):
+    return func.coalesce(func.sum(
+        case((OlympiadResultSummary.award.in_(awards), OlympiadResultSummary.result_count), else_=0)
+    ), 0)
+
+
+def _aggregate_columns():
+    return (
+        _award_count(WINNER_AWARDS).label("winners"),
+        _award_count(PRIZE_AWARDS).label("prizes"),
+        _award_count(MENTION_AWARDS).label("mentions"),
+        func.coalesce(func.sum(OlympiadResultSummary.result_count), 0).label("participations"),
+        func.coalesce(func.sum(_weight_expression()), 0).label("weighted_score"),
+    )
+
+
+def _filter_year(query, year: Optional[int]):
+    if year is not None:
+        query = query.where(OlympiadResultSummary.olympiad_year == year)
+    return query
+
+
+def _medal_order(query):
+    return query.order_by(desc("winners"), desc("prizes"), desc("mentions"), desc("weighted_score"))
+
+
+def get_medal_table_by_school(db: Session, year: Optional[int] = None) -> List[MedalTableRow]:
+    school = func.coalesce(Student.school_name, NO_SCHOOL_LABEL)
+    query = select(literal(None).label("key"), school.label("name"), *_aggregate_columns()).join(
+        Student, Student.student_id == OlympiadResultSummary.student_id
+    ).group_by(school)
+    rows = db.execute(_medal_order(_filter_year(query, year)))
+    return [MedalTableRow._make(row) for row in rows]
+
+
+def get_medal_table_by_group(db: Session, year: Optional[int] = None) -> List[MedalTableRow]:
+    query = select(StudyGroup.group_id, StudyGroup.group_name, *_aggregate_columns()).join(
+        Participant, Participant.student_id == OlympiadResultSummary.student_id
+    ).join(
+        StudyGroup, StudyGroup.group_id == Participant.group_id
+    ).group_by(StudyGroup.group_id, StudyGroup.group_name)
+    rows = db.execute(_medal_order(_filter_year(query, year)))
+    return [MedalTableRow._make(row) for row in rows]
+
+
+def get_medal_table_by_event(db: Session, year: Optional[int] = None) -> List[MedalTableRow]:
+    query = select(Event.event_id, Event.event_name, *_aggregate_columns()).join(
+        EventParticipant, EventParticipant.student_id == OlympiadResultSummary.student_id
+    ).join(
+        Event, Event.event_id == EventParticipant.event_id
+    ).group_by(Event.event_id, Event.event_name)
+    rows = db.execute(_medal_order(_filter_year(query, year)))
+    return [MedalTableRow._make(row) for row in rows]
+
+
+def get_student_weighted_ranking(db: Session, year: Optional[int] = None, limit: Optional[int] = None) -> List[StudentRankingRow]:
+    winners, prizes, _, participations, weighted_score = _aggregate_columns()
+    query = select(
+        Student.student_id, Student.last_name, Student.first_name, Student.school_name,
+        participations, winners, prizes, weighted_score,
+    ).join(
+        Student, Student.student_id == OlympiadResultSummary.student_id
+    ).group_by(
+        Student.student_id, Student.last_name, Student.first_name, Student.school_name
+    ).order_by(desc("weighted_score"), desc("winners"), desc("prizes"), Student.last_name, Student.first_name)
+    query = _filter_year(query, year)
+    if limit:
+        query = query.limit(limit)
+    return [StudentRankingRow._make(row) for row in db.execute(query)]
+
+
+def get_yearly_trends(db: Session, student_ids: Optional[Iterable[int]] = None) -> List[YearTrendRow]:
+    winners, prizes, mentions, participations, weighted_score = _aggregate_columns()
+    query = select(
+        OlympiadResultSummary.olympiad_year, participations, winners, prizes, mentions, weighted_score,
+    ).group_by(OlympiadResultSummary.olympiad_year).order_by(OlympiadResultSummary.olympiad_year)
+    if student_ids is not None:
+        query = query.where(OlympiadResultSummary.student_id.in_(list(student_ids)))
+
+    trends = []
+    previous_weighted = None
+    for row in db.execute(query):
+        change = None
+        if previous_weighted:
+            change = (row.weighted_score - previous_weighted) / previous_weighted * 100
+        trends.append(YearTrendRow(*row, weighted_change=change))
+        previous_weighted = row.weighted_score
+    return trends
+
+
+def get_summary_years(db: Session) -> List[int]:
+    rows = db.execute(
+        select(OlympiadResultSummary.olympiad_year).distinct().order_by(OlympiadResultSummary.olympiad_year.desc())
+    )
+    return [year for year, in rows]
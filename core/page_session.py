@@ -0,0 +1,77 @@
+import os
+import time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import streamlit as st
+from sqlalchemy.orm import Session
+
+from . import archive, metrics, migrate
+from .models import DATABASE_PATH
+from .session import SessionFactories, create_session_factories
+
+
+@st.cache_resource
+def get_session_factories() -> SessionFactories:
+    migrate.upgrade()
+    return create_session_factories()
+
+
+@st.cache_resource
+def get_metrics_server() -> Optional[ThreadingHTTPServer]:
+    try:
+        return metrics.start_http_server()
+    except OSError:
+        return None
+
+
+@contextmanager
+def page_sessions(page: str) -> Iterator[Tuple[Session, Session]]:
+    render_seconds = metrics.PAGE_RENDER_SECONDS.labels(page)
+    started = time.perf_counter()
+    get_metrics_server()
+    factories = get_session_factories()
+    try:
+        with factories.read_session() as read_db, factories.write_session() as db:
+            yield read_db, db
+    finally:
+        render_seconds.observe(time.perf_counter() - started)
+
+
+@contextmanager
+def reporting_session() -> Iterator[Session]:
+    with get_session_factories().reporting_session() as reporting_db:
+        yield reporting_db
+
+
+@st.cache_resource(max_entries=4)
+def get_archive_engine(database_path: str, seasons: Optional[Tuple[int, ...]] = None):
+    return archive.create_archive_engine(database_path, seasons=seasons)
+
+
+def _archive_source() -> str:
+    path = get_session_factories().reporting_database_path()
+    if path != DATABASE_PATH and any(
+        os.path.getmtime(archive_path) > os.path.getmtime(path) for archive_path in archive.list_archives().values()
+    ):
+        return DATABASE_PATH
+    return path
+
+
+@contextmanager
+def archive_session(seasons: Optional[Iterable[int]] = None) -> Iterator[Session]:
+    seasons = tuple(sorted(seasons)) if seasons is not None else None
+    with Session(bind=get_archive_engine(_archive_source(), seasons)) as archive_db:
+        yield archive_db
+
+
+def connection_stats() -> Dict[str, Dict[str, float]]:
+    return get_session_factories().connection_stats()
+
+
+def offer_download(label: str, key: str, build: Callable[[Session], BinaryIO], file_name: str, mime: str) -> None:
+    if st.button(f"Подготовить {label}", key=f"prepare_{key}"):
+        with st.spinner("Формирование файла..."), reporting_session() as report_db, build(report_db) as spooled:
+            data = spooled.read()
+        st.download_button(f"⬇️ Скачать {label}", data=data, file_name=file_name, mime=mime, key=f"download_{key}")
@@ -0,0 +1,173 @@
+from typing import Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import Float, case, cast, delete, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from .models import Lesson, LessonColumn, Participant, Problem, ProblemStat, Result, SubjectAreaEnum
+
+
+class ProblemDifficultyRow(NamedTuple):
+    problem_id: int
+    title: str
+    source: Optional[str]
+    subject_area: SubjectAreaEnum
+    times_used: int
+    participants_total: int
+    solved_total: int
+    solve_rate: Optional[float]
+    avg_rating: Optional[float]
+
+
+def _update_stats(db: Session, condition, used_delta=0, participants_delta=0, solved_delta=0, rating_delta=0) -> None:
+    times_used = ProblemStat.times_used + used_delta
+    participants_total = ProblemStat.participants_total + participants_delta
+    solved_total = ProblemStat.solved_total + solved_delta
+    rating_total = ProblemStat.rating_total + rating_delta
+    db.execute(update(ProblemStat).where(condition).values(
+        times_used=times_used,
+        participants_total=participants_total,
+        solved_total=solved_total,
+        rating_total=rating_total,
+        solve_rate=case((participants_total > 0, cast(solved_total, Float) / participants_total), else_=None),
+        avg_rating=case((times_used > 0, cast(rating_total, Float) / times_used), else_=None),
+    ).execution_options(synchronize_session=False))
+
+
+def _column_problem_id(column_id: int):
+    return select(LessonColumn.problem_id).where(LessonColumn.column_id == column_id).scalar_subquery()
+
+
+def _column_size(db: Session, column_id: int):
+    participants, solved = db.execute(
+        select(
+            select(func.count(Participant.participation_id))
+            .join(Lesson, Lesson.group_id == Participant.group_id)
+            .join(LessonColumn, LessonColumn.lesson_id == Lesson.lesson_id)
+            .where(LessonColumn.column_id == column_id)
+            .scalar_subquery(),
+            select(func.count(Result.result_id)).where(Result.column_id == column_id).scalar_subquery(),
+        )
+    ).one()
+    return participants or 0, solved or 0
+
+
+def create_problem_stats(db: Session, problem: Problem) -> None:
+    db.execute(insert(ProblemStat).values(problem_id=problem.problem_id, subject_area=problem.subject_area))
+
+
+def record_result_added(db: Session, column_id: int) -> None:
+    _update_stats(db, ProblemStat.problem_id == _column_problem_id(column_id), solved_delta=1, rating_delta=-1)
+
+
+def record_result_deleted(db: Session, column_id: int) -> None:
+    _update_stats(db, ProblemStat.problem_id == _column_problem_id(column_id), solved_delta=-1, rating_delta=1)
+
+
+def record_member_added(db: Session, group_id: int) -> None:
+    columns_in_group = select(func.count(LessonColumn.column_id)).join(
+        Lesson, Lesson.lesson_id == LessonColumn.lesson_id
+    ).where(
+        Lesson.group_id == group_id, LessonColumn.problem_id == ProblemStat.problem_id
+    ).scalar_subquery()
+    used_problems = select(LessonColumn.problem_id).join(
+        Lesson, Lesson.lesson_id == LessonColumn.lesson_id
+    ).where(Lesson.group_id == group_id, LessonColumn.problem_id.isnot(None))
+    _update_stats(db, ProblemStat.problem_id.in_(used_problems), participants_delta=columns_in_group, rating_delta=columns_in_group)
+
+
+def record_column_linked(db: Session, column_id: int, problem_id: Optional[int], sign: int = 1) -> None:
+    if problem_id is None:
+        return
+    participants, solved = _column_size(db, column_id)
+    _update_stats(
+        db, ProblemStat.problem_id == problem_id,
+        used_delta=sign,
+        participants_delta=sign * participants,
+        solved_delta=sign * solved,
+        rating_delta=sign * (participants - solved + 1),
+    )
+
+
+def rebuild_problem_stats(db: Session, problem_ids: Optional[Iterable[int]] = None) -> None:
+    solved_per_column = select(
+        Result.column_id.label("column_id"), func.count(Result.result_id).label("solved")
+    ).group_by(Result.column_id).subquery()
+    members_per_group = select(
+        Participant.group_id.label("group_id"), func.count(Participant.participation_id).label("members")
+    ).group_by(Participant.group_id).subquery()
+
+    solved = func.coalesce(solved_per_column.c.solved, 0)
+    members = func.coalesce(members_per_group.c.members, 0)
+    per_column = select(
+        LessonColumn.problem_id.label("problem_id"),
+        members.label("participants"),
+        solved.label("solved"),
+        (members - solved + 1).label("rating"),
+    ).join(
+        Lesson, Lesson.lesson_id == LessonColumn.lesson_id
+    ).outerjoin(
+        members_per_group, members_per_group.c.group_id == Lesson.group_id
+    ).outerjoin(
+        solved_per_column, solved_per_column.c.column_id == LessonColumn.column_id
+    ).where(LessonColumn.problem_id.isnot(None)).subquery()
+
+    times_used = func.count(per_column.c.problem_id)
+    participants_total = func.coalesce(func.sum(per_column.c.participants), 0)
+    solved_total = func.coalesce(func.sum(per_column.c.solved), 0)
+    rating_total = func.coalesce(func.sum(per_column.c.rating), 0)
+    aggregated = select(
+        Problem.problem_id,
+        Problem.subject_area,
+        times_used,
+        participants_total,
+        solved_total,
+        rating_total,
+        case((participants_total > 0, cast(solved_total, Float) / participants_total), else_=None),
+        case((times_used > 0, cast(rating_total, Float) / times_used), else_=None),
+    ).outerjoin(
+        per_column, per_column.c.problem_id == Problem.problem_id
+    ).group_by(Problem.problem_id, Problem.subject_area)
+    cleanup = delete(ProblemStat)
+
+    if problem_ids is not None:
+        problem_ids = list(set(problem_ids))
+        if not problem_ids:
+            return
+        aggregated = aggregated.where(Problem.problem_id.in_(problem_ids))
+        cleanup = cleanup.where(ProblemStat.problem_id.in_(problem_ids))
+
+    db.execute(cleanup)
+    db.execute(insert(ProblemStat).from_select(
+        ["problem_id", "subject_area", "times_used", "participants_total", "solved_total",
+         "rating_total", "solve_rate", "avg_rating"],
+        aggregated,
+    ))
+
+
+def get_hardest_problems(db: Session, subject_area: Optional[SubjectAreaEnum] = None, limit: int = 20, min_uses: int = 1) -> List[ProblemDifficultyRow]:
+    query = select(
+        Problem.problem_id, Problem.title, Problem.source, ProblemStat.subject_area,
+        ProblemStat.times_used, ProblemStat.participants_total, ProblemStat.solved_total,
+        ProblemStat.solve_rate, ProblemStat.avg_rating,
+    ).join(
+        Problem, Problem.problem_id == ProblemStat.problem_id
+    ).where(
+        ProblemStat.solve_rate.isnot(None), ProblemStat.times_used >= min_uses
+    ).order_by(ProblemStat.solve_rate, ProblemStat.avg_rating.desc()).limit(limit)
+    if subject_area is not None:
+        query = query.where(ProblemStat.subject_area == subject_area)
+    return [ProblemDifficultyRow._make(row) for row in db.execute(query)]
+
+
+def get_problem_catalogue(db: Session, subject_area: Optional[SubjectAreaEnum] = None) -> List[ProblemDifficultyRow]:
+    query = select(
+        Problem.problem_id, Problem.title, Problem.source, Problem.subject_area,
+        func.coalesce(ProblemStat.times_used, 0), func.coalesce(ProblemStat.participants_total, 0),
+        func.coalesce(ProblemStat.solved_total, 0), ProblemStat.solve_rate, ProblemStat.avg_rating,
+    ).outerjoin(
+        ProblemStat, ProblemStat.problem_id == Problem.problem_id
+    ).order_by(Problem.subject_area, Problem.title)
+    if subject_area is not None:
+        query = query.where(Problem.subject_area == subject_area)
+    return [ProblemDifficultyRow._make(row) for row in db.execute(query)]
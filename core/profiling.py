@@ -0,0 +1,147 @@
+import cProfile
+import datetime
+import functools
+import os
+import pstats
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+PROFILE_ENV = "OLYMP_PROFILE"
+PROFILING_ENABLED = os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes", "on")
+PROFILE_THRESHOLD_MS = float(os.environ.get("OLYMP_PROFILE_THRESHOLD_MS", "200"))
+PROFILE_DIR = os.environ.get("OLYMP_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "olymp-profiles"))
+PROFILE_WINDOW = int(os.environ.get("OLYMP_PROFILE_WINDOW", "200"))
+
+TIME_BUCKETS = ("sql", "orm", "pandas", "other")
+_BUCKET_MARKERS = [
+    ("sql", ("sqlite3", "psycopg", "sqlalchemy/engine/", "sqlalchemy/sql/", "sqlalchemy/dialects/", "sqlalchemy/pool/")),
+    ("orm", ("sqlalchemy/orm/",)),
+    ("pandas", ("pandas/", "numpy/", "pandas.", "numpy.")),
+]
+
+_profiler_lock = threading.Lock()
+_summary_lock = threading.Lock()
+_summary: Dict[str, "_FunctionSummary"] = {}
+
+
+class _FunctionSummary:
+    def __init__(self):
+        self.calls = 0
+        self.slow_calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.recent: Deque[float] = deque(maxlen=PROFILE_WINDOW)
+        self.last_dump: Optional[str] = None
+        self.last_breakdown: Dict[str, float] = {}
+
+    def record(self, seconds: float, dump_path: Optional[str], breakdown: Optional[Dict[str, float]]):
+        self.calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.recent.append(seconds)
+        if dump_path:
+            self.slow_calls += 1
+            self.last_dump = dump_path
+            self.last_breakdown = breakdown or {}
+
+
+def _bucket(filename: str, function_name: str) -> str:
+    location = f"{filename.replace(os.sep, '/')} {function_name}"
+    for bucket, markers in _BUCKET_MARKERS:
+        if any(marker in location for marker in markers):
+            return bucket
+    return "other"
+
+
+def time_breakdown(stats: pstats.Stats) -> Dict[str, float]:
+    totals = {bucket: 0.0 for bucket in TIME_BUCKETS}
+    for (filename, _, function_name), (_, _, own_seconds, _, _) in stats.stats.items():
+        totals[_bucket(filename, function_name)] += own_seconds
+    return {bucket: seconds * 1000 for bucket, seconds in totals.items()}
+
+
+def _dump(profile: cProfile.Profile, name: str, seconds: float) -> Tuple[str, Dict[str, float]]:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    path = os.path.join(PROFILE_DIR, f"{stamp}_{name}_{seconds * 1000:.0f}ms.prof")
+    stats = pstats.Stats(profile)
+    stats.dump_stats(path)
+    return path, time_breakdown(stats)
+
+
+def _record(name: str, seconds: float, dump_path: Optional[str] = None, breakdown: Optional[Dict[str, float]] = None):
+    with _summary_lock:
+        _summary.setdefault(name, _FunctionSummary()).record(seconds, dump_path, breakdown)
+
+
+def profiled(func: Callable) -> Callable:
+    if not PROFILING_ENABLED:
+        return func
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _profiler_lock.acquire(blocking=False):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(name, time.perf_counter() - started)
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+        finally:
+            _profiler_lock.release()
+            seconds = time.perf_counter() - started
+            if seconds * 1000 >= PROFILE_THRESHOLD_MS:
+                _record(name, seconds, *_dump(profile, name, seconds))
+            else:
+                _record(name, seconds)
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def profile_public_functions(namespace: Dict[str, object]) -> None:
+    if not PROFILING_ENABLED:
+        return
+    module_name = namespace["__name__"]
+    for attribute, value in list(namespace.items()):
+        if (attribute.startswith("_") or not callable(value) or isinstance(value, type)
+                or getattr(value, "__module__", None) != module_name or getattr(value, "profiled", False)):
+            continue
+        namespace[attribute] = profiled(value)
+
+
+def profile_summary() -> List[Dict[str, object]]:
+    with _summary_lock:
+        items = [(name, summary, sorted(summary.recent)) for name, summary in _summary.items()]
+    rows = []
+    for name, summary, recent in items:
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        row = {
+            "function": name,
+            "calls": summary.calls,
+            "slow_calls": summary.slow_calls,
+            "mean_ms": summary.total_seconds / summary.calls * 1000,
+            "p95_ms": p95 * 1000,
+            "max_ms": summary.max_seconds * 1000,
+            "total_ms": summary.total_seconds * 1000,
+        }
+        row.update({f"{bucket}_ms": summary.last_breakdown.get(bucket, 0.0) for bucket in TIME_BUCKETS})
+        row["last_dump"] = summary.last_dump or ""
+        rows.append(row)
+    return sorted(rows, key=lambda row: -row["total_ms"])
+
+
+def reset_profile_summary() -> None:
+    with _summary_lock:
+        _summary.clear()
@@ -0,0 +1,133 @@
+import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from .models import Lesson, LessonColumn, Participant, Result, Student, StudentGroupTotal
+
+
+class LessonRow(NamedTuple):
+    lesson_id: int
+    group_id: int
+
+
+class LessonSummaryRow(NamedTuple):
+    lesson_id: int
+    lesson_date: datetime.date
+    topic: str
+    column_count: int
+
+
+class StudentRow(NamedTuple):
+    student_id: int
+    first_name: str
+    last_name: str
+
+
+class StudentTotalRow(NamedTuple):
+    student_id: int
+    first_name: str
+    last_name: str
+    school_name: Optional[str]
+    total_solved: int
+    total_score: int
+
+
+class ColumnRow(NamedTuple):
+    column_id: int
+    column_label: str
+    display_order: int
+    is_discussed: bool
+
+
+class ResultRow(NamedTuple):
+    student_id: int
+    column_id: int
+
+
+def get_lesson(db: Session, lesson_id: int) -> Optional[LessonRow]:
+    row = db.execute(
+        select(Lesson.lesson_id, Lesson.group_id).where(Lesson.lesson_id == lesson_id)
+    ).first()
+    return LessonRow._make(row) if row else None
+
+
+def get_lessons_for_group(db: Session, group_id: int) -> List[LessonRow]:
+    rows = db.execute(
+        select(Lesson.lesson_id, Lesson.group_id).where(Lesson.group_id == group_id).order_by(Lesson.lesson_date.desc())
+    )
+    return [LessonRow._make(row) for row in rows]
+
+
+def get_lesson_summaries_for_group(db: Session, group_id: int) -> List[LessonSummaryRow]:
+    rows = db.execute(
+        select(Lesson.lesson_id, Lesson.lesson_date, Lesson.topic, func.count(LessonColumn.column_id))
+        .outerjoin(LessonColumn, LessonColumn.lesson_id == Lesson.lesson_id)
+        .where(Lesson.group_id == group_id)
+        .group_by(Lesson.lesson_id, Lesson.lesson_date, Lesson.topic)
+        .order_by(Lesson.lesson_date, Lesson.lesson_id)
+    )
+    return [LessonSummaryRow._make(row) for row in rows]
+
+
+def get_students_in_group(db: Session, group_id: int) -> List[StudentRow]:
+    rows = db.execute(
+        select(Student.student_id, Student.first_name, Student.last_name)
+        .join(Participant, Participant.student_id == Student.student_id)
+        .where(Participant.group_id == group_id)
+        .order_by(Student.last_name, Student.first_name)
+    )
+    return [StudentRow._make(row) for row in rows]
+
+
+def get_student_totals_for_group(db: Session, group_id: int) -> List[StudentTotalRow]:
+    rows = db.execute(
+        select(
+            Student.student_id, Student.first_name, Student.last_name, Student.school_name,
+            func.coalesce(StudentGroupTotal.total_solved, 0), func.coalesce(StudentGroupTotal.total_score, 0),
+        )
+        .join(Participant, Participant.student_id == Student.student_id)
+        .outerjoin(StudentGroupTotal, and_(
+            StudentGroupTotal.student_id == Student.student_id, StudentGroupTotal.group_id == Participant.group_id
+        ))
+        .where(Participant.group_id == group_id)
+        .order_by(Student.last_name, Student.first_name)
+    )
+    return [StudentTotalRow._make(row) for row in rows]
+
+
+def count_students_in_group(db: Session, group_id: int) -> int:
+    return db.execute(
+        select(func.count(Participant.participation_id)).where(Participant.group_id == group_id)
+    ).scalar() or 0
+
+
+def get_columns_for_lesson(db: Session, lesson_id: int) -> List[ColumnRow]:
+    rows = db.execute(
+        select(LessonColumn.column_id, LessonColumn.column_label, LessonColumn.display_order, LessonColumn.is_discussed)
+        .where(LessonColumn.lesson_id == lesson_id)
+        .order_by(LessonColumn.display_order)
+    )
+    return [ColumnRow._make(row) for row in rows]
+
+
+def get_results_for_lesson(db: Session, lesson_id: int) -> List[ResultRow]:
+    rows = db.execute(
+        select(Result.student_id, Result.column_id).where(Result.lesson_id == lesson_id)
+    )
+    return [ResultRow._make(row) for row in rows]
+
+
+def get_solved_column_ids(db: Session, student_id: int, lesson_id: int) -> List[int]:
+    return list(db.execute(
+        select(Result.column_id).where(Result.student_id == student_id, Result.lesson_id == lesson_id)
+    ).scalars())
+
+
+def get_solved_counts_for_lesson(db: Session, lesson_id: int) -> Dict[int, int]:
+    rows = db.execute(
+        select(Result.column_id, func.count(Result.result_id)).where(Result.lesson_id == lesson_id).group_by(Result.column_id)
+    )
+    return {column_id: solved_count for column_id, solved_count in rows}
@@ -0,0 +1,97 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+_worker_engine = None
+
+
+def _init_worker():
+    global _worker_engine
+    from .models import create_readonly_engine
+    _worker_engine = create_readonly_engine()
+
+
+def _compute_group_leaderboard(group_id: int) -> Tuple[int, Dict[int, Tuple[int, int]], float]:
+    global _worker_engine
+    from sqlalchemy.orm import Session
+    from . import analysis
+
+    if _worker_engine is None:
+        _init_worker()
+    started = time.perf_counter()
+    with Session(bind=_worker_engine) as db:
+        leaderboard = analysis.calculate_group_leaderboard(db, group_id)
+    return group_id, leaderboard, time.perf_counter() - started
+
+
+def recompute_group_totals(group_ids: List[int], workers: int = 1, verbose: bool = True) -> Dict[int, Dict[int, Tuple[int, int]]]:
+    leaderboards = {}
+    total_groups = len(group_ids)
+
+    def report(done: int, group_id: int, leaderboard: Dict[int, Tuple[int, int]], elapsed: float):
+        if verbose:
+            print(f"  [{done}/{total_groups}] Группа {group_id}: {len(leaderboard)} учеников, {elapsed * 1000:.1f} мс")
+
+    if workers <= 1 or total_groups <= 1:
+        for done, group_id in enumerate(group_ids, start=1):
+            group_id, leaderboard, elapsed = _compute_group_leaderboard(group_id)
+            leaderboards[group_id] = leaderboard
+            report(done, group_id, leaderboard, elapsed)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = [executor.submit(_compute_group_leaderboard, group_id) for group_id in group_ids]
+            for done, future in enumerate(as_completed(futures), start=1):
+                group_id, leaderboard, elapsed = future.result()
+                leaderboards[group_id] = leaderboard
+                report(done, group_id, leaderboard, elapsed)
+
+    return leaderboards
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Пересчет итоговых баллов учеников по группам.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--all", action="store_true", help="пересчитать все группы")
+    target.add_argument("--group-id", type=int, action="append", dest="group_ids", help="ID группы (можно указать несколько раз)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="число процессов")
+    parser.add_argument("--check", action="store_true", help="только сравнить сохраненные итоги с полным пересчетом")
+    args = parser.parse_args(argv)
+
+    from . import crud, group_totals, migrate
+    from .models import SessionLocal
+
+    migrate.upgrade()
+    db = SessionLocal()
+    try:
+        if args.all:
+            group_ids = [group.group_id for group in crud.get_all_groups(db)]
+        else:
+            group_ids = args.group_ids
+
+        if args.check:
+            mismatches = group_totals.check_group_totals(db, group_ids)
+            for mismatch in mismatches[:20]:
+                print(f"  Группа {mismatch.group_id}, ученик {mismatch.student_id}: "
+                      f"сохранено {mismatch.stored}, по пересчету {mismatch.expected}")
+            if mismatches:
+                print(f"Расхождений: {len(mismatches)}. Запустите без --check, чтобы пересчитать итоги.")
+                return 1
+            print("Сохраненные итоги совпадают с пересчетом.")
+            return 0
+
+        print(f"Пересчет {len(group_ids)} групп, процессов: {args.workers}...")
+        started = time.perf_counter()
+        leaderboards = recompute_group_totals(group_ids, workers=args.workers)
+        computed = time.perf_counter() - started
+
+        written = crud.replace_student_group_totals(db, leaderboards)
+        print(f"Записано {written} строк итогов. Расчет: {computed:.2f} с, всего: {time.perf_counter() - started:.2f} с.")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from . import snapshot
+from .models import DATABASE_PATH, DATABASE_URL, READONLY_DATABASE_URL, connect_args
+
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+
+
+class ConnectionStats:
+    __slots__ = ("sessions", "new_connections", "acquire_seconds_total", "acquire_seconds_max")
+
+    def __init__(self):
+        self.sessions = 0
+        self.new_connections = 0
+        self.acquire_seconds_total = 0.0
+        self.acquire_seconds_max = 0.0
+
+    def record_acquire(self, seconds: float):
+        self.sessions += 1
+        self.acquire_seconds_total += seconds
+        if seconds > self.acquire_seconds_max:
+            self.acquire_seconds_max = seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        mean = self.acquire_seconds_total / self.sessions if self.sessions else 0.0
+        return {
+            "sessions": self.sessions,
+            "new_connections": self.new_connections,
+            "acquire_ms_mean": mean * 1000,
+            "acquire_ms_max": self.acquire_seconds_max * 1000,
+        }
+
+
+class SessionFactories:
+    def __init__(self, write_engine: Engine, read_engine: Engine):
+        self.write_engine = write_engine
+        self.read_engine = read_engine
+        self.write_factory = sessionmaker(bind=write_engine, autoflush=False, expire_on_commit=False)
+        self.read_factory = sessionmaker(bind=read_engine, autoflush=False, expire_on_commit=False)
+        self.stats = {"write": ConnectionStats(), "read": ConnectionStats(), "reporting": ConnectionStats()}
+        self._count_new_connections(write_engine, self.stats["write"])
+        self._count_new_connections(read_engine, self.stats["read"])
+        self._snapshot_path = None
+        self._snapshot_factory = None
+        self._snapshot_lock = threading.Lock()
+
+    @staticmethod
+    def _count_new_connections(engine: Engine, stats: ConnectionStats):
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            stats.new_connections += 1
+
+    def _open(self, factory: sessionmaker, stats: ConnectionStats) -> Session:
+        db = factory()
+        started = time.perf_counter()
+        db.connection()
+        stats.record_acquire(time.perf_counter() - started)
+        return db
+
+    @contextmanager
+    def write_session(self) -> Iterator[Session]:
+        db = self._open(self.write_factory, self.stats["write"])
+        try:
+            yield db
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @contextmanager
+    def read_session(self) -> Iterator[Session]:
+        db = self._open(self.read_factory, self.stats["read"])
+        try:
+            yield db
+        finally:
+            db.rollback()
+            db.close()
+
+    def _reporting_snapshot(self) -> Tuple[Optional[str], Optional[sessionmaker]]:
+        if not snapshot.reporting_uses_snapshot():
+            return None, None
+        path = snapshot.latest_snapshot()
+        if path is None:
+            return None, None
+        with self._snapshot_lock:
+            if path != self._snapshot_path:
+                snapshot_engine = _create_pooled_engine(snapshot.snapshot_url(path), readonly=True)
+                self._count_new_connections(snapshot_engine, self.stats["reporting"])
+                previous_factory = self._snapshot_factory
+                self._snapshot_path = path
+                self._snapshot_factory = sessionmaker(bind=snapshot_engine, autoflush=False, expire_on_commit=False)
+                if previous_factory is not None:
+                    previous_factory.kw["bind"].dispose()
+            return self._snapshot_path, self._snapshot_factory
+
+    def _reporting_factory(self) -> sessionmaker:
+        _, factory = self._reporting_snapshot()
+        return factory or self.read_factory
+
+    @contextmanager
+    def reporting_session(self) -> Iterator[Session]:
+        db = self._open(self._reporting_factory(), self.stats["reporting"])
+        try:
+            yield db
+        finally:
+            db.rollback()
+            db.close()
+
+    def reporting_source(self) -> str:
+        path, _ = self._reporting_snapshot()
+        return path or DATABASE_URL
+
+    def reporting_database_path(self) -> str:
+        path, _ = self._reporting_snapshot()
+        return path or DATABASE_PATH
+
+    def connection_stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+    def dispose(self):
+        self.write_engine.dispose()
+        self.read_engine.dispose()
+        with self._snapshot_lock:
+            if self._snapshot_factory is not None:
+                self._snapshot_factory.kw["bind"].dispose()
+
+
+def _create_pooled_engine(url: str, readonly: bool = False) -> Engine:
+    return create_engine(
+        url,
+        echo=False,
+        poolclass=QueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_pre_ping=True,
+        connect_args=connect_args(readonly=readonly, threaded=True),
+    )
+
+
+def create_session_factories() -> SessionFactories:
+    return SessionFactories(_create_pooled_engine(DATABASE_URL), _create_pooled_engine(READONLY_DATABASE_URL, readonly=True))
+
+
+def measure_connection_acquisition(factories: SessionFactories, samples: int = 100) -> Tuple[float, float]:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        with factories.read_session():
+            pass
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return sum(timings) / len(timings) * 1000, timings[int(len(timings) * 0.95) - 1] * 1000
@@ -0,0 +1,99 @@
+import argparse
+import datetime
+import glob
+import os
+import sqlite3
+import time
+from typing import List, Optional
+
+from .models import DATABASE_BACKEND, DATABASE_PATH
+
+SNAPSHOT_DIR = os.environ.get("OLYMP_SNAPSHOT_DIR", os.path.join(os.path.dirname(DATABASE_PATH), "snapshots"))
+SNAPSHOT_PREFIX = "olympiad_tracker-"
+SNAPSHOT_SUFFIX = ".db"
+REPORTING_SOURCE_ENV = "OLYMP_REPORTING_SOURCE"
+REPORTING_SOURCE_SNAPSHOT = "snapshot"
+
+PAGES_PER_STEP = 256
+STEP_PAUSE_SECONDS = 0.005
+DEFAULT_KEEP = 3
+
+
+def reporting_uses_snapshot() -> bool:
+    return DATABASE_BACKEND == "sqlite" and os.environ.get(REPORTING_SOURCE_ENV, "").lower() == REPORTING_SOURCE_SNAPSHOT
+
+
+def list_snapshots(snapshot_dir: str = SNAPSHOT_DIR) -> List[str]:
+    return sorted(glob.glob(os.path.join(snapshot_dir, f"{SNAPSHOT_PREFIX}*{SNAPSHOT_SUFFIX}")))
+
+
+def latest_snapshot(snapshot_dir: str = SNAPSHOT_DIR) -> Optional[str]:
+    snapshots = list_snapshots(snapshot_dir)
+    return snapshots[-1] if snapshots else None
+
+
+def snapshot_url(path: str) -> str:
+    return f"sqlite:///file:{path}?mode=ro&immutable=1&uri=true"
+
+
+def create_snapshot(
+    source_path: str = DATABASE_PATH,
+    snapshot_dir: str = SNAPSHOT_DIR,
+    pages_per_step: int = PAGES_PER_STEP,
+    step_pause: float = STEP_PAUSE_SECONDS,
+) -> str:
+    os.makedirs(snapshot_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    final_path = os.path.join(snapshot_dir, f"{SNAPSHOT_PREFIX}{stamp}{SNAPSHOT_SUFFIX}")
+    temp_path = f"{final_path}.tmp"
+
+    source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    target = sqlite3.connect(temp_path)
+    try:
+        source.backup(target, pages=pages_per_step, sleep=step_pause)
+        target.execute("PRAGMA journal_mode=DELETE")
+        target.execute("ANALYZE")
+        target.commit()
+    except Exception:
+        target.close()
+        os.remove(temp_path)
+        raise
+    finally:
+        source.close()
+    target.close()
+    os.chmod(temp_path, 0o444)
+    os.replace(temp_path, final_path)
+    return final_path
+
+
+def prune_snapshots(keep: int = DEFAULT_KEEP, snapshot_dir: str = SNAPSHOT_DIR) -> List[str]:
+    snapshots = list_snapshots(snapshot_dir)
+    removed = snapshots[:-keep] if keep > 0 else snapshots
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Снимок базы данных только для чтения (для отчетов).")
+    parser.add_argument("--every", type=float, help="обновлять снимок каждые N минут")
+    parser.add_argument("--keep", type=int, default=DEFAULT_KEEP, help="сколько последних снимков хранить")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="каталог для снимков")
+    args = parser.parse_args(argv)
+
+    if DATABASE_BACKEND != "sqlite":
+        print(f"Снимки поддерживаются только для SQLite (текущая база: {DATABASE_BACKEND}).")
+        return 1
+    while True:
+        started = time.perf_counter()
+        path = create_snapshot(snapshot_dir=args.dir)
+        removed = prune_snapshots(args.keep, args.dir)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"Снимок {path} ({size_mb:.1f} МБ) создан за {time.perf_counter() - started:.2f} с, удалено старых: {len(removed)}")
+        if not args.every:
+            return 0
+        time.sleep(args.every * 60)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,24 +1,41 @@
 import streamlit as st
 
+from core import profiling
+from core.page_session import get_metrics_server
+
 st.set_page_config(
     page_title="Олимп-Трекер",
     layout="wide"
 )
 
-st.title("Добро пожаловать в Олимп-Трекер!")
-st.sidebar.success("Выберите раздел для начала работы.")
-
-st.markdown(
-    """
-    Это система для учета и анализа успеваемости учеников
-    на занятиях по олимпиадной математике.
-
-    Используйте навигационную панель слева для перехода
-    между разделами:
-    - **Events**: Управление крупными мероприятиями (сборы, кружки).
-    - **Groups & Lessons**: Управление учебными группами и их занятиями.
-    - **Students**: Управление учениками и просмотр общей статистики.
-    - **Conduit**: Просмотр и редактирование таблицы результатов (кондуита) для конкретного занятия.
-    - **Olympiads**: Учет олимпиад и результатов учеников на них.
-    """
-)
\ No newline at end of file
+get_metrics_server()
+
+
+def home():
+    st.title("Добро пожаловать в Олимп-Трекер!")
+    st.sidebar.success("Выберите раздел для начала работы.")
+
+    st.markdown(
+        """
+        Это система для учета и анализа успеваемости учеников
+        на занятиях по олимпиадной математике.
+
+        Используйте навигационную панель слева для перехода
+        между разделами:
+        - **Events**: Управление крупными мероприятиями (сборы, кружки).
+        - **Groups & Lessons**: Управление учебными группами и их занятиями.
+        - **Students**: Управление учениками и просмотр общей статистики.
+        - **Conduit**: Просмотр и редактирование таблицы результатов (кондуита) для конкретного занятия.
+        - **Olympiads**: Учет олимпиад и результатов учеников на них.
+        """
+    )
+
+
+pages = [st.Page(home, title="olymp tracker", default=True)] + [
+    st.Page(f"pages/{name}.py") for name in
+    ("1_Groups_Lessons", "2_Students", "3_Conduit", "4_Events", "5_Olympiads", "6_Problems")
+]
+if profiling.PROFILING_ENABLED:
+    pages.append(st.Page("pages/7_Diagnostics.py"))
+
+st.navigation(pages).run()
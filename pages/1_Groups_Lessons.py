@@ -1,6 +1,4 @@
 import streamlit as st
-from sqlalchemy.orm import Session
-import pandas as pd
 import datetime
 import sys
 import os
@@ -9,23 +7,20 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from core import crud
-from core.crud import get_db
-from core.models import SubjectAreaEnum
+from core import archive, crud
+from core.page_session import page_sessions
+from core.models import ProblemTypeEnum, SubjectAreaEnum
 
 st.set_page_config(layout="wide")
 st.title("📚 Группы и Занятия")
 
-db_session_generator = get_db()
-db: Session = next(db_session_generator)
-
-try:
+with page_sessions("groups") as (read_db, db):
     with st.expander("➕ Создать новую группу"):
         with st.form("new_group_form", clear_on_submit=True):
             new_group_name = st.text_input("Название группы*")
             new_group_desc = st.text_area("Описание")
 
-            events = crud.get_all_events(db)
+            events = crud.get_all_events(read_db)
             event_options = {f"{event.event_name} ({event.event_type.value})": event.event_id for event in events}
             event_options_with_none = {"Нет (независимая группа)": None}
             event_options_with_none.update(event_options)
@@ -57,16 +52,64 @@ try:
                             st.error(f"Ошибка при создании группы: {e}")
                             st.exception(e)
 
+    groups = crud.get_all_groups(read_db)
+    active_groups = {group.group_name: group.group_id for group in groups if group.archive_season is None}
+
+    with st.expander("📋 Занятие сразу в нескольких группах"):
+        with st.form("multi_group_lesson_form", clear_on_submit=True):
+            target_group_names = st.multiselect("Группы*", options=list(active_groups.keys()))
+            template_lesson_id = st.number_input(
+                "Скопировать задачи и тему из занятия (ID, 0 — не копировать)", min_value=0, step=1, value=0
+            )
+            multi_date = st.date_input("Дата занятия*", value=datetime.date.today(), key="multi_date")
+            multi_topic = st.text_input("Тема занятия (если не копируется)", key="multi_topic")
+            multi_subject = st.selectbox("Направленность", options=[area.value for area in SubjectAreaEnum], key="multi_subject")
+            multi_link = st.text_input("Ссылка на листок", key="multi_link")
+            multi_labels_text = st.text_area(
+                "Задачи (метки через запятую или с новой строки)", key="multi_labels", placeholder="1, 2, 3а, 3б, 4"
+            )
+            multi_problem_type = st.selectbox("Тип задач", options=[ptype.value for ptype in ProblemTypeEnum], key="multi_ptype")
+            submitted_multi = st.form_submit_button("Создать занятия")
+
+            if submitted_multi:
+                target_group_ids = [active_groups[name] for name in target_group_names]
+                template_lesson = crud.get_lesson_by_id(read_db, int(template_lesson_id)) if template_lesson_id else None
+                if not target_group_ids:
+                    st.warning("Выберите хотя бы одну группу.")
+                elif template_lesson_id and not template_lesson:
+                    st.warning(f"Занятие с ID {int(template_lesson_id)} не найдено.")
+                elif not template_lesson and not multi_topic:
+                    st.warning("Укажите тему занятия или ID занятия-шаблона.")
+                else:
+                    try:
+                        if template_lesson:
+                            created_lessons = crud.clone_lesson_to_groups(db, template_lesson.lesson_id, target_group_ids, multi_date)
+                        else:
+                            multi_columns = [
+                                (label, ProblemTypeEnum(multi_problem_type), None)
+                                for label in crud.parse_column_labels(multi_labels_text)
+                            ]
+                            created_lessons = crud.create_lessons_with_columns(
+                                db, target_group_ids, multi_date, multi_topic, SubjectAreaEnum(multi_subject),
+                                multi_columns, multi_link or None
+                            )
+                        st.success(f"Создано занятий: {len(created_lessons)}.")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Ошибка при создании занятий: {e}")
+                        st.exception(e)
+
     st.header("Существующие группы")
-    groups = crud.get_all_groups(db)
 
     if not groups:
         st.info("Пока нет ни одной группы.")
     else:
         for group in groups:
             group_expander_title = f"Группа: {group.group_name}"
+            if group.archive_season is not None:
+                group_expander_title += f" 📦 архив {archive.season_label(group.archive_season)}"
             if group.event_id:
-                event = crud.get_event_by_id(db, group.event_id)
+                event = crud.get_event_by_id(read_db, group.event_id)
                 if event:
                     group_expander_title += f" (Мероприятие: {event.event_name})"
             
@@ -76,7 +119,7 @@ try:
                      st.caption(f"Связано с мероприятием: {event.event_name} (ID: {event.event_id})")
 
                 st.subheader("Занятия в этой группе:")
-                lessons = crud.get_lessons_for_group(db, group.group_id)
+                lessons = crud.get_lessons_for_group(read_db, group.group_id)
 
                 if lessons:
                     for lesson in lessons:
@@ -103,6 +146,13 @@ try:
                         key=f"subject_{group.group_id}"
                     )
                     lesson_link = st.text_input("Ссылка на листок", key=f"link_{group.group_id}")
+                    lesson_labels_text = st.text_area(
+                        "Задачи занятия (метки через запятую или с новой строки)", key=f"labels_{group.group_id}",
+                        placeholder="1, 2, 3а, 3б, 4"
+                    )
+                    lesson_problem_type = st.selectbox(
+                        "Тип задач", options=[ptype.value for ptype in ProblemTypeEnum], key=f"ptype_{group.group_id}"
+                    )
                     submitted_lesson = st.form_submit_button("Добавить занятие")
 
                     if submitted_lesson:
@@ -111,19 +161,32 @@ try:
                         else:
                             try:
                                 subject_enum = SubjectAreaEnum(lesson_subject)
-                                new_lesson = crud.create_lesson(
+                                column_labels = crud.parse_column_labels(lesson_labels_text)
+                                new_lesson = crud.create_lesson_with_columns(
                                     db=db,
                                     group_id=group.group_id,
                                     lesson_date=lesson_date,
                                     topic=lesson_topic,
                                     subject_area=subject_enum,
+                                    column_labels=column_labels,
+                                    problem_type=ProblemTypeEnum(lesson_problem_type),
                                     sheet_link=lesson_link
                                 )
-                                st.success(f"Занятие '{new_lesson.topic}' добавлено в группу '{group.group_name}'!")
+                                st.success(f"Занятие '{new_lesson.topic}' ({len(column_labels)} задач) добавлено в группу '{group.group_name}'!")
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"Ошибка при добавлении занятия: {e}")
                                 st.exception(e)
-finally:
-    if 'db' in locals() and db:
-        db.close()
\ No newline at end of file
+
+                st.subheader("🗑️ Удалить группу")
+                confirm_delete = st.checkbox(
+                    "Удалить группу вместе со всеми занятиями, задачами и результатами", key=f"confirm_delete_{group.group_id}"
+                )
+                if st.button("Удалить группу", key=f"delete_group_{group.group_id}", disabled=not confirm_delete):
+                    try:
+                        crud.delete_group(db, group.group_id)
+                        st.success(f"Группа '{group.group_name}' удалена.")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Ошибка при удалении группы: {e}")
+                        st.exception(e)
@@ -1,5 +1,4 @@
 import streamlit as st
-from sqlalchemy.orm import Session
 import pandas as pd
 import sys
 import os
@@ -8,17 +7,14 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from core import crud, analysis
-from core.crud import get_db
+from core import crud, archive, export, queries
+from core.page_session import archive_session, offer_download, page_sessions
 
 st.set_page_config(layout="wide")
 st.title("🧑‍🎓 Ученики")
 
-db_session_generator = get_db()
-db: Session = next(db_session_generator)
-
-try:
-    groups = crud.get_all_groups(db)
+with page_sessions("students") as (read_db, db):
+    groups = crud.get_all_groups(read_db)
     group_options = {group.group_name: group.group_id for group in groups}
     selected_group_name = st.selectbox(
         "Выберите группу для просмотра учеников и добавления новых:",
@@ -29,17 +25,21 @@ try:
 
     if selected_group_id:
         st.header(f"Ученики в группе: {selected_group_name}")
-        students_in_group = crud.get_students_in_group(db, selected_group_id)
+        students_in_group = queries.get_student_totals_for_group(read_db, selected_group_id)
+
+        selected_group = crud.get_group_by_id(read_db, selected_group_id)
+        archived_totals = None
+        if selected_group.archive_season is not None:
+            st.info(f"Занятия группы перенесены в архив сезона {archive.season_label(selected_group.archive_season)}.")
+            with archive_session([selected_group.archive_season]) as archive_db:
+                archived_totals = archive.get_group_leaderboard(archive_db, selected_group_id)
 
         if students_in_group:
             student_data = []
-            prog_text = "Расчет статистики для учеников..."
-            prog_bar = st.progress(0, text=prog_text)
-            total_students = len(students_in_group)
-
-            for i, s in enumerate(students_in_group):
-                total_score = analysis.calculate_student_total_score_in_group(db, s.student_id, selected_group_id)
-                total_solved = analysis.calculate_student_total_solved_in_group(db, s.student_id, selected_group_id)
+            for s in students_in_group:
+                total_solved, total_score = s.total_solved, s.total_score
+                if archived_totals is not None:
+                    total_solved, total_score = archived_totals.get(s.student_id, (0, 0))
                 student_data.append({
                     "ID": s.student_id,
                     "Фамилия": s.last_name,
@@ -48,12 +48,14 @@ try:
                     "Задач решено (группа)": total_solved,
                     "Общий балл (группа)": total_score
                 })
-                prog_bar.progress((i + 1) / total_students, text=f"{prog_text} ({i+1}/{total_students})")
-            prog_bar.empty()
 
             students_df = pd.DataFrame(student_data).set_index("ID")
             st.subheader("Список учеников (нажмите на заголовок для сортировки)")
             st.dataframe(students_df, use_container_width=True)
+            if selected_group.archive_season is None:
+                offer_download("итоги группы (CSV)", f"leaderboard_csv_{selected_group_id}",
+                               lambda report_db: export.spool_csv(export.group_leaderboard_rows(report_db, selected_group_id)),
+                               f"{export.file_name('leaderboard', selected_group_name)}.csv", export.CSV_MIME)
         else:
             st.info("В этой группе пока нет учеников.")
 
@@ -71,7 +73,7 @@ try:
                 if not s_last_name or not s_first_name:
                     st.warning("Фамилия и Имя обязательны.")
                 else:
-                    found_students = crud.find_students_by_name(db, first_name=s_first_name, last_name=s_last_name)
+                    found_students = crud.resolve_student(read_db, first_name=s_first_name, last_name=s_last_name, school_name=s_school or None)
                     student_to_add = None
 
                     if found_students:
@@ -109,7 +111,7 @@ try:
     
     st.divider()
     st.header("Все ученики в базе данных")
-    all_db_students = crud.get_all_students(db)
+    all_db_students = crud.get_all_students(read_db)
     if all_db_students:
         all_student_data = [{
             "ID": s.student_id, "Фамилия": s.last_name, "Имя": s.first_name, 
@@ -117,10 +119,24 @@ try:
             "Дата регистрации": s.registration_date.strftime('%Y-%m-%d %H:%M')
         } for s in all_db_students]
         st.dataframe(pd.DataFrame(all_student_data).set_index("ID"), use_container_width=True)
+
+        archive_seasons = archive.list_archives()
+        if archive_seasons:
+            with st.expander("📦 История ученика по сезонам (включая архив)"):
+                if len(archive_seasons) > archive.max_attached():
+                    st.caption(f"Показаны последние {archive.max_attached()} архивных сезонов из {len(archive_seasons)}.")
+                history_options = {f"{s.last_name} {s.first_name} (ID: {s.student_id})": s.student_id for s in all_db_students}
+                history_label = st.selectbox("Ученик:", options=list(history_options.keys()), key="student_history_select")
+                with archive_session() as archive_db:
+                    season_rows = archive.get_student_season_summary(archive_db, history_options[history_label])
+                if season_rows:
+                    st.dataframe(pd.DataFrame([{
+                        "Сезон": archive.season_label(row.season) if row.season is not None else "Текущие данные",
+                        "Групп": row.groups,
+                        "Занятий с решениями": row.lessons,
+                        "Задач решено": row.solved,
+                    } for row in season_rows]), use_container_width=True, hide_index=True)
+                else:
+                    st.info("У ученика нет решенных задач.")
     else:
         st.info("В базе данных пока нет ни одного ученика.")
-
-
-finally:
-    if 'db' in locals() and db:
-        db.close()
\ No newline at end of file
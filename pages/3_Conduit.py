@@ -1,6 +1,6 @@
 import streamlit as st
-from sqlalchemy.orm import Session
 import pandas as pd
+import altair as alt
 import sys
 import os
 
@@ -8,19 +8,16 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from core import crud, analysis
-from core.crud import get_db
+from core import crud, analysis, export, metrics
+from core.page_session import offer_download, page_sessions
 from core.models import ProblemTypeEnum
 
 st.set_page_config(layout="wide")
 st.title("📊 Кондуит Занятия")
 
-db_session_generator = get_db()
-db: Session = next(db_session_generator)
-
 CALCULATED_COLUMNS = ['Задач решено (занятие)', 'Рейтинг (занятие)']
 
-try:
+with page_sessions("conduit") as (read_db, db):
     query_params = st.query_params
     initial_group_id = query_params.get("group_id", [None])[0]
     initial_lesson_id = query_params.get("lesson_id", [None])[0]
@@ -33,7 +30,7 @@ try:
 
     col1, col2 = st.columns(2)
     with col1:
-        groups = crud.get_all_groups(db)
+        groups = crud.get_all_groups(read_db)
         group_options = {group.group_name: group.group_id for group in groups}
         group_id_to_name = {v: k for k, v in group_options.items()}
         group_names_list = [""] + list(group_options.keys())
@@ -56,7 +53,7 @@ try:
         lesson_id_to_label = {}
         lesson_labels_list = [""]
         if selected_group_id:
-            lessons = crud.get_lessons_for_group(db, selected_group_id)
+            lessons = crud.get_lessons_for_group(read_db, selected_group_id)
             lesson_options = {f"{l.lesson_date} - {l.topic} ({l.subject_area.value})": l.lesson_id for l in lessons}
             lesson_id_to_label = {v: k for k, v in lesson_options.items()}
             lesson_labels_list = [""] + list(lesson_options.keys())
@@ -73,12 +70,48 @@ try:
         else:
             st.selectbox("2. Выберите занятие:", options=["Сначала выберите группу"], disabled=True, index=0)
 
+    if selected_group_id:
+        with st.expander("🗺️ Обзор группы: занятия × ученики", expanded=not selected_lesson_id):
+            overview = analysis.calculate_group_overview(read_db, selected_group_id)
+            if overview.empty:
+                st.info("В группе пока нет занятий или учеников.")
+            else:
+                metric_labels = {"solved": "Задач решено", "score": "Рейтинг"}
+                metric = st.radio(
+                    "Показатель:", options=list(metric_labels.keys()), format_func=lambda key: metric_labels[key],
+                    horizontal=True, key="group_overview_metric"
+                )
+                lessons_part = overview.drop_duplicates("lesson_id")[["lesson_id", "lesson_date", "topic"]]
+                lesson_labels = lessons_part["lesson_date"].astype(str) + " " + lessons_part["topic"]
+                duplicated = lesson_labels.duplicated(keep=False)
+                lesson_labels[duplicated] += " #" + lessons_part.loc[duplicated, "lesson_id"].astype(str)
+                overview["lesson"] = overview["lesson_id"].map(dict(zip(lessons_part["lesson_id"], lesson_labels)))
+                students_part = overview.drop_duplicates("student_id")[["student_id", "student"]]
+                student_labels = students_part["student"].copy()
+                duplicated = student_labels.duplicated(keep=False)
+                student_labels[duplicated] += " #" + students_part.loc[duplicated, "student_id"].astype(str)
+                overview["student_label"] = overview["student_id"].map(dict(zip(students_part["student_id"], student_labels)))
+                student_order = overview.groupby("student_label")[metric].sum().sort_values(ascending=False).index.tolist()
+                chart = alt.Chart(overview[["lesson", "student", "student_label", "column_count", "solved", "score"]]).mark_rect().encode(
+                    x=alt.X("lesson:N", sort=lesson_labels.tolist(), title="Занятие"),
+                    y=alt.Y("student_label:N", sort=student_order, title="Ученик"),
+                    color=alt.Color(f"{metric}:Q", title=metric_labels[metric], scale=alt.Scale(scheme="greens")),
+                    tooltip=[
+                        alt.Tooltip("student:N", title="Ученик"),
+                        alt.Tooltip("lesson:N", title="Занятие"),
+                        alt.Tooltip("solved:Q", title="Задач решено"),
+                        alt.Tooltip("column_count:Q", title="Задач в занятии"),
+                        alt.Tooltip("score:Q", title="Рейтинг"),
+                    ],
+                ).properties(height=max(200, 18 * len(students_part)))
+                st.altair_chart(chart, use_container_width=True)
+
     if selected_lesson_id and selected_group_id:
         st.header(f"Кондуит для занятия: {selected_lesson_label}")
-        lesson = crud.get_lesson_by_id(db, selected_lesson_id)
+        lesson = crud.get_lesson_by_id(read_db, selected_lesson_id)
 
         with st.expander("➕ Добавить / Управлять задачами занятия"):
-            columns_in_lesson = crud.get_columns_for_lesson(db, selected_lesson_id)
+            columns_in_lesson = crud.get_columns_for_lesson(read_db, selected_lesson_id)
             st.write("Существующие колонки:")
             if columns_in_lesson:
                 cols_data = [{"ID": c.column_id, "Метка": c.column_label, "Тип": c.problem_type.value, "Порядок": c.display_order, "Разобрана": c.is_discussed} for c in columns_in_lesson]
@@ -97,13 +130,9 @@ try:
 
                 if st.button("Обновить статус разбора", key=f"discuss_btn_{selected_lesson_id}"):
                     try:
-                        updated_count = 0
-                        for label, col_id in column_options_select.items():
-                            column = crud.get_column_by_id(db, col_id)
-                            should_be_discussed = label in selected_discussed_labels
-                            if column and column.is_discussed != should_be_discussed:
-                                crud.mark_column_discussed(db, col_id, is_discussed=should_be_discussed)
-                                updated_count += 1
+                        updated_count = crud.set_discussed_columns(
+                            db, selected_lesson_id, [column_options_select[label] for label in selected_discussed_labels]
+                        )
                         if updated_count > 0:
                             st.success(f"Статус разбора обновлен ({updated_count} изменений).")
                             st.rerun()
@@ -111,6 +140,35 @@ try:
                             st.info("Статус разбора не изменился.")
                     except Exception as e:
                         st.error(f"Ошибка при обновлении статуса: {e}")
+
+                st.subheader("📚 Связать задачу с каталогом")
+                catalogue_problems = crud.get_all_problems(read_db, lesson.subject_area)
+                if catalogue_problems:
+                    problem_options = {"— не связана —": None}
+                    problem_options.update({f"{p.title} ({p.source})" if p.source else p.title: p.problem_id for p in catalogue_problems})
+                    problem_id_to_label = {v: k for k, v in problem_options.items()}
+                    link_col1, link_col2 = st.columns(2)
+                    with link_col1:
+                        link_column_label = st.selectbox(
+                            "Колонка:", options=list(column_options_select.keys()), key=f"link_column_select_{selected_lesson_id}"
+                        )
+                    link_column = next(c for c in columns_in_lesson if c.column_label == link_column_label)
+                    problem_labels = list(problem_options.keys())
+                    current_problem_label = problem_id_to_label.get(link_column.problem_id, problem_labels[0])
+                    with link_col2:
+                        link_problem_label = st.selectbox(
+                            "Задача из каталога:", options=problem_labels, index=problem_labels.index(current_problem_label),
+                            key=f"link_problem_select_{selected_lesson_id}_{link_column.column_id}"
+                        )
+                    if st.button("Сохранить связь", key=f"link_btn_{selected_lesson_id}"):
+                        try:
+                            crud.link_column_to_problem(db, link_column.column_id, problem_options[link_problem_label])
+                            st.success(f"Связь для колонки '{link_column_label}' сохранена.")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Ошибка при сохранении связи: {e}")
+                else:
+                    st.caption("В каталоге нет задач по предмету этого занятия. Добавьте их на странице 'Задачи'.")
             else:
                 st.info("На этом занятии еще нет задач.")
 
@@ -122,6 +180,10 @@ try:
                 )
                 next_order = max([c.display_order for c in columns_in_lesson], default=-1) + 1 if columns_in_lesson else 0
                 new_col_order = st.number_input("Порядок отображения*", min_value=0, value=next_order)
+                form_problems = crud.get_all_problems(read_db, lesson.subject_area)
+                form_problem_options = {"— не связана —": None}
+                form_problem_options.update({f"{p.title} ({p.source})" if p.source else p.title: p.problem_id for p in form_problems})
+                new_col_problem = st.selectbox("Задача из каталога", options=list(form_problem_options.keys()))
                 submitted_col = st.form_submit_button("Добавить колонку")
 
                 if submitted_col:
@@ -132,7 +194,8 @@ try:
                             problem_enum = ProblemTypeEnum(new_col_type)
                             crud.add_lesson_column(
                                 db, lesson_id=selected_lesson_id, column_label=new_col_label,
-                                problem_type=problem_enum, display_order=new_col_order
+                                problem_type=problem_enum, display_order=new_col_order,
+                                problem_id=form_problem_options[new_col_problem]
                             )
                             st.success(f"Колонка '{new_col_label}' добавлена.")
                             st.rerun()
@@ -149,14 +212,12 @@ try:
         st.subheader("Таблица результатов")
 
         try:
-            conduit_df, problem_ratings = analysis.prepare_conduit_dataframe(db, selected_lesson_id)
+            conduit_df, problem_ratings = analysis.prepare_conduit_dataframe(read_db, selected_lesson_id)
 
             if not conduit_df.empty:
-                discussed_labels = analysis.get_discussed_column_labels(db, selected_lesson_id)
+                discussed_labels = analysis.get_discussed_column_labels(read_db, selected_lesson_id)
                 cols_to_disable = [col for col in discussed_labels if col in conduit_df.columns] + CALCULATED_COLUMNS
 
-                student_name_to_id = analysis.get_student_name_to_id_map(db, selected_group_id)
-                column_label_to_id = analysis.get_column_label_to_id_map(db, selected_lesson_id)
                 editor_key = f"conduit_editor_{selected_lesson_id}"
 
                 st.info("Поставьте/снимите галочку в ячейке и нажмите 'Сохранить изменения'.")
@@ -173,45 +234,18 @@ try:
                     delete_counter = 0
                     error_flag = False
 
-                    original_df_for_compare = conduit_df.drop(columns=CALCULATED_COLUMNS, errors='ignore')
-                    edited_df_for_compare = edited_df.drop(columns=CALCULATED_COLUMNS, errors='ignore')
+                    added_pairs, removed_pairs = analysis.conduit_changes(conduit_df, edited_df)
+                    changes = [(student_id, column_id, True) for student_id, column_id in added_pairs] + [
+                        (student_id, column_id, False) for student_id, column_id in removed_pairs
+                    ]
 
-                    if not original_df_for_compare.equals(edited_df_for_compare):
-                        diff_mask = (original_df_for_compare != edited_df_for_compare)
-                        changed_cells = diff_mask.stack()
-                        changed_cells = changed_cells[changed_cells]
-                        changed_indices = changed_cells.index
-                    else:
-                        level_0_name = original_df_for_compare.index.name if original_df_for_compare.index.name else "index"
-                        level_1_name = original_df_for_compare.columns.name if original_df_for_compare.columns.name else "columns"
-                        changed_indices = pd.MultiIndex.from_tuples(
-                            [],
-                            names=[level_0_name, level_1_name]
-                        )
-
-                    if not changed_indices.empty:
+                    if changes:
                         prog_text = "Сохранение изменений..."
                         progress_bar_save = st.progress(0, text=prog_text)
-                        total_changes = len(changed_indices)
-
-                        for idx, (student_name, col_label) in enumerate(changed_indices):
-                            if col_label in CALCULATED_COLUMNS:
-                                continue
-
-                            student_id = student_name_to_id.get(student_name)
-                            column_id = column_label_to_id.get(col_label)
-                            
-                            current_value_in_edited_df = edited_df_for_compare.loc[student_name, col_label]
-                            if isinstance(current_value_in_edited_df, pd.Series):
-                                solved_status = current_value_in_edited_df.item() 
-                            else:
-                                solved_status = bool(current_value_in_edited_df)
-
-
-                            if student_id is None or column_id is None:
-                                st.warning(f"Не удалось найти ID для {student_name} или {col_label}. Пропускаем.")
-                                continue
+                        total_changes = len(changes)
+                        metrics.CONDUIT_SAVE_CHANGES.observe(total_changes)
 
+                        for idx, (student_id, column_id, solved_status) in enumerate(changes):
                             try:
                                 if solved_status:
                                     crud.add_result(db, student_id, column_id, selected_lesson_id)
@@ -220,12 +254,13 @@ try:
                                     crud.delete_result(db, student_id, column_id)
                                     delete_counter += 1
                             except Exception as save_e:
-                                st.error(f"Ошибка сохранения для {student_name}, задача {col_label}: {save_e}")
+                                st.error(f"Ошибка сохранения для ученика {student_id}, задача {column_id}: {save_e}")
                                 error_flag = True
                                 st.exception(save_e)
                             progress_bar_save.progress((idx + 1) / total_changes, text=f"{prog_text} ({idx+1}/{total_changes})")
 
                         progress_bar_save.empty()
+                        metrics.CONDUIT_SAVES.labels("error" if error_flag else "ok").inc()
 
                         if not error_flag:
                             st.success(f"Изменения успешно сохранены! Добавлено: {save_counter}, Удалено: {delete_counter} отметок.")
@@ -233,6 +268,7 @@ try:
                         else:
                             st.error("Произошли ошибки во время сохранения. Проверьте сообщения выше.")
                     else:
+                        metrics.CONDUIT_SAVES.labels("empty").inc()
                         st.info("Нет изменений для сохранения.")
             else:
                 st.info("В этой группе нет студентов или для этого занятия не добавлены задачи.")
@@ -241,9 +277,23 @@ try:
             st.error(f"Ошибка при загрузке или обработке данных кондуита: {e}")
             st.exception(e)
 
+        with st.expander("⬇️ Выгрузка"):
+            lesson_file = export.file_name("conduit", selected_group_name, lesson.lesson_date, selected_lesson_id)
+            group_file = export.file_name("group", selected_group_name, selected_group_id)
+            st.write("Кондуит занятия:")
+            offer_download("CSV", f"lesson_csv_{selected_lesson_id}",
+                           lambda report_db: export.spool_csv(export.lesson_conduit_rows(report_db, selected_lesson_id)),
+                           f"{lesson_file}.csv", export.CSV_MIME)
+            st.write("Все занятия группы (CSV — одна таблица решенных задач, Excel — лист на каждое занятие и итоги):")
+            offer_download("CSV группы", f"group_csv_{selected_group_id}",
+                           lambda report_db: export.spool_csv(export.group_results_rows(report_db, selected_group_id)),
+                           f"{group_file}.csv", export.CSV_MIME)
+            if export.excel_available():
+                offer_download("Excel группы", f"group_xlsx_{selected_group_id}",
+                               lambda report_db: export.spool_xlsx(export.group_lesson_sheets(report_db, selected_group_id)),
+                               f"{group_file}.xlsx", export.XLSX_MIME)
+            else:
+                st.caption("Для выгрузки в Excel установите openpyxl.")
+
     else:
         st.info("Пожалуйста, выберите группу и занятие выше, чтобы увидеть кондуит.")
-
-finally:
-    if 'db' in locals() and db:
-        db.close()
\ No newline at end of file
@@ -1,5 +1,4 @@
 import streamlit as st
-from sqlalchemy.orm import Session
 import pandas as pd
 import sys
 import os
@@ -8,16 +7,13 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from core import crud
-from core.crud import get_db
-from core.models import EventTypeEnum, Student
+from core import crud, event_leaderboard
+from core.page_session import page_sessions, reporting_session
+from core.models import EventTypeEnum
 st.set_page_config(layout="wide")
 st.title("🎉 Мероприятия")
 
-db_session_generator = get_db()
-db: Session = next(db_session_generator)
-
-try:
+with page_sessions("events") as (read_db, db):
     if 'selected_event_id' not in st.session_state:
         st.session_state.selected_event_id = None
     if 'add_participant_mode' not in st.session_state:
@@ -28,7 +24,7 @@ try:
 
     with col1:
         st.header("Список Мероприятий")
-        events = crud.get_all_events(db)
+        events = crud.get_all_events(read_db)
         if not events:
             st.info("Пока нет ни одного мероприятия.")
         else:
@@ -93,7 +89,7 @@ try:
     
     with col2:
         if st.session_state.selected_event_id:
-            event = crud.get_event_by_id(db, st.session_state.selected_event_id)
+            event = crud.get_event_by_id(read_db, st.session_state.selected_event_id)
             if event:
                 st.header(f"Детали мероприятия: {event.event_name}")
                 st.markdown(f"**Тип:** {event.event_type.value}")
@@ -108,16 +104,42 @@ try:
                 
                 st.divider()
                 st.subheader("Учебные группы в рамках мероприятия")
-                groups_in_event = crud.get_groups_for_event(db, event.event_id)
+                groups_in_event = crud.get_groups_for_event(read_db, event.event_id)
                 if groups_in_event:
                     group_data = [{"ID": g.group_id, "Название": g.group_name, "Описание": g.description or "-"} for g in groups_in_event]
                     st.dataframe(pd.DataFrame(group_data).set_index("ID"), use_container_width=True)
                 else:
                     st.info("К этому мероприятию пока не привязано ни одной учебной группы.")
+
+                if groups_in_event:
+                    st.subheader("🏅 Сводный рейтинг по всем группам")
+                    normalization = st.radio(
+                        "Нормировка баллов:",
+                        options=list(event_leaderboard.NORMALIZATION_LABELS.keys()),
+                        format_func=lambda key: event_leaderboard.NORMALIZATION_LABELS[key],
+                        horizontal=True,
+                        key=f"event_leaderboard_normalization_{event.event_id}"
+                    )
+                    with reporting_session() as report_db:
+                        leaderboard = event_leaderboard.get_event_leaderboard(report_db, event.event_id, normalization)
+                    if leaderboard:
+                        leaderboard_df = pd.DataFrame([{
+                            "Место": row.rank,
+                            "Фамилия": row.last_name,
+                            "Имя": row.first_name,
+                            "Школа": row.school_name or "-",
+                            "Групп": row.groups,
+                            "Задач решено": row.total_solved,
+                            "Баллы": row.total_score,
+                            "Итог": round(row.normalized_score, 2),
+                        } for row in leaderboard]).set_index("Место")
+                        st.dataframe(leaderboard_df, use_container_width=True)
+                    else:
+                        st.info("В группах мероприятия пока нет учеников.")
                 
                 st.divider()
                 st.subheader("Участники мероприятия")
-                participants_in_event_objects = crud.get_students_in_event(db, event.event_id)
+                participants_in_event_objects = crud.get_students_in_event(read_db, event.event_id)
                 participant_ids_in_event = [p.student_id for p in participants_in_event_objects]
 
                 if participants_in_event_objects:
@@ -163,7 +185,7 @@ try:
                     
                     if st.session_state.add_participant_mode == "Выбрать существующего":
                         st.caption("Добавление существующего ученика из базы данных.")
-                        all_students = crud.get_all_students(db)
+                        all_students = crud.get_all_students(read_db)
                         available_students_for_event = [s for s in all_students if s.student_id not in participant_ids_in_event]
                         
                         student_options = {f"{s.last_name} {s.first_name} (ID: {s.student_id})": s.student_id for s in available_students_for_event}
@@ -197,7 +219,7 @@ try:
                                 st.warning("Пожалуйста, выберите ученика из списка.")
                             else:
                                 final_student_id = student_id_to_add
-                                student_obj = crud.get_student_by_id(db, final_student_id)
+                                student_obj = crud.get_student_by_id(read_db, final_student_id)
                                 if student_obj:
                                     student_display_name = f"{student_obj.last_name} {student_obj.first_name}"
 
@@ -206,13 +228,12 @@ try:
                                 st.warning("Фамилия и Имя для нового ученика обязательны.")
                             else:
                                 try:
-                                    existing_student = db.query(Student).filter(
-                                        Student.first_name == s_first_name,
-                                        Student.last_name == s_last_name,
-                                        Student.school_name == (s_school if s_school else None)
-                                    ).first()
+                                    found_students = crud.resolve_student(read_db, s_first_name, s_last_name, s_school or None)
+                                    existing_student = found_students[0] if len(found_students) == 1 else None
 
-                                    if existing_student:
+                                    if len(found_students) > 1:
+                                        st.warning(f"Найдено несколько учеников с именем {s_last_name} {s_first_name}. Укажите школу или используйте опцию 'Выбрать существующего'.")
+                                    elif existing_student:
                                         st.info(f"Найден существующий ученик: {existing_student.last_name} {existing_student.first_name} (Школа: {existing_student.school_name or 'не указана'}). Он будет добавлен на мероприятие.")
                                         final_student_id = existing_student.student_id
                                         student_display_name = f"{existing_student.last_name} {existing_student.first_name}"
@@ -261,7 +282,3 @@ try:
                 st.session_state.selected_event_id = None
         else:
             st.info("Выберите мероприятие из списка слева для просмотра деталей.")
-
-finally:
-    if 'db' in locals() and db:
-        db.close()
\ No newline at end of file
@@ -1,5 +1,4 @@
 import streamlit as st
-from sqlalchemy.orm import Session
 import pandas as pd
 import datetime
 import sys
@@ -9,17 +8,14 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from core import crud
-from core.crud import get_db
+from core import crud, correlation, export, olympiad_analytics
+from core.page_session import offer_download, page_sessions, reporting_session
 from core.models import OlympiadLevelEnum, AwardEnum
 
 st.set_page_config(layout="wide")
 st.title("🏆 Олимпиады и Результаты")
 
-db_session_generator = get_db()
-db: Session = next(db_session_generator)
-
-try:
+with page_sessions("olympiads") as (read_db, db):
     if 'selected_olympiad_id' not in st.session_state:
         st.session_state.selected_olympiad_id = None
     if 'previous_subject_filter' not in st.session_state:
@@ -30,7 +26,7 @@ try:
     with col1:
         st.header("Список Олимпиад")
         
-        olympiads_all = crud.get_all_olympiads(db)
+        olympiads_all = crud.get_all_olympiads(read_db)
         subjects = sorted(list(set(o.subject for o in olympiads_all)))
         
         current_subject_filter = st.selectbox(
@@ -126,7 +122,7 @@ try:
     
     with col2:
         if st.session_state.selected_olympiad_id:
-            olympiad = crud.get_olympiad_by_id(db, st.session_state.selected_olympiad_id)
+            olympiad = crud.get_olympiad_by_id(read_db, st.session_state.selected_olympiad_id)
             if olympiad:
                 st.header(f"Результаты олимпиады: {olympiad.olympiad_name}")
                 st.markdown(f"**Дата:** {olympiad.olympiad_date.strftime('%d.%m.%Y')} | **Уровень:** {olympiad.olympiad_level.value} | **Предмет:** {olympiad.subject}")
@@ -136,7 +132,7 @@ try:
                 st.divider()
                 st.subheader("Внести результат участника")
                 with st.form(f"add_olympiad_result_form_{olympiad.olympiad_id}", clear_on_submit=True):
-                    all_students = crud.get_all_students(db)
+                    all_students = crud.get_all_students(read_db)
                     student_options = {f"{s.last_name} {s.first_name} (ID: {s.student_id})": s.student_id for s in all_students}
                     
                     if not student_options:
@@ -178,11 +174,11 @@ try:
                 
                 st.divider()
                 st.subheader("Список результатов по этой олимпиаде")
-                results_for_olympiad = crud.get_olympiad_results_for_olympiad(db, olympiad.olympiad_id)
+                results_for_olympiad = crud.get_olympiad_results_for_olympiad(read_db, olympiad.olympiad_id)
                 if results_for_olympiad:
                     results_data = []
                     for res in results_for_olympiad:
-                        student = crud.get_student_by_id(db, res.student_id) 
+                        student = crud.get_student_by_id(read_db, res.student_id) 
                         results_data.append({
                             "ID": res.olympiad_result_id,
                             "Фамилия": student.last_name if student else "N/A",
@@ -198,6 +194,14 @@ try:
                          if col_name in df_results.columns:
                             df_results[col_name] = df_results[col_name].astype(str)
                     st.dataframe(df_results.set_index("ID"), use_container_width=True)
+                    results_file = export.file_name("olympiad", olympiad.olympiad_name, olympiad.olympiad_date)
+                    offer_download("CSV", f"olympiad_csv_{olympiad.olympiad_id}",
+                                   lambda report_db: export.spool_csv(export.olympiad_results_rows(report_db, olympiad.olympiad_id)),
+                                   f"{results_file}.csv", export.CSV_MIME)
+                    if export.excel_available():
+                        offer_download("Excel", f"olympiad_xlsx_{olympiad.olympiad_id}",
+                                       lambda report_db: export.spool_xlsx([(olympiad.olympiad_name, export.olympiad_results_rows(report_db, olympiad.olympiad_id))]),
+                                       f"{results_file}.xlsx", export.XLSX_MIME)
                 else:
                     st.info("По этой олимпиаде пока нет внесенных результатов.")
             else:
@@ -208,6 +212,74 @@ try:
         else:
             st.info("Выберите олимпиаду из списка слева для просмотра деталей.")
 
-finally:
-    if 'db' in locals() and db:
-        db.close()
\ No newline at end of file
+    st.divider()
+    st.header("📈 Аналитика олимпиад")
+    with reporting_session() as report_db:
+        summary_years = olympiad_analytics.get_summary_years(report_db)
+        if not summary_years:
+            st.info("Пока нет результатов олимпиад для анализа.")
+        else:
+            year_labels = ["Все годы"] + [str(year) for year in summary_years]
+            selected_year_label = st.selectbox("Год:", options=year_labels, key="olympiad_analytics_year")
+            selected_year = int(selected_year_label) if selected_year_label != "Все годы" else None
+
+            medal_columns = {
+                "name": "Название", "winners": "Победители", "prizes": "Призёры",
+                "mentions": "Похвальные отзывы", "participations": "Участий", "weighted_score": "Взвешенный балл"
+            }
+            medal_tab, ranking_tab, trends_tab, correlation_tab = st.tabs(
+                ["Медальный зачёт", "Рейтинг учеников", "Динамика по годам", "Связь с занятиями"]
+            )
+
+            with medal_tab:
+                medal_scope = st.radio(
+                    "Разрез:", ("По школам", "По группам", "По мероприятиям"), horizontal=True, key="olympiad_medal_scope"
+                )
+                if medal_scope == "По школам":
+                    medal_rows = olympiad_analytics.get_medal_table_by_school(report_db, year=selected_year)
+                elif medal_scope == "По группам":
+                    medal_rows = olympiad_analytics.get_medal_table_by_group(report_db, year=selected_year)
+                else:
+                    medal_rows = olympiad_analytics.get_medal_table_by_event(report_db, year=selected_year)
+
+                if medal_rows:
+                    medal_df = pd.DataFrame([row._asdict() for row in medal_rows]).drop(columns=["key"]).rename(columns=medal_columns)
+                    st.dataframe(medal_df, use_container_width=True, hide_index=True)
+                else:
+                    st.info("Нет данных для выбранного разреза.")
+
+            with ranking_tab:
+                st.caption("Балл = вес уровня олимпиады × вес награды, суммируется по всем результатам ученика.")
+                ranking_rows = olympiad_analytics.get_student_weighted_ranking(report_db, year=selected_year)
+                if ranking_rows:
+                    ranking_df = pd.DataFrame([row._asdict() for row in ranking_rows]).rename(columns={
+                        "student_id": "ID", "last_name": "Фамилия", "first_name": "Имя", "school_name": "Школа",
+                        "participations": "Участий", "winners": "Победы", "prizes": "Призы", "weighted_score": "Взвешенный балл"
+                    })
+                    ranking_df["Школа"] = ranking_df["Школа"].fillna("-")
+                    st.dataframe(ranking_df.set_index("ID"), use_container_width=True)
+                else:
+                    st.info("Нет данных за выбранный период.")
+
+            with trends_tab:
+                trend_rows = olympiad_analytics.get_yearly_trends(report_db)
+                trends_df = pd.DataFrame([row._asdict() for row in trend_rows]).rename(columns={
+                    "olympiad_year": "Год", "participations": "Участий", "winners": "Победители", "prizes": "Призёры",
+                    "mentions": "Похвальные отзывы", "weighted_score": "Взвешенный балл", "weighted_change": "Изменение балла, %"
+                }).set_index("Год")
+                st.dataframe(trends_df, use_container_width=True)
+                st.line_chart(trends_df[["Победители", "Призёры", "Похвальные отзывы"]])
+
+            with correlation_tab:
+                st.caption(
+                    "Ранговая корреляция (Спирмен) между показателями учеников на занятиях и их результатами на олимпиадах. "
+                    "Учитываются только ученики, участвовавшие хотя бы в одной олимпиаде."
+                )
+                correlation_method = st.radio(
+                    "Метод:", ("spearman", "pearson"), horizontal=True, key="olympiad_correlation_method"
+                )
+                correlations_df = correlation.compute_olympiad_correlations(report_db, method=correlation_method)
+                if correlations_df.empty or correlations_df["Учеников"].max() < 3:
+                    st.info("Недостаточно данных для расчета корреляций.")
+                else:
+                    st.dataframe(correlations_df.round(3), use_container_width=True)
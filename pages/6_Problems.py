@@ -0,0 +1,85 @@
+import streamlit as st
+import pandas as pd
+import sys
+import os
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core import crud, problem_index
+from core.page_session import page_sessions
+from core.models import SubjectAreaEnum
+
+st.set_page_config(layout="wide")
+st.title("📚 Каталог задач")
+
+with page_sessions("problems") as (read_db, db):
+    subject_filter = st.selectbox(
+        "Фильтр по предмету:", options=["Все"] + [s.value for s in SubjectAreaEnum], key="problem_subject_filter"
+    )
+    selected_subject = None if subject_filter == "Все" else SubjectAreaEnum(subject_filter)
+
+    tab_catalogue, tab_hardest = st.tabs(["Каталог", "Самые сложные задачи"])
+
+    with tab_catalogue:
+        with st.expander("➕ Добавить задачу в каталог"):
+            with st.form("add_problem_form", clear_on_submit=True):
+                new_title = st.text_input("Название*")
+                new_subject = st.selectbox("Предмет*", options=[s.value for s in SubjectAreaEnum])
+                new_source = st.text_input("Источник (олимпиада, сборник)")
+                new_statement = st.text_area("Условие")
+                submitted = st.form_submit_button("Добавить задачу")
+                if submitted:
+                    if not new_title:
+                        st.warning("Название задачи обязательно.")
+                    else:
+                        try:
+                            crud.create_problem(
+                                db, title=new_title, subject_area=SubjectAreaEnum(new_subject),
+                                source=new_source or None, statement=new_statement or None
+                            )
+                            st.success(f"Задача '{new_title}' добавлена в каталог.")
+                            st.rerun()
+                        except Exception as e:
+                            if "UNIQUE constraint failed" in str(e):
+                                st.error("Ошибка: задача с таким названием и источником уже есть в каталоге.")
+                            else:
+                                st.error(f"Ошибка добавления задачи: {e}")
+
+        catalogue = problem_index.get_problem_catalogue(read_db, selected_subject)
+        if catalogue:
+            catalogue_df = pd.DataFrame([{
+                "ID": row.problem_id,
+                "Задача": row.title,
+                "Источник": row.source,
+                "Предмет": row.subject_area.value,
+                "Использований": row.times_used,
+                "Решений": row.solved_total,
+                "Из возможных": row.participants_total,
+                "Решаемость, %": round(row.solve_rate * 100, 1) if row.solve_rate is not None else None,
+                "Средний рейтинг": round(row.avg_rating, 2) if row.avg_rating is not None else None,
+            } for row in catalogue]).set_index("ID")
+            st.dataframe(catalogue_df, use_container_width=True)
+        else:
+            st.info("В каталоге пока нет задач.")
+
+    with tab_hardest:
+        col1, col2 = st.columns(2)
+        with col1:
+            min_uses = st.number_input("Минимум использований на занятиях", min_value=1, value=1)
+        with col2:
+            limit = st.number_input("Количество задач", min_value=1, max_value=200, value=20)
+        hardest = problem_index.get_hardest_problems(read_db, selected_subject, limit=int(limit), min_uses=int(min_uses))
+        if hardest:
+            hardest_df = pd.DataFrame([{
+                "Задача": row.title,
+                "Источник": row.source,
+                "Предмет": row.subject_area.value,
+                "Использований": row.times_used,
+                "Решаемость, %": round(row.solve_rate * 100, 1),
+                "Средний рейтинг": round(row.avg_rating, 2) if row.avg_rating is not None else None,
+            } for row in hardest])
+            st.dataframe(hardest_df, use_container_width=True, hide_index=True)
+        else:
+            st.info("Нет задач, использованных на занятиях.")
@@ -0,0 +1,48 @@
+import streamlit as st
+import pandas as pd
+import sys
+import os
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core import cache, correlation, event_leaderboard, profiling
+from core.page_session import connection_stats
+
+st.set_page_config(layout="wide")
+st.title("🩺 Диагностика")
+
+if not profiling.PROFILING_ENABLED:
+    st.info(f"Страница доступна при запуске с переменной окружения {profiling.PROFILE_ENV}=1.")
+    st.stop()
+
+st.caption(
+    f"Профили вызовов дольше {profiling.PROFILE_THRESHOLD_MS:.0f} мс сохраняются в {profiling.PROFILE_DIR} "
+    f"(открываются через `python -m pstats`, snakeviz или flameprof). "
+    f"Разбивка sql/orm/pandas — собственное время функций в последнем медленном вызове."
+)
+
+st.header("Функции анализа и CRUD")
+summary = profiling.profile_summary()
+if summary:
+    st.dataframe(pd.DataFrame(summary).round(1), hide_index=True, use_container_width=True)
+else:
+    st.info("Пока нет ни одного замеренного вызова.")
+if st.button("Сбросить статистику"):
+    profiling.reset_profile_summary()
+    st.rerun()
+
+st.header("Соединения с базой")
+st.dataframe(pd.DataFrame(connection_stats()).T.round(2), use_container_width=True)
+
+st.header("Кэши")
+analysis_cache = cache.cache_stats()
+per_function = analysis_cache.pop("functions")
+st.json({
+    "analysis": analysis_cache,
+    "event_leaderboard": event_leaderboard.event_leaderboard_cache_stats(),
+    "correlation_features": correlation.feature_cache_stats(),
+})
+if per_function:
+    st.dataframe(pd.DataFrame(per_function).T.fillna(0).astype(int), use_container_width=True)
@@ -0,0 +1,130 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core import analysis, queries
+from core.models import Lesson
+from scripts.benchmark_data import build_benchmark_database
+
+CALCULATED_COLUMNS = ['Задач решено (занятие)', 'Рейтинг (занятие)']
+
+
+def prepare_with_objects(db, lesson_id):
+    lesson = queries.get_lesson(db, lesson_id)
+    students = queries.get_students_in_group(db, lesson.group_id)
+    columns = queries.get_columns_for_lesson(db, lesson_id)
+    results = queries.get_results_for_lesson(db, lesson_id)
+
+    solved_counts = {}
+    for res in results:
+        solved_counts[res.column_id] = solved_counts.get(res.column_id, 0) + 1
+    problem_ratings = {col.column_id: (len(students) - solved_counts.get(col.column_id, 0)) + 1 for col in columns}
+    student_map = {s.student_id: f"{s.last_name} {s.first_name}" for s in students}
+
+    df = pd.DataFrame(index=[student_map[s.student_id] for s in students], columns=[c.column_label for c in columns])
+    df = df.fillna(False)
+    solved_map = {}
+    for res in results:
+        solved_map.setdefault(res.student_id, set()).add(res.column_id)
+    for s in students:
+        solved_cols_ids = solved_map.get(s.student_id, set())
+        for col in columns:
+            if col.column_id in solved_cols_ids:
+                df.loc[student_map[s.student_id], col.column_label] = True
+    lesson_scores = {}
+    lesson_solved_counts = {}
+    for s in students:
+        solved_cols_ids = solved_map.get(s.student_id, set())
+        lesson_scores[student_map[s.student_id]] = sum(problem_ratings.get(c, 0) for c in solved_cols_ids)
+        lesson_solved_counts[student_map[s.student_id]] = len(solved_cols_ids)
+    df['Задач решено (занятие)'] = df.index.map(lesson_solved_counts)
+    df['Рейтинг (занятие)'] = df.index.map(lesson_scores)
+
+    name_to_id = {name: student_id for student_id, name in student_map.items()}
+    label_to_id = {c.column_label: c.column_id for c in columns}
+    return df, name_to_id, label_to_id
+
+
+def diff_with_labels(original, edited, name_to_id, label_to_id):
+    before = original.drop(columns=CALCULATED_COLUMNS)
+    after = edited.drop(columns=CALCULATED_COLUMNS)
+    changed = (before != after).stack()
+    changes = []
+    for student_name, col_label in changed[changed].index:
+        changes.append((name_to_id[student_name], label_to_id[col_label], bool(after.loc[student_name, col_label])))
+    return sorted(changes)
+
+
+def diff_with_xor(original, edited):
+    added, removed = analysis.conduit_changes(original, edited)
+    return sorted([(s, c, True) for s, c in added] + [(s, c, False) for s, c in removed])
+
+
+def flip_cells(df, share, rng):
+    edited = df.copy()
+    problem_columns = [c for c in df.columns if c not in CALCULATED_COLUMNS]
+    cells = [(i, j) for i in range(len(df)) for j in range(len(problem_columns))]
+    for i, j in rng.sample(cells, max(1, int(len(cells) * share))):
+        edited.iat[i, j] = not bool(edited.iat[i, j])
+    return edited
+
+
+def best_of(repeats, func, *args):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        value = func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение object- и bool-представления кондуита и поиска изменений при сохранении.")
+    parser.add_argument("--students", type=int, default=200, help="учеников в группе")
+    parser.add_argument("--columns", type=int, default=50, help="задач на занятии")
+    parser.add_argument("--lessons", type=int, default=3, help="занятий в синтетической базе (замер на первом)")
+    parser.add_argument("--repeats", type=int, default=5, help="повторов, берется лучшее время")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    build_benchmark_database(path, 1, args.students, args.lessons, args.columns)
+    engine = create_engine(f"sqlite:///{path}")
+    rng = random.Random(0)
+
+    with Session(bind=engine) as db:
+        lesson_id = db.execute(select(Lesson.lesson_id).order_by(Lesson.lesson_id)).scalars().first()
+        old_ms, (old_df, name_to_id, label_to_id) = best_of(args.repeats, prepare_with_objects, db, lesson_id)
+        new_ms, (new_df, _) = best_of(args.repeats, analysis.prepare_conduit_dataframe.uncached, db, lesson_id)
+
+    assert (old_df.drop(columns=CALCULATED_COLUMNS).astype(bool).to_numpy() == new_df.drop(columns=CALCULATED_COLUMNS).to_numpy()).all()
+    assert (old_df[CALCULATED_COLUMNS].to_numpy() == new_df[CALCULATED_COLUMNS].to_numpy()).all()
+
+    print(f"Кондуит {args.students}×{args.columns}")
+    print(f"{'':<36}{'object':>14}{'bool':>14}")
+    print(f"{'построение, мс':<36}{old_ms:>14.1f}{new_ms:>14.1f}")
+    print(f"{'память, КБ':<36}{old_df.memory_usage(deep=True).sum() / 1024:>14.1f}"
+          f"{new_df.memory_usage(deep=True).sum() / 1024:>14.1f}")
+    for share in (0.0, 0.01, 0.1, 1.0):
+        old_edited = flip_cells(old_df, share, random.Random(rng.random())) if share else old_df.copy()
+        new_edited = new_df.copy()
+        new_edited.iloc[:, :args.columns] = old_edited.iloc[:, :args.columns].astype(bool).to_numpy()
+        old_diff_ms, old_changes = best_of(args.repeats, diff_with_labels, old_df, old_edited, name_to_id, label_to_id)
+        new_diff_ms, new_changes = best_of(args.repeats, diff_with_xor, new_df, new_edited)
+        assert old_changes == new_changes
+        print(f"{f'поиск изменений {share:.0%} ({len(new_changes)}), мс':<36}{old_diff_ms:>14.2f}{new_diff_ms:>14.2f}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
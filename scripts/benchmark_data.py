@@ -0,0 +1,72 @@
+import datetime
+import os
+import random
+import sys
+
+from sqlalchemy import create_engine
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.models import (
+    Base, Student, StudyGroup, Participant, Lesson, LessonColumn, Result,
+    SubjectAreaEnum, ProblemTypeEnum
+)
+
+
+CHUNK_SIZE = 10000
+
+
+def _insert_chunked(connection, table, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        connection.execute(table.insert(), rows[start:start + CHUNK_SIZE])
+
+
+def build_benchmark_database(path, num_groups=4, students_per_group=200, lessons_per_group=60,
+                             columns_per_lesson=12, solved_probability=0.5, seed=0):
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    students, groups, participants, lessons, columns, results = [], [], [], [], [], []
+    student_id = lesson_id = column_id = 0
+    for group_id in range(1, num_groups + 1):
+        groups.append({"group_id": group_id, "group_name": f"Бенчмарк-группа {group_id}"})
+        group_student_ids = []
+        for _ in range(students_per_group):
+            student_id += 1
+            students.append({"student_id": student_id, "first_name": f"Имя{student_id}", "last_name": f"Фамилия{student_id}"})
+            participants.append({"student_id": student_id, "group_id": group_id})
+            group_student_ids.append(student_id)
+
+        for j in range(lessons_per_group):
+            lesson_id += 1
+            lessons.append({
+                "lesson_id": lesson_id, "group_id": group_id,
+                "lesson_date": datetime.date(2024, 9, 1) + datetime.timedelta(days=j),
+                "topic": f"Занятие {j + 1}", "subject_area": rng.choice(list(SubjectAreaEnum)),
+            })
+            for k in range(columns_per_lesson):
+                column_id += 1
+                columns.append({
+                    "column_id": column_id, "lesson_id": lesson_id, "column_label": str(k + 1),
+                    "problem_type": ProblemTypeEnum.REGULAR, "display_order": k, "is_discussed": False,
+                })
+                for s_id in group_student_ids:
+                    if rng.random() < solved_probability:
+                        results.append({"student_id": s_id, "column_id": column_id, "lesson_id": lesson_id})
+
+    with engine.begin() as connection:
+        _insert_chunked(connection, Student.__table__, students)
+        _insert_chunked(connection, StudyGroup.__table__, groups)
+        _insert_chunked(connection, Participant.__table__, participants)
+        _insert_chunked(connection, Lesson.__table__, lessons)
+        _insert_chunked(connection, LessonColumn.__table__, columns)
+        _insert_chunked(connection, Result.__table__, results)
+    engine.dispose()
+
+    print(f"Создана база {path}: {len(students)} учеников, {len(lessons)} занятий, {len(columns)} задач, {len(results)} результатов.")
+    return path
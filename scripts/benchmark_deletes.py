@@ -0,0 +1,93 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core import crud
+from core.models import Lesson, LessonColumn, Participant, Result, StudyGroup
+from scripts.benchmark_data import build_benchmark_database
+
+
+def delete_with_orm_cascade(db, group_id):
+    group = db.get(StudyGroup, group_id)
+    for lesson in group.lessons:
+        for column in lesson.lesson_columns:
+            list(column.results)
+        list(lesson.results)
+    list(group.participants)
+    db.delete(group)
+    db.commit()
+
+
+def delete_with_database_cascade(db, group_id):
+    db.delete(db.get(StudyGroup, group_id))
+    db.commit()
+
+
+def delete_with_bulk_statements(db, group_id):
+    crud.delete_group(db, group_id)
+
+
+def remaining_rows(db):
+    return tuple(db.execute(select(func.count()).select_from(table)).scalar() for table in (
+        StudyGroup, Participant, Lesson, LessonColumn, Result
+    ))
+
+
+def measure(source_path, workdir, deleter, group_id):
+    path = os.path.join(workdir, f"{deleter.__name__}.db")
+    shutil.copyfile(source_path, path)
+    engine = create_engine(f"sqlite:///{path}")
+    with Session(bind=engine) as db:
+        tracemalloc.start()
+        started = time.perf_counter()
+        deleter(db, group_id)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        remaining = remaining_rows(db)
+    engine.dispose()
+    return elapsed, peak, remaining
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение способов удаления группы со всеми занятиями и результатами.")
+    parser.add_argument("--students", type=int, default=200, help="учеников в группе")
+    parser.add_argument("--lessons", type=int, default=50, help="занятий в группе")
+    parser.add_argument("--columns", type=int, default=20, help="задач на занятии")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        source_path = os.path.join(workdir, "benchmark.db")
+        build_benchmark_database(source_path, 2, args.students, args.lessons, args.columns)
+        deleters = [
+            ("ORM-каскад", delete_with_orm_cascade),
+            ("Каскад в БД", delete_with_database_cascade),
+            ("Пакетный DELETE", delete_with_bulk_statements),
+        ]
+        print(f"{'':<18}{'время, с':>12}{'пик памяти, МБ':>18}")
+        outcomes = set()
+        for label, deleter in deleters:
+            elapsed, peak, remaining = measure(source_path, workdir, deleter, 1)
+            outcomes.add(remaining)
+            print(f"{label:<18}{elapsed:>12.3f}{peak / (1024 * 1024):>18.1f}")
+        assert len(outcomes) == 1, outcomes
+        print(f"Осталось строк (группы, участия, занятия, задачи, результаты): {outcomes.pop()}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
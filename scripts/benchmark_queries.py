@@ -0,0 +1,99 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core import crud, queries
+from core.models import Result
+from scripts.benchmark_data import build_benchmark_database
+
+
+def load_with_orm(db, lesson_id):
+    lesson = crud.get_lesson_by_id(db, lesson_id)
+    return (
+        crud.get_students_in_group(db, lesson.group_id),
+        crud.get_columns_for_lesson(db, lesson_id),
+        crud.get_results_for_lesson(db, lesson_id),
+    )
+
+
+def load_with_rows(db, lesson_id):
+    lesson = queries.get_lesson(db, lesson_id)
+    return (
+        queries.get_students_in_group(db, lesson.group_id),
+        queries.get_columns_for_lesson(db, lesson_id),
+        queries.get_results_for_lesson(db, lesson_id),
+    )
+
+
+def checksum(loaded):
+    students, columns, results = loaded
+    return (
+        tuple(s.student_id for s in students),
+        tuple(c.column_id for c in columns),
+        sum(r.student_id * 31 + r.column_id for r in results),
+    )
+
+
+def measure(engine, loader, lesson_ids):
+    checksums = []
+    with Session(bind=engine) as db:
+        started = time.perf_counter()
+        for lesson_id in lesson_ids:
+            checksums.append(checksum(loader(db, lesson_id)))
+        elapsed = time.perf_counter() - started
+
+    peak = 0
+    with Session(bind=engine) as db:
+        for lesson_id in lesson_ids[:20]:
+            tracemalloc.start()
+            loaded = loader(db, lesson_id)
+            _, lesson_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del loaded
+            peak = max(peak, lesson_peak)
+    return elapsed, peak, checksums
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение ORM-сущностей и легковесных строк для запросов анализа.")
+    parser.add_argument("--database", help="путь к существующей базе (по умолчанию создается синтетическая)")
+    parser.add_argument("--groups", type=int, default=4)
+    parser.add_argument("--students", type=int, default=200, help="учеников в группе")
+    parser.add_argument("--lessons", type=int, default=60, help="занятий в группе")
+    parser.add_argument("--columns", type=int, default=12, help="задач на занятии")
+    args = parser.parse_args()
+
+    path = args.database
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+        build_benchmark_database(path, args.groups, args.students, args.lessons, args.columns)
+
+    engine = create_engine(f"sqlite:///{path}")
+    with Session(bind=engine) as db:
+        lesson_ids = [lesson.lesson_id for group in crud.get_all_groups(db) for lesson in queries.get_lessons_for_group(db, group.group_id)]
+        result_count = db.execute(select(func.count(Result.result_id))).scalar()
+
+    measure(engine, load_with_rows, lesson_ids[:1])
+    orm_time, orm_peak, orm_loaded = measure(engine, load_with_orm, lesson_ids)
+    rows_time, rows_peak, rows_loaded = measure(engine, load_with_rows, lesson_ids)
+    assert orm_loaded == rows_loaded
+
+    print(f"Занятий: {len(lesson_ids)}, результатов: {result_count}")
+    print(f"{'':<10}{'время, с':>12}{'пик памяти на занятие, КБ':>28}")
+    print(f"{'ORM':<10}{orm_time:>12.3f}{orm_peak / 1024:>28.1f}")
+    print(f"{'Строки':<10}{rows_time:>12.3f}{rows_peak / 1024:>28.1f}")
+    print(f"Ускорение: {orm_time / rows_time:.1f}x, экономия памяти: {orm_peak / max(rows_peak, 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_TARGETS = [
+    "core.migrate",
+    "core.recompute",
+    "scripts.seed_database",
+    "core.crud",
+    "core.analysis",
+]
+
+
+def parse_importtime(stderr):
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, int(cumulative_us), name.strip()))
+    return entries
+
+
+def measure(target, runs):
+    totals = []
+    top_level = {}
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+            cwd=project_root, capture_output=True, text=True, check=True,
+        )
+        entries = parse_importtime(completed.stderr)
+        totals.append(sum(cumulative for depth, cumulative, _ in entries if depth == 0))
+        for depth, cumulative, name in entries:
+            if "." not in name and depth > 0:
+                top_level.setdefault(name, []).append(cumulative)
+    heaviest = sorted(((statistics.median(v), k) for k, v in top_level.items()), reverse=True)
+    return statistics.median(totals), heaviest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время импорта точек входа (python -X importtime).")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    for target in args.targets:
+        total_us, heaviest = measure(target, args.runs)
+        print(f"{target:<24}{total_us / 1000:>10.1f} мс")
+        for cumulative_us, name in heaviest[:args.top]:
+            print(f"    {name:<36}{cumulative_us / 1000:>8.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
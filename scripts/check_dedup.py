@@ -0,0 +1,114 @@
+import datetime
+import os
+import sys
+import tempfile
+from typing import List
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core import correlation, crud, dedup, event_leaderboard
+from core.models import Base, EventTypeEnum, Participant, Student, SubjectAreaEnum
+
+
+class MergeScenario:
+    def __init__(self, db: Session):
+        event = crud.create_event(db, "Проверка дубликатов", EventTypeEnum.GATHERING)
+        keep_group = crud.create_group(db, "Проверка дубликатов 1", event_id=event.event_id)
+        group = crud.create_group(db, "Проверка дубликатов 2", event_id=event.event_id)
+        other = crud.create_student(db, "Анна", "Смирнова")
+        keep = crud.create_student(db, "Иван", "Петров")
+        duplicate = crud.create_student(db, "Иван", "Петров", "Школа 1")
+        for student, group_id in ((other, keep_group.group_id), (keep, keep_group.group_id),
+                                  (other, group.group_id), (duplicate, group.group_id)):
+            crud.add_student_to_group(db, student.student_id, group_id)
+        lesson = crud.create_lesson_with_columns(
+            db, group.group_id, datetime.date(2025, 1, 15), "Инварианты", SubjectAreaEnum.COMBINATORICS, ["1", "2"]
+        )
+        columns = crud.get_columns_for_lesson(db, lesson.lesson_id)
+        crud.add_result(db, duplicate.student_id, columns[0].column_id, lesson.lesson_id)
+        crud.add_result(db, other.student_id, columns[1].column_id, lesson.lesson_id)
+
+        self.event_id = event.event_id
+        self.group_id = group.group_id
+        self.keep_id = keep.student_id
+        self.duplicate_id = duplicate.student_id
+
+
+def merge(db: Session, scenario: MergeScenario) -> List[str]:
+    duplicate_sets = [s for s in dedup.find_duplicate_sets(db) if s.keep_id == scenario.keep_id]
+    if [s.duplicate_ids for s in duplicate_sets] != [[scenario.duplicate_id]]:
+        return [f"найдены дубликаты {[s.duplicate_ids for s in duplicate_sets]}, ожидался [{scenario.duplicate_id}]"]
+    try:
+        dedup.merge_duplicate_sets(db, duplicate_sets)
+    except IntegrityError as e:
+        db.rollback()
+        return [f"объединение завершилось ошибкой: {e.orig}"]
+    return []
+
+
+def check_students(db: Session, scenario: MergeScenario) -> List[str]:
+    problems = []
+    students = dict(db.execute(select(Student.student_id, Student.school_name).where(Student.last_name == "Петров")).all())
+    if students != {scenario.keep_id: "Школа 1"}:
+        problems.append(f"ученики после объединения {students}, ожидался {{{scenario.keep_id}: 'Школа 1'}}")
+    members = set(db.execute(select(Participant.student_id).where(Participant.group_id == scenario.group_id)).scalars())
+    if scenario.duplicate_id in members or scenario.keep_id not in members:
+        problems.append(f"состав группы после объединения {sorted(members)}")
+    return problems
+
+
+def check_event_leaderboard(db: Session, scenario: MergeScenario) -> List[str]:
+    leaderboard = {row.student_id: (row.total_solved, row.total_score)
+                   for row in event_leaderboard.get_event_leaderboard(db, scenario.event_id)}
+    expected = {student_id: totals for (_, student_id), totals in event_leaderboard._load_totals(db, scenario.event_id).items()}
+    problems = []
+    if scenario.duplicate_id in leaderboard:
+        problems.append(f"рейтинг мероприятия содержит удаленного ученика {scenario.duplicate_id}")
+    if leaderboard.get(scenario.keep_id) != expected.get(scenario.keep_id):
+        problems.append(f"итоги ученика {scenario.keep_id} в рейтинге мероприятия {leaderboard.get(scenario.keep_id)}, "
+                        f"по пересчету {expected.get(scenario.keep_id)}")
+    return problems
+
+
+def check_feature_matrix(db: Session, scenario: MergeScenario) -> List[str]:
+    cached = correlation.get_student_feature_matrix(db)
+    fresh = correlation.FeatureMatrixCache().get_matrix(db)
+    problems = []
+    if scenario.duplicate_id in cached.index:
+        problems.append(f"матрица признаков содержит удаленного ученика {scenario.duplicate_id}")
+    if not cached.equals(fresh):
+        problems.append("матрица признаков из кэша не совпадает с полным пересчетом")
+    return problems
+
+
+def main() -> int:
+    path = os.path.join(tempfile.mkdtemp(), "check_dedup.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with Session(bind=engine) as db:
+        scenario = MergeScenario(db)
+        event_leaderboard.get_event_leaderboard(db, scenario.event_id)
+        correlation.get_student_feature_matrix(db)
+        problems = merge(db, scenario)
+        if not problems:
+            for check in (check_students, check_event_leaderboard, check_feature_matrix):
+                problems += check(db, scenario)
+    engine.dispose()
+
+    for problem in problems:
+        print(f"  {problem}")
+    if problems:
+        print(f"Объединение дубликатов: нарушений {len(problems)}.")
+        return 1
+    print("Объединение дубликатов: OK")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
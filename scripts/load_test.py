@@ -0,0 +1,248 @@
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core import analysis, crud, migrate
+from core.models import DATABASE_PATH, Lesson, LessonColumn, Participant
+from scripts.benchmark_data import build_benchmark_database
+
+SCALE_PROFILES = {
+    "seeded": None,
+    "small": (2, 30, 30, 8),
+    "medium": (4, 120, 60, 12),
+    "large": (6, 250, 60, 15),
+}
+
+ENGINE_SETTINGS = {
+    "default": {"journal_mode": "DELETE", "synchronous": "FULL", "timeout": 5.0},
+    "no-wait": {"journal_mode": "DELETE", "synchronous": "FULL", "timeout": 0.0},
+    "wal": {"journal_mode": "WAL", "synchronous": "NORMAL", "timeout": 5.0},
+    "wal-long-wait": {"journal_mode": "WAL", "synchronous": "NORMAL", "timeout": 30.0},
+}
+
+OPERATIONS = ("conduit", "toggle", "leaderboard")
+START_DELAY = 3.0
+
+
+def prepare_database(profile: str, workdir: str) -> str:
+    source_path = os.path.join(workdir, f"{profile}.db")
+    if SCALE_PROFILES[profile] is None:
+        shutil.copyfile(DATABASE_PATH, source_path)
+    else:
+        build_benchmark_database(source_path, *SCALE_PROFILES[profile])
+    engine = create_engine(f"sqlite:///{source_path}")
+    migrate.upgrade(engine)
+    engine.dispose()
+    return source_path
+
+
+def load_targets(path: str) -> Dict[str, object]:
+    engine = create_engine(f"sqlite:///{path}")
+    with Session(bind=engine) as db:
+        columns: Dict[int, List[int]] = {}
+        for lesson_id, column_id in db.execute(select(LessonColumn.lesson_id, LessonColumn.column_id)):
+            columns.setdefault(lesson_id, []).append(column_id)
+        lessons = [
+            (lesson_id, group_id, columns[lesson_id])
+            for lesson_id, group_id in db.execute(select(Lesson.lesson_id, Lesson.group_id))
+            if lesson_id in columns
+        ]
+        members: Dict[int, List[int]] = {}
+        for group_id, student_id in db.execute(select(Participant.group_id, Participant.student_id)):
+            members.setdefault(group_id, []).append(student_id)
+    engine.dispose()
+    lessons = [lesson for lesson in lessons if members.get(lesson[1])]
+    return {"lessons": lessons, "members": members}
+
+
+def copy_with_setting(source_path: str, workdir: str, setting: str) -> str:
+    path = os.path.join(workdir, f"run-{setting}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    shutil.copyfile(source_path, path)
+    connection = sqlite3.connect(path)
+    connection.execute(f"PRAGMA journal_mode={ENGINE_SETTINGS[setting]['journal_mode']}")
+    connection.close()
+    return path
+
+
+def _create_worker_engine(path: str, setting: str):
+    options = ENGINE_SETTINGS[setting]
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": options["timeout"]})
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA synchronous={options['synchronous']}")
+        cursor.close()
+
+    return engine
+
+
+def _run_operation(db: Session, rng: random.Random, operation: str, targets: Dict[str, object]) -> None:
+    lesson_id, group_id, column_ids = rng.choice(targets["lessons"])
+    if operation == "conduit":
+        analysis.prepare_conduit_dataframe.uncached(db, lesson_id)
+    elif operation == "toggle":
+        student_id = rng.choice(targets["members"][group_id])
+        column_id = rng.choice(column_ids)
+        if not crud.delete_result(db, student_id, column_id):
+            crud.add_result(db, student_id, column_id, lesson_id)
+    else:
+        analysis.calculate_group_leaderboard.uncached(db, group_id)
+
+
+def _outcome(error: Exception) -> str:
+    message = str(error).lower()
+    return "locked" if "database is locked" in message or "database is busy" in message else "error"
+
+
+def run_worker(path: str, setting: str, worker_index: int, start_at: float, duration: float,
+               mix: Dict[str, int], targets: Dict[str, object]) -> List[Tuple[str, float, str]]:
+    rng = random.Random(worker_index)
+    operations, weights = list(mix.keys()), list(mix.values())
+    engine = _create_worker_engine(path, setting)
+    samples = []
+    with Session(bind=engine) as db:
+        for operation in ("conduit", "leaderboard"):
+            _run_operation(db, rng, operation, targets)
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.perf_counter() + duration
+    with Session(bind=engine) as db:
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            started = time.perf_counter()
+            try:
+                _run_operation(db, rng, operation, targets)
+                outcome = "ok"
+            except OperationalError as e:
+                db.rollback()
+                outcome = _outcome(e)
+            except Exception:
+                db.rollback()
+                outcome = "error"
+            samples.append((operation, time.perf_counter() - started, outcome))
+    engine.dispose()
+    return samples
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List[Tuple[str, float, str]], duration: float) -> Dict[str, float]:
+    latencies = sorted(latency for _, latency, outcome in samples if outcome == "ok")
+    total = len(samples)
+    locked = sum(1 for _, _, outcome in samples if outcome == "locked")
+    errors = sum(1 for _, _, outcome in samples if outcome == "error")
+    return {
+        "operations": total,
+        "throughput": len(latencies) / duration if duration else 0.0,
+        "p50": percentile(latencies, 50) * 1000,
+        "p95": percentile(latencies, 95) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "locked_rate": locked / total * 100 if total else 0.0,
+        "errors": errors,
+    }
+
+
+def run_load(source_path: str, workdir: str, setting: str, workers: int, duration: float,
+             mix: Dict[str, int], targets: Dict[str, object]) -> List[Tuple[str, float, str]]:
+    path = copy_with_setting(source_path, workdir, setting)
+    start_at = time.time() + START_DELAY
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_worker, path, setting, index, start_at, duration, mix, targets)
+            for index in range(workers)
+        ]
+        return [sample for future in futures for sample in future.result()]
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"неизвестная операция: {name}")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("хотя бы одна операция должна иметь ненулевой вес")
+    return mix
+
+
+def parse_list(text: str) -> List[str]:
+    return [part.strip() for part in text.split(",") if part.strip()]
+
+
+def print_row(label: str, summary: Dict[str, float]):
+    print(f"{label:<34}{summary['operations']:>8}{summary['throughput']:>10.1f}"
+          f"{summary['p50']:>10.1f}{summary['p95']:>10.1f}{summary['p99']:>10.1f}"
+          f"{summary['locked_rate']:>11.2f}{summary['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест: одновременные преподаватели отмечают задачи и смотрят итоги.")
+    parser.add_argument("--profiles", type=parse_list, default=["seeded", "medium"],
+                        help=f"масштабы данных через запятую: {', '.join(SCALE_PROFILES)} (seeded — копия рабочей базы)")
+    parser.add_argument("--settings", type=parse_list, default=list(ENGINE_SETTINGS),
+                        help=f"настройки SQLite через запятую: {', '.join(ENGINE_SETTINGS)}")
+    parser.add_argument("--workers", type=lambda text: [int(n) for n in parse_list(text)], default=[1, 2, 4, 8],
+                        help="числа процессов через запятую")
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность одного прогона, с")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("conduit=45,toggle=35,leaderboard=20"),
+                        help="веса операций: conduit (открыть кондуит), toggle (отметить/снять задачу), leaderboard (итоги группы)")
+    parser.add_argument("--by-operation", action="store_true", help="показать задержки по каждой операции")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.profiles if name not in SCALE_PROFILES] + [
+        name for name in args.settings if name not in ENGINE_SETTINGS
+    ]
+    if unknown:
+        parser.error(f"неизвестные профили или настройки: {', '.join(unknown)}")
+
+    workdir = tempfile.mkdtemp()
+    try:
+        for profile in args.profiles:
+            source_path = prepare_database(profile, workdir)
+            targets = load_targets(source_path)
+            if not targets["lessons"]:
+                print(f"Профиль {profile}: нет занятий с задачами и учениками, пропуск.")
+                continue
+            print(f"\nПрофиль {profile}: занятий {len(targets['lessons'])}, групп {len(targets['members'])}")
+            print(f"{'настройка / процессы':<34}{'опер.':>8}{'опер/с':>10}{'p50, мс':>10}{'p95, мс':>10}"
+                  f"{'p99, мс':>10}{'locked, %':>11}{'ошибки':>8}")
+            for setting in args.settings:
+                for workers in args.workers:
+                    samples = run_load(source_path, workdir, setting, workers, args.duration, args.mix, targets)
+                    print_row(f"{setting} / {workers}", summarize(samples, args.duration))
+                    if args.by_operation:
+                        for operation in args.mix:
+                            print_row(f"  {operation}", summarize(
+                                [sample for sample in samples if sample[0] == operation], args.duration
+                            ))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_COMMANDS = [
+    [sys.executable, "-m", "core.migrate"],
+    [sys.executable, "scripts/seed_database.py"],
+    [sys.executable, "-m", "core.recompute", "--all", "--workers", "2"],
+]
+
+
+def find_postgres_bindir():
+    if shutil.which("pg_ctl"):
+        return os.path.dirname(shutil.which("pg_ctl"))
+    if shutil.which("pg_config"):
+        completed = subprocess.run(["pg_config", "--bindir"], capture_output=True, text=True, check=True)
+        return completed.stdout.strip()
+    return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_cluster(bindir, workdir, port):
+    data_dir = os.path.join(workdir, "data")
+    subprocess.run(
+        [os.path.join(bindir, "initdb"), "-D", data_dir, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-locale"],
+        check=True, stdout=subprocess.DEVNULL,
+    )
+    subprocess.run(
+        [os.path.join(bindir, "pg_ctl"), "-D", data_dir, "-l", os.path.join(workdir, "postgres.log"), "-w",
+         "-o", f"-p {port} -k {workdir} -c listen_addresses='' -c fsync=off", "start"],
+        check=True, stdout=subprocess.DEVNULL,
+    )
+    return data_dir
+
+
+def stop_cluster(bindir, data_dir):
+    subprocess.run(
+        [os.path.join(bindir, "pg_ctl"), "-D", data_dir, "-m", "fast", "-w", "stop"],
+        check=False, stdout=subprocess.DEVNULL,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Запуск временного кластера PostgreSQL и выполнение команд проекта против него."
+    )
+    parser.add_argument("--driver", default="psycopg2", help="драйвер SQLAlchemy (psycopg2 или psycopg)")
+    parser.add_argument("--keep", action="store_true", help="не удалять каталог кластера после завершения")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="команда (после --); по умолчанию миграция, заполнение и пересчет")
+    args = parser.parse_args()
+
+    bindir = find_postgres_bindir()
+    if bindir is None:
+        print("Не найдены pg_ctl/pg_config. Установите PostgreSQL или добавьте его bin-каталог в PATH.")
+        return 1
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    commands = [command] if command else DEFAULT_COMMANDS
+
+    workdir = tempfile.mkdtemp(prefix="olymp-pg-")
+    port = free_port()
+    data_dir = start_cluster(bindir, workdir, port)
+    database_url = f"postgresql+{args.driver}://postgres@/postgres?host={workdir}&port={port}"
+    env = dict(os.environ, OLYMP_DATABASE_URL=database_url)
+    print(f"PostgreSQL запущен: {database_url}")
+
+    exit_code = 0
+    try:
+        for cmd in commands:
+            print(f"$ {' '.join(cmd)}")
+            exit_code = subprocess.run(cmd, cwd=project_root, env=env).returncode
+            if exit_code != 0:
+                break
+    finally:
+        stop_cluster(bindir, data_dir)
+        if args.keep:
+            print(f"Каталог кластера сохранен: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())